@@ -0,0 +1,147 @@
+"""
+Historical yield of the Phase 1 research agents
+Records per drug and agent how many rows each run kept after dedup and
+validation, splitting a row several agents found evenly among them. In
+economy mode it decides which agents run at full strength, which are
+downgraded to a cheaper model and which are skipped. An agent that keeps
+being skipped is still run every few runs (exploration), so a category that
+starts producing findings again is noticed
+
+Usage:
+    python agent_yield.py show --drug Dupixent
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+DEFAULT_YIELD_DB = os.getenv("DRUG_RESEARCH_YIELD_DB", "research_cache/agent_yield.db")
+
+# Expected kept rows per run below which an agent is skipped / run on the cheaper model
+SKIP_BELOW = float(os.getenv("DRUG_RESEARCH_SKIP_YIELD", "0.5"))
+DOWNGRADE_BELOW = float(os.getenv("DRUG_RESEARCH_DOWNGRADE_YIELD", "1.5"))
+# Runs of an agent for a drug before its yield is trusted, and how many recent runs are averaged
+MIN_HISTORY = int(os.getenv("DRUG_RESEARCH_YIELD_MIN_RUNS", "3"))
+HISTORY_WINDOW = int(os.getenv("DRUG_RESEARCH_YIELD_WINDOW", "10"))
+# A skipped agent runs at full strength again after this many consecutive skips
+EXPLORE_EVERY = int(os.getenv("DRUG_RESEARCH_EXPLORE_EVERY", "5"))
+
+FULL, DOWNGRADE, SKIP = "full", "downgrade", "skip"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS agent_runs (
+    id INTEGER PRIMARY KEY,
+    drug TEXT NOT NULL,
+    agent TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    rows_kept REAL NOT NULL,
+    run_id TEXT,
+    recorded_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_agent_runs_drug_agent ON agent_runs(drug COLLATE NOCASE, agent, id);
+"""
+
+
+class YieldHistory:
+    """SQLite log of kept rows per drug, agent and run"""
+
+    def __init__(self, path: str = DEFAULT_YIELD_DB, skip_below: float = SKIP_BELOW,
+                 downgrade_below: float = DOWNGRADE_BELOW, min_history: int = MIN_HISTORY,
+                 window: int = HISTORY_WINDOW, explore_every: int = EXPLORE_EVERY):
+        self.path = path
+        self.skip_below = skip_below
+        self.downgrade_below = downgrade_below
+        self.min_history = min_history
+        self.window = window
+        self.explore_every = explore_every
+        if path != ':memory:':
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    def record(self, drug: str, agent: str, mode: str, rows_kept: float = 0, run_id: str = ''):
+        """Log one run of an agent (skipped agents are logged with mode "skip")"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO agent_runs (drug, agent, mode, rows_kept, run_id, recorded_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (drug, agent, mode, rows_kept, run_id, datetime.now().isoformat(timespec='seconds')),
+            )
+
+    def recent(self, drug: str, agent: str, limit: int) -> List[Tuple[str, float]]:
+        """(mode, rows_kept) of the latest runs of an agent for a drug, newest first"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT mode, rows_kept FROM agent_runs WHERE drug = ? COLLATE NOCASE AND agent = ? "
+                "ORDER BY id DESC LIMIT ?", (drug, agent, limit),
+            ).fetchall()
+
+    def expected_yield(self, drug: str, agent: str) -> Optional[float]:
+        """Mean kept rows over the agent's recent (not skipped) runs; None until there are enough of them"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT rows_kept FROM agent_runs WHERE drug = ? COLLATE NOCASE AND agent = ? AND mode != ? "
+                "ORDER BY id DESC LIMIT ?", (drug, agent, SKIP, self.window),
+            ).fetchall()
+        if len(rows) < self.min_history:
+            return None
+        return sum(kept for kept, in rows) / len(rows)
+
+    def decide(self, drug: str, agent: str) -> Tuple[str, str]:
+        """(mode, reason) for an agent under economy mode"""
+        expected = self.expected_yield(drug, agent)
+        if expected is None:
+            return FULL, "not enough history"
+        if expected >= self.downgrade_below:
+            return FULL, f"expected yield {expected:.1f} rows"
+        skips = 0
+        for mode, _ in self.recent(drug, agent, self.explore_every - 1):
+            if mode != SKIP:
+                break
+            skips += 1
+        if self.explore_every and skips >= self.explore_every - 1:
+            return FULL, f"exploration run after {skips} skips (expected yield {expected:.1f} rows)"
+        if expected < self.skip_below:
+            return SKIP, f"expected yield {expected:.1f} rows"
+        return DOWNGRADE, f"expected yield {expected:.1f} rows"
+
+    def summary(self, drug: Optional[str] = None) -> List[Tuple[str, str, int, int, float]]:
+        """(drug, agent, runs, skips, mean kept rows of non-skipped runs) per drug and agent"""
+        sql = ("SELECT drug, agent, COUNT(*), SUM(mode = 'skip'), "
+               "COALESCE(AVG(CASE WHEN mode != 'skip' THEN rows_kept END), 0) FROM agent_runs")
+        params = []
+        if drug:
+            sql += " WHERE drug = ? COLLATE NOCASE"
+            params.append(drug)
+        sql += " GROUP BY drug COLLATE NOCASE, agent ORDER BY drug, agent"
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+
+# ========== CLI ==========
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect the historical yield of research agents")
+    parser.add_argument("--db", default=DEFAULT_YIELD_DB, help="Path to the yield database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    show_parser = commands.add_parser("show", help="Runs, skips, mean kept rows and economy decision per agent")
+    show_parser.add_argument("--drug")
+    args = parser.parse_args(argv)
+
+    history = YieldHistory(args.db)
+    print(f"{'Drug':<20} {'Agent':<20} {'runs':>5} {'skips':>6} {'mean kept':>10}  economy decision")
+    for drug, agent, runs, skips, mean_kept in history.summary(args.drug):
+        mode, reason = history.decide(drug, agent)
+        print(f"{drug:<20} {agent:<20} {runs:>5} {skips:>6} {mean_kept:>10.1f}  {mode} ({reason})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,285 @@
+"""
+Benchmark suite
+Micro benchmarks of the table parsing and formatting helpers on multi-MB agent
+output, and end-to-end runs of InputDrivenDrugResearchWorkflow per profile
+with real agno Agents on fake models and toolkits (see fake_backends), so the
+tool wrappers and the query planner run as in production. Provider rate
+limits are off: the fakes have no quota, and token-bucket sleeps would swamp
+the time of the code under test. Results are written as JSON and compared
+against a stored baseline; any metric that regresses past its threshold fails
+the run
+
+Usage:
+    python benchmarks.py                         # run and compare with benchmark_baseline.json
+    python benchmarks.py --save-baseline         # run and store the results as the new baseline
+    python benchmarks.py --only micro --output results.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+# Read by rate_limit at import, so set before research_engine is imported
+os.environ["DRUG_RESEARCH_RATE_LIMITING"] = "0"
+
+from fake_backends import fake_finding_rows, fake_model_factory, fake_toolkit_factory
+from research_engine import (
+    DrugResearchInput, InputDrivenDrugResearchWorkflow, PROFILES, build_research_team, clean_table_data,
+    convert_url_to_plain_text, findings_to_rows, format_to_structured_table, parse_markdown_table_row,
+)
+from research_schema import TABLE_COLUMNS, ResearchFinding, ResearchFindings, dict_to_row, row_to_dict
+
+DEFAULT_BASELINE = "benchmark_baseline.json"
+
+# A metric fails when it exceeds baseline * (1 + threshold) and the absolute difference is above the floor.
+# Peak memory of an end-to-end run is a few MB and moves by about 1 MB with thread timing, so the memory
+# floor is an absolute slack that only the micro benchmarks (tens of MB) outgrow
+THRESHOLDS = {"seconds": 0.25, "peak_mb": 0.20}
+ABSOLUTE_FLOORS = {"seconds": 0.005, "peak_mb": 2.0}
+
+BENCH_INPUT = DrugResearchInput(
+    drug_name="Dupixent", manufacturer="Sanofi", generic_name="dupilumab",
+    target_month="October", target_year="2025", therapeutic_area="atopic dermatitis",
+)
+
+
+# ========== INPUT GENERATION ==========
+
+def generate_agent_output(target_mb: float = 4.0, seed: int = 0) -> str:
+    """Agent-like markdown of about ``target_mb`` MB: tables with links, prose and short rows"""
+    rng = random.Random(seed)
+    header = '| ' + ' | '.join(TABLE_COLUMNS) + ' |'
+    separator = '|' + '---|' * len(TABLE_COLUMNS)
+    parts, size = [], 0
+    while size < target_mb * 1024 * 1024:
+        block = ["## Findings", "", "Searches across press releases and regulatory sites returned the rows below.", "",
+                 header, separator]
+        for row in fake_finding_rows(BENCH_INPUT, 20, rng):
+            block.append('| ' + ' | '.join(row) + ' |')
+        # Rows with missing columns, as agents sometimes emit
+        block.append('| Marketed Assets | Safety Concern | 2025-10-03 | Dupixent | dupilumab |')
+        block.extend(["", "See [FDA](https://www.fda.gov/drugs) for details.", ""])
+        text = '\n'.join(block)
+        parts.append(text)
+        size += len(text.encode('utf-8'))
+    return '\n'.join(parts)
+
+
+def generate_structured_output(blocks: int, seed: int = 0) -> str:
+    """The findings of ``generate_agent_output`` with the same seed, as ResearchFindings JSON of ``blocks``
+    blocks. The schema makes every column required, so the short rows come back with their missing
+    columns filled instead of being emitted short"""
+    rng = random.Random(seed)
+    findings = []
+    for _ in range(blocks):
+        rows = fake_finding_rows(BENCH_INPUT, 20, rng)
+        rows.append(dict_to_row(row_to_dict(['Marketed Assets', 'Safety Concern', '2025-10-03', 'Dupixent', 'dupilumab'])))
+        findings.extend(ResearchFinding.from_row(row) for row in rows)
+    return ResearchFindings(findings=findings).model_dump_json()
+
+
+# ========== MEASUREMENT ==========
+
+def measure(fn: Callable[[], object], repeats: int = 5) -> Dict[str, float]:
+    """Best and median wall time over ``repeats`` runs and peak traced memory of one extra run.
+    The best time is the one compared against the baseline: it is the least affected by machine noise"""
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(timings), "median_seconds": statistics.median(timings), "peak_mb": peak / 1e6}
+
+
+def run_micro(target_mb: float, repeats: int) -> Dict[str, dict]:
+    """Benchmarks of the parsing and formatting helpers on generated agent output"""
+    content = generate_agent_output(target_mb)
+    lines = content.split('\n')
+    input_mb = len(content.encode('utf-8')) / 1e6
+    # The same findings as agents return them in structured output mode (21 per block, short row included)
+    blocks = content.count('## Findings')
+    structured = generate_structured_output(blocks)
+    structured_mb = len(structured.encode('utf-8')) / 1e6
+    print(f"⏱️ Micro benchmarks on {input_mb:.1f} MB ({len(lines)} lines)...")
+
+    benchmarks = {
+        "parse_markdown_table_row": lambda: [parse_markdown_table_row(line) for line in lines],
+        "convert_url_to_plain_text": lambda: [convert_url_to_plain_text(line) for line in lines],
+        "clean_table_data": lambda: clean_table_data(content),
+        "format_to_structured_table": lambda: format_to_structured_table(content, BENCH_INPUT),
+        "structured_output_to_rows": lambda: findings_to_rows(ResearchFindings.model_validate_json(structured)),
+    }
+    results = {}
+    for name, fn in benchmarks.items():
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = measure(fn, repeats)
+        result["input_mb"] = structured_mb if name == "structured_output_to_rows" else input_mb
+        result["mb_per_second"] = result["input_mb"] / result["seconds"] if result["seconds"] else 0.0
+        results[f"micro.{name}"] = result
+        print(f"   {name}: {result['seconds'] * 1000:.1f} ms, {result['mb_per_second']:.1f} MB/s, "
+              f"peak {result['peak_mb']:.1f} MB")
+
+    # Markdown vs structured output on the same findings: rows dropped for missing columns (the short rows
+    # clean_table_data sets aside) and output characters per finding, a proxy for output tokens. Recorded
+    # next to the parse times; only the times and memory are compared against the baseline
+    findings = blocks * 21
+    malformed: List[List[str]] = []
+    clean_table_data(content, malformed)
+    structured_rows = findings_to_rows(ResearchFindings.model_validate_json(structured))
+    for name, output, dropped in (("clean_table_data", content, len(malformed)),
+                                  ("structured_output_to_rows", structured, findings - len(structured_rows))):
+        results[f"micro.{name}"].update(findings=findings, rows_dropped=dropped, chars_per_finding=len(output) / findings)
+        print(f"   {name}: {dropped}/{findings} findings dropped, {len(output) / findings:.0f} output chars per finding")
+    return results
+
+
+def run_end_to_end(profiles: List[str], fake_config: dict) -> Dict[str, dict]:
+    """One workflow run per profile with fake models and toolkits; reports phase times, peak memory and prompt sizes"""
+    results = {}
+    for profile in profiles:
+        print(f"⏱️ End-to-end benchmark: {profile} profile...")
+        team = build_research_team(
+            profile,
+            model_factory=fake_model_factory(latency=fake_config["latency"], rows=fake_config["rows"],
+                                             latency_per_kchar=fake_config["latency_per_kchar"], seed=0),
+            toolkit_factory=fake_toolkit_factory(latency=fake_config["tool_latency"], seed=0),
+        )
+        workflow = InputDrivenDrugResearchWorkflow(team=team)
+        tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                workflow.run(BENCH_INPUT)
+            seconds = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        agents = dict(team.agents)
+        agents.update((key, agent) for key, agent in (
+            ("knowledge", team.knowledge_agent), ("content_analyzer", team.content_analyzer),
+            ("validation", team.validation_agent), ("row_repair", team.row_repair_agent)) if agent)
+        # Largest prompt each agent's model received; agents that were never called count 0
+        prompt_sizes = {key: max(agent.model.prompt_sizes or [0]) for key, agent in agents.items()}
+        results[f"e2e.{profile}"] = {
+            "seconds": seconds,
+            "peak_mb": peak / 1e6,
+            "phases": {phase: round(value, 4) for phase, value in workflow.phase_timings.items()},
+            "prompt_chars": prompt_sizes,
+            "total_prompt_chars": sum(prompt_sizes.values()),
+        }
+        print(f"   {profile}: {seconds:.2f} s, peak {peak / 1e6:.1f} MB, "
+              f"{sum(prompt_sizes.values())} prompt chars across {len(agents)} agents")
+    return results
+
+
+# ========== BASELINE COMPARISON ==========
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict],
+            thresholds: Dict[str, float] = THRESHOLDS) -> List[str]:
+    """Describe every metric that regressed past its threshold (empty list if none did)"""
+    failures = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric, threshold in thresholds.items():
+            if metric not in current or metric not in previous:
+                continue
+            limit = previous[metric] * (1 + threshold)
+            if current[metric] > limit and current[metric] - previous[metric] > ABSOLUTE_FLOORS[metric]:
+                failures.append(f"{name} {metric}: {current[metric]:.4f} > {limit:.4f} "
+                                f"(baseline {previous[metric]:.4f}, +{threshold:.0%} allowed)")
+    return failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the micro and end-to-end benchmarks")
+    parser.add_argument("--only", choices=["micro", "e2e"], help="Run only one group")
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES), help="Profiles for end-to-end runs")
+    parser.add_argument("--input-mb", type=float, default=4.0, help="Size of generated agent output for micro benchmarks")
+    parser.add_argument("--repeats", type=int, default=7)
+    parser.add_argument("--model-latency", type=float, default=0.2, help="Fake model latency per call (s)")
+    parser.add_argument("--model-latency-per-kchar", type=float, default=0.01, help="Extra fake model latency per 1000 prompt chars (s)")
+    parser.add_argument("--tool-latency", type=float, default=0.05, help="Fake search latency per call (s)")
+    parser.add_argument("--rows", type=int, default=5, help="Rows returned per fake agent call")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store results as the new baseline")
+    parser.add_argument("--output", help="Also write results to this JSON file")
+    parser.add_argument("--time-threshold", type=float, default=THRESHOLDS["seconds"])
+    parser.add_argument("--memory-threshold", type=float, default=THRESHOLDS["peak_mb"])
+    args = parser.parse_args(argv)
+
+    fake_config = {"latency": args.model_latency, "latency_per_kchar": args.model_latency_per_kchar,
+                   "tool_latency": args.tool_latency, "rows": args.rows}
+    baseline_path = os.path.abspath(args.baseline)
+    output_path = os.path.abspath(args.output) if args.output else None
+
+    results: Dict[str, dict] = {}
+    # Benchmarks write CSVs, agent outputs and databases: keep them out of the working tree
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="drug-research-bench-") as workdir:
+        os.chdir(workdir)
+        try:
+            if args.only in (None, "micro"):
+                results.update(run_micro(args.input_mb, args.repeats))
+            if args.only in (None, "e2e"):
+                results.update(run_end_to_end(args.profiles, fake_config))
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "config": {"input_mb": args.input_mb, "repeats": args.repeats, **fake_config},
+        "results": results,
+    }
+    if output_path:
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Results saved: {output_path}")
+
+    if args.save_baseline:
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Baseline saved: {baseline_path}")
+        return 0
+
+    if not os.path.exists(baseline_path):
+        print(f"⚠️ No baseline at {baseline_path} - run with --save-baseline to create one")
+        return 0
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("config") != report["config"]:
+        print("⚠️ Benchmark config differs from the baseline; comparisons may not be meaningful")
+    failures = compare(results, baseline.get("results", {}),
+                       {"seconds": args.time_threshold, "peak_mb": args.memory_threshold})
+    if failures:
+        print(f"❌ {len(failures)} benchmark regressions:")
+        for failure in failures:
+            print(f"   {failure}")
+        return 1
+    print(f"✅ No regressions against {baseline_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""
+Local fake backends for offline testing
+Search and scraping providers with injectable latency and errors, usable in
+place of the real Tavily, Exa, DuckDuckGo and Trafilatura clients, and a fake
+agno model so real Agents run end-to-end without model calls
+"""
+
+import asyncio
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Callable, Iterator, List, Optional, Union
+
+from agno.models.base import Model
+from agno.models.metrics import Metrics
+from agno.models.response import ModelResponse
+from agno.tools import Toolkit
+
+from row_repair import ALLOWED_SUB_CATEGORIES, CATEGORY, research_window
+from tool_hooks import current_research
+
+
+class ProviderError(Exception):
+    """Injected provider failure"""
+
+
+class FakeProvider:
+    """Fake search/scrape provider with configurable latency and failure rate"""
+
+    def __init__(self, name: str, latency: Union[float, Callable[[], float]] = 0.05,
+                 error_rate: float = 0.0, seed: Optional[int] = None):
+        self.name = name
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _delay(self):
+        with self._lock:
+            self.calls += 1
+            fail = self._random.random() < self.error_rate
+        delay = self.latency() if callable(self.latency) else self.latency
+        time.sleep(max(0.0, delay))
+        if fail:
+            raise ProviderError(f"{self.name}: injected failure")
+
+    def search(self, query: str, max_results: int = 5) -> str:
+        """Return a JSON list of fake search hits for the query"""
+        self._delay()
+        # URL-safe slug: search operators and quotes would not survive in a real result URL
+        slug = re.sub(r'[^a-z0-9]+', '-', query.lower()).strip('-')[:60]
+        return json.dumps([
+            {
+                'title': f"{query} - result {i + 1} from {self.name}",
+                'url': f"https://{self.name}.example.com/{slug}/{i + 1}",
+                'content': f"Snippet {i + 1} from {self.name} about {query}.",
+            }
+            for i in range(max_results)
+        ])
+
+    def extract_text(self, url: str) -> str:
+        """Return fake page text for the URL"""
+        self._delay()
+        return f"Extracted text of {url} served by {self.name}."
+
+
+def lognormal_latency(median: float, sigma: float = 0.5, seed: Optional[int] = None) -> Callable[[], float]:
+    """Latency sampler with a realistic long tail around ``median`` seconds"""
+    rng = random.Random(seed)
+    mu = math.log(median)
+    return lambda: rng.lognormvariate(mu, sigma)
+
+
+# ========== FAKE FINDINGS ==========
+
+def fake_finding_rows(research_input, count: int, rng: random.Random, description_words: int = 150) -> List[List[str]]:
+    """Plausible 13-column findings rows dated inside the research period"""
+    window = research_window(research_input) or [(int(research_input.target_year), 1)]
+    words = ("label", "phase", "trial", "coverage", "formulary", "safety", "patients", "efficacy",
+             "placebo", "week", "approval", "submission", "endpoint", "adverse", "events", "reported")
+    rows = []
+    for _ in range(count):
+        year, month = rng.choice(window) if len(window) > 1 else window[0]
+        description = ' '.join(rng.choice(words) for _ in range(description_words))
+        rows.append([
+            CATEGORY, rng.choice(ALLOWED_SUB_CATEGORIES),
+            f"{year}-{month:02d}-{rng.randint(1, 28):02d}",
+            research_input.drug_name, research_input.generic_name or "Not Available", research_input.manufacturer,
+            research_input.therapeutic_area or "atopic dermatitis",
+            f"Development {rng.randint(1, 10 ** 6)} for {research_input.drug_name}",
+            description, rng.choice(["US", "Canada", "US, Canada"]),
+            "No competitive implication stated.", "Adults with moderate-to-severe disease",
+            f"[source](https://news.example.com/{research_input.drug_name.lower()}/{rng.randint(1, 10 ** 6)})",
+        ])
+    return rows
+
+
+# ========== FAKE AGNO MODEL AND TOOLKITS ==========
+# Drop-ins for real agno Agents (and therefore AgentOS): the model answers with table rows after a
+# sampled delay, optionally calling the agent's search tools first, so tool wrappers run as in production
+
+DEFAULT_RESEARCH = SimpleNamespace(drug_name="Dupixent", manufacturer="Sanofi", generic_name="dupilumab",
+                                   target_month="October", target_year="2025", therapeutic_area=None)
+
+
+@dataclass
+class FakeModel(Model):
+    """agno Model with sampled latency that requests ``tool_calls`` searches, then returns ``rows`` table rows"""
+    id: str = "fake-model"
+    name: str = "FakeModel"
+    provider: str = "Fake"
+    latency: Union[float, Callable[[], float]] = 0.2
+    # Extra latency per 1000 prompt characters, as prefill grows with prompt length for real models
+    latency_per_kchar: float = 0.0
+    tool_calls: int = 1
+    rows: int = 3
+    seed: Optional[int] = None
+
+    def __post_init__(self):
+        super().__post_init__()
+        self._random = random.Random(self.seed)
+        # Characters of every prompt sent to the model (all messages of the call)
+        self.prompt_sizes: List[int] = []
+
+    def _respond(self, messages, tools) -> ModelResponse:
+        response = self._answer(messages, tools)
+        # Token usage estimated at 4 characters per token, so run reports see plausible counts
+        input_tokens = sum(len(str(message.content or "")) for message in messages) // 4
+        output_tokens = len(response.content or "") // 4 + 20 * len(response.tool_calls or [])
+        response.response_usage = Metrics(input_tokens=input_tokens, output_tokens=output_tokens,
+                                          total_tokens=input_tokens + output_tokens)
+        return response
+
+    def _answer(self, messages, tools) -> ModelResponse:
+        tool_results = sum(1 for message in messages if message.role == "tool")
+        search_tools = [tool["function"]["name"] for tool in tools or []
+                        if "search" in tool.get("function", {}).get("name", "")]
+        if search_tools and tool_results < self.tool_calls:
+            query = next((str(m.content) for m in reversed(messages) if m.role == "user"), "")[:120]
+            return ModelResponse(role="assistant", tool_calls=[{
+                "id": f"call_{uuid.uuid4().hex[:12]}", "type": "function",
+                "function": {"name": search_tools[tool_results % len(search_tools)],
+                             "arguments": json.dumps({"query": query})},
+            }])
+        research_input = current_research.get() or DEFAULT_RESEARCH
+        lines = ["Findings for the requested period:", ""]
+        lines += ['| ' + ' | '.join(row) + ' |' for row in fake_finding_rows(research_input, self.rows, self._random)]
+        return ModelResponse(role="assistant", content='\n'.join(lines))
+
+    def _sample_latency(self, messages) -> float:
+        prompt_chars = sum(len(str(message.content or "")) for message in messages)
+        self.prompt_sizes.append(prompt_chars)
+        latency = self.latency() if callable(self.latency) else self.latency
+        return max(0.0, latency + self.latency_per_kchar * prompt_chars / 1000)
+
+    def invoke(self, messages, assistant_message, response_format=None, tools=None, tool_choice=None,
+               run_response=None, **kwargs) -> ModelResponse:
+        time.sleep(self._sample_latency(messages))
+        return self._respond(messages, tools)
+
+    async def ainvoke(self, messages, assistant_message, response_format=None, tools=None, tool_choice=None,
+                      run_response=None, **kwargs) -> ModelResponse:
+        await asyncio.sleep(self._sample_latency(messages))
+        return self._respond(messages, tools)
+
+    def invoke_stream(self, messages, assistant_message, response_format=None, tools=None, tool_choice=None,
+                      run_response=None, **kwargs) -> Iterator[ModelResponse]:
+        yield self.invoke(messages, assistant_message, tools=tools)
+
+    async def ainvoke_stream(self, messages, assistant_message, response_format=None, tools=None, tool_choice=None,
+                             run_response=None, **kwargs) -> AsyncIterator[ModelResponse]:
+        yield await self.ainvoke(messages, assistant_message, tools=tools)
+
+    def _parse_provider_response(self, response: Any, **kwargs) -> ModelResponse:
+        return response
+
+    def _parse_provider_response_delta(self, response: Any) -> ModelResponse:
+        return response
+
+
+# Tool each fake toolkit exposes, named like the real toolkit's so guards, alternates and indexing apply
+FAKE_TOOL_NAMES = {
+    "tavily": "web_search_using_tavily", "exa": "search_exa", "duckduckgo": "duckduckgo_search",
+    "scraping": "extract_text", "pdf": "read_pdf_pages",
+}
+
+
+class FakeToolkit(Toolkit):
+    """Toolkit backed by a FakeProvider, exposing the same tool name as the real provider toolkit"""
+
+    def __init__(self, provider_name: str, provider: FakeProvider):
+        tool_name = FAKE_TOOL_NAMES[provider_name]
+        if provider_name in ("scraping", "pdf"):
+            def tool(url: str) -> str:
+                """Fetch the text of a page.
+
+                Args:
+                    url (str): URL to fetch.
+                """
+                return provider.extract_text(url)
+        else:
+            def tool(query: str, max_results: int = 5) -> str:
+                """Search the web.
+
+                Args:
+                    query (str): Search query.
+                    max_results (int): Number of results.
+                """
+                return provider.search(query, max_results)
+        tool.__name__ = tool_name
+        setattr(self, tool_name, tool)
+        super().__init__(name=f"fake_{provider_name}", tools=[tool])
+
+
+def fake_toolkit_factory(latency: Union[float, Callable[[], float]] = 0.05, error_rate: float = 0.0,
+                         seed: Optional[int] = None) -> Callable[[str], FakeToolkit]:
+    """toolkit_factory for research_engine.build_research_team that returns FakeToolkits"""
+    return lambda provider: FakeToolkit(provider, FakeProvider(provider, latency=latency,
+                                                               error_rate=error_rate, seed=seed))
+
+
+def fake_model_factory(latency: Union[float, Callable[[], float]] = 0.2, tool_calls: int = 1,
+                       rows: int = 3, seed: Optional[int] = None,
+                       latency_per_kchar: float = 0.0) -> Callable[..., FakeModel]:
+    """model_factory for research_engine.build_research_team that returns FakeModels"""
+    return lambda model_id, thinking_budget=None: FakeModel(id=f"fake-{model_id}", latency=latency,
+                                                            latency_per_kchar=latency_per_kchar,
+                                                            tool_calls=tool_calls, rows=rows, seed=seed)
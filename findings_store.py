@@ -0,0 +1,204 @@
+"""
+Indexed findings database
+Embedded SQLite store of every kept research row, upserted by row signature
+and indexed on drug, manufacturer, date, sub category and canonical URL,
+with a query API and CLI in place of globbing per-run CSV files
+
+Usage:
+    python findings_store.py query --drug Dupixent --sub-category "Safety Concern" --year 2025
+    python findings_store.py import Dupixent_Sanofi_20251020_101500.csv ...
+"""
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence
+
+from research_schema import TABLE_COLUMNS, canonicalize_url, row_signature
+
+DEFAULT_FINDINGS_DB = os.getenv("DRUG_RESEARCH_FINDINGS_DB", "research_cache/findings.db")
+
+# Database column for each table column, in TABLE_COLUMNS order
+DB_COLUMNS = [
+    "category", "sub_category", "date", "drug_name", "generic_name", "manufacturer", "disease_name",
+    "development_summary", "detailed_description", "country", "competitive_implication",
+    "patient_population", "url",
+]
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS findings (
+    id INTEGER PRIMARY KEY,
+    signature TEXT NOT NULL UNIQUE,
+    {', '.join(f'{column} TEXT' for column in DB_COLUMNS)},
+    canonical_url TEXT,
+    target_period TEXT,
+    run_id TEXT,
+    first_seen TEXT,
+    last_seen TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_findings_drug ON findings(drug_name COLLATE NOCASE, date);
+CREATE INDEX IF NOT EXISTS idx_findings_manufacturer ON findings(manufacturer COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_findings_date ON findings(date);
+CREATE INDEX IF NOT EXISTS idx_findings_sub_category ON findings(sub_category, date);
+CREATE INDEX IF NOT EXISTS idx_findings_canonical_url ON findings(canonical_url);
+"""
+
+# Version of row_signature the stored signatures were computed with (PRAGMA user_version)
+SIGNATURE_VERSION = 1
+
+
+class FindingsStore:
+    """SQLite-backed store of research findings"""
+
+    def __init__(self, path: str = DEFAULT_FINDINGS_DB):
+        self.path = path
+        if path != ':memory:':
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            self._resign()
+
+    def _resign(self):
+        """Recompute signatures stored by an older row_signature (lock and transaction held). The new
+        signature only adds to the old key, so rows that were distinct stay distinct"""
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] >= SIGNATURE_VERSION:
+            return
+        rows = self._conn.execute(f"SELECT id, {', '.join(DB_COLUMNS)} FROM findings").fetchall()
+        self._conn.executemany("UPDATE findings SET signature = ? WHERE id = ?",
+                               [(row_signature([str(value or '') for value in row[1:]]), row[0]) for row in rows])
+        self._conn.execute(f"PRAGMA user_version = {SIGNATURE_VERSION}")
+
+    def upsert_rows(self, rows: Iterable[Sequence[str]], target_period: str = '', run_id: str = '') -> int:
+        """Insert rows or refresh existing ones with the same signature; returns rows written"""
+        now = datetime.now().isoformat(timespec='seconds')
+        records = []
+        for row in rows:
+            if len(row) < len(TABLE_COLUMNS):
+                continue
+            values = [str(value) for value in row[:len(TABLE_COLUMNS)]]
+            records.append([row_signature(values), *values, canonicalize_url(values[-1]),
+                            target_period, run_id, now, now])
+        if not records:
+            return 0
+        columns = ["signature", *DB_COLUMNS, "canonical_url", "target_period", "run_id", "first_seen", "last_seen"]
+        updates = ', '.join(
+            f"{column} = CASE WHEN excluded.{column} != '' THEN excluded.{column} ELSE findings.{column} END"
+            if column in ('target_period', 'run_id') else f"{column} = excluded.{column}"
+            for column in columns if column not in ('signature', 'first_seen')
+        )
+        sql = (f"INSERT INTO findings ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+               f"ON CONFLICT(signature) DO UPDATE SET {updates}")
+        with self._lock, self._conn:
+            self._conn.executemany(sql, records)
+        return len(records)
+
+    def query(self, drug: Optional[str] = None, manufacturer: Optional[str] = None,
+              sub_category: Optional[str] = None, year: Optional[str] = None,
+              date_from: Optional[str] = None, date_to: Optional[str] = None,
+              url: Optional[str] = None, limit: Optional[int] = None) -> List[dict]:
+        """Return matching findings (newest first) as {column name: value} dicts"""
+        clauses, params = [], []
+        if drug:
+            clauses.append("drug_name = ? COLLATE NOCASE")
+            params.append(drug)
+        if manufacturer:
+            clauses.append("manufacturer = ? COLLATE NOCASE")
+            params.append(manufacturer)
+        if sub_category:
+            clauses.append("sub_category = ?")
+            params.append(sub_category)
+        if year:
+            date_from = date_from or f"{year}-01-01"
+            date_to = date_to or f"{year}-12-31"
+        if date_from:
+            clauses.append("date >= ?")
+            params.append(date_from)
+        if date_to:
+            clauses.append("date <= ?")
+            params.append(date_to)
+        if url:
+            clauses.append("canonical_url = ?")
+            params.append(canonicalize_url(url))
+        sql = "SELECT * FROM findings"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY date DESC, id DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {**{name: row[column] for name, column in zip(TABLE_COLUMNS, DB_COLUMNS)},
+             'Target Period': row['target_period'], 'Run ID': row['run_id'],
+             'First Seen': row['first_seen'], 'Last Seen': row['last_seen']}
+            for row in rows
+        ]
+
+    def import_csv(self, csv_path: str) -> int:
+        """Load a CSV written by format_to_structured_table into the store"""
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            rows = [[record.get(column) or 'Not Available' for column in TABLE_COLUMNS] for record in reader]
+        return self.upsert_rows(rows, run_id=Path(csv_path).stem)
+
+
+# ========== CLI ==========
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Query the indexed findings database")
+    parser.add_argument("--db", default=DEFAULT_FINDINGS_DB, help="Path to the findings database")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    query_parser = commands.add_parser("query", help="Query findings")
+    query_parser.add_argument("--drug")
+    query_parser.add_argument("--manufacturer")
+    query_parser.add_argument("--sub-category")
+    query_parser.add_argument("--year")
+    query_parser.add_argument("--date-from", help="YYYY-MM-DD")
+    query_parser.add_argument("--date-to", help="YYYY-MM-DD")
+    query_parser.add_argument("--url")
+    query_parser.add_argument("--limit", type=int)
+    query_parser.add_argument("--format", choices=["table", "csv", "jsonl"], default="table")
+
+    import_parser = commands.add_parser("import", help="Import CSV files from earlier runs")
+    import_parser.add_argument("csv_files", nargs="+")
+
+    args = parser.parse_args(argv)
+    store = FindingsStore(args.db)
+
+    if args.command == "import":
+        for csv_path in args.csv_files:
+            print(f"✅ Imported {store.import_csv(csv_path)} rows from {csv_path}")
+        return 0
+
+    results = store.query(drug=args.drug, manufacturer=args.manufacturer, sub_category=args.sub_category,
+                          year=args.year, date_from=args.date_from, date_to=args.date_to,
+                          url=args.url, limit=args.limit)
+    if args.format == "jsonl":
+        for result in results:
+            print(json.dumps(result, ensure_ascii=False))
+    elif args.format == "csv":
+        writer = csv.DictWriter(sys.stdout, fieldnames=TABLE_COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(results)
+    else:
+        for result in results:
+            print(f"{result['Date']} | {result['Drug Name']} | {result['Sub Category']} | "
+                  f"{result['Development Summary']} | {result['URL']}")
+        print(f"\n{len(results)} findings")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,369 @@
+"""
+Shared keep-alive HTTP clients for the search and scraping tools
+One requests connection pool (HTTPAdapter) behind the sessions of the
+toolkit API clients (e.g. tavily-python) and one httpx.Client (PDF
+downloads, HTTP/2 when the h2 package is installed) per process, with
+per-host connection limits and keep-alive, plus a TTL cache for the DNS
+lookups of those connections only. Clients get the pool injected
+explicitly (pool_toolkit, PdfTools(client=...)); nothing else in the
+process is patched. Repeated calls to a provider reuse a warm TCP+TLS
+connection instead of paying a fresh handshake each time
+
+The benchmark starts a local HTTP stub that charges simulated round trips
+per new connection (TCP + TLS handshake) and per request, and compares
+per-call latency of a fresh connection per call with the shared clients
+under concurrent agents
+
+Usage:
+    python http_pool.py bench --agents 8 --calls 25 --rtt-ms 20
+"""
+
+import argparse
+import copy
+import http.cookiejar
+import importlib.util
+import json
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+import httpcore
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+# Set DRUG_RESEARCH_HTTP_POOL=0 to give every client its own connections again
+HTTP_POOL = os.getenv("DRUG_RESEARCH_HTTP_POOL", "1") == "1"
+
+MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+# Concurrent connections per host; further requests to the host wait for a free one
+MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "10"))
+KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "30"))
+DNS_TTL_SECONDS = float(os.getenv("HTTP_DNS_TTL_SECONDS", "300"))
+
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+
+# ========== DNS CACHE ==========
+
+class DnsCache:
+    """TTL cache of getaddrinfo results (failed lookups are not cached)"""
+
+    def __init__(self, ttl: float = DNS_TTL_SECONDS):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[tuple, Tuple[float, list]] = {}
+        self._lock = threading.Lock()
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        key = (host, port, family, type, proto, flags)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self.hits += 1
+                return list(entry[1])
+            self.misses += 1
+        addresses = socket.getaddrinfo(host, port, family, type, proto, flags)
+        with self._lock:
+            self._entries[key] = (now + self.ttl, addresses)
+        return list(addresses)
+
+    def address(self, host: str, port: int) -> str:
+        """The first address of ``host`` to open a TCP connection to"""
+        return self.getaddrinfo(host, port, 0, socket.SOCK_STREAM)[0][4][0]
+
+    def forget(self, host: str):
+        """Drop the cached addresses of ``host`` (e.g. after a failed connection)"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == host]:
+                del self._entries[key]
+
+
+_dns_cache = DnsCache()
+
+
+def _cached_address(host: str, port: int) -> str:
+    # Fall back to the host name: the connection then resolves it and reports any lookup error itself
+    try:
+        return _dns_cache.address(host, port)
+    except OSError:
+        return host
+
+
+class _CachedDnsConnection:
+    """urllib3 connection mixin that connects to the cached address of its host. Only the
+    socket connection uses the address; TLS SNI and certificate checks still use the host name"""
+
+    def _new_conn(self):
+        host = self._dns_host
+        self._dns_host = _cached_address(host, self.port)
+        try:
+            return super()._new_conn()
+        except (NewConnectionError, ConnectTimeoutError):
+            # The cached address may be stale: the next connection resolves the host again
+            _dns_cache.forget(host)
+            raise
+        finally:
+            self._dns_host = host
+
+
+class CachedDnsHTTPConnection(_CachedDnsConnection, HTTPConnection):
+    pass
+
+
+class CachedDnsHTTPSConnection(_CachedDnsConnection, HTTPSConnection):
+    pass
+
+
+class CachedDnsHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = CachedDnsHTTPConnection
+
+
+class CachedDnsHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = CachedDnsHTTPSConnection
+
+
+class CachedDnsBackend(httpcore.SyncBackend):
+    """httpcore network backend that connects to the cached address of the host"""
+
+    def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        return super().connect_tcp(_cached_address(host, port), port, timeout, local_address, socket_options)
+
+
+# ========== SHARED CLIENTS ==========
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter pooled per host with cached DNS, shared by the sessions of every pooled client"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": CachedDnsHTTPConnectionPool,
+                                                   "https": CachedDnsHTTPSConnectionPool}
+
+    def close(self):
+        # Closing one client's session must not drop the connections of the others
+        pass
+
+
+def new_adapter(max_per_host: int = MAX_PER_HOST, max_hosts: int = MAX_CONNECTIONS) -> PooledAdapter:
+    return PooledAdapter(pool_connections=max_hosts, pool_maxsize=max_per_host, pool_block=True)
+
+
+# Session settings a pooled client keeps from the session it was created with
+_SESSION_SETTINGS = ("auth", "proxies", "hooks", "params", "verify", "cert", "max_redirects", "trust_env")
+
+
+class ThreadLocalSession:
+    """Drop-in for a client's requests.Session (requests sessions are not thread-safe): every thread
+    gets its own Session with the original's headers and settings, all mounted on one shared adapter.
+    No cookies are kept, so providers never see each other's"""
+
+    def __init__(self, template: requests.Session, adapter: Optional[HTTPAdapter] = None):
+        self._template = template
+        self._adapter = adapter or shared_adapter()
+        self._local = threading.local()
+
+    def session(self) -> requests.Session:
+        """The calling thread's session"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self._template.headers)
+            for name in _SESSION_SETTINGS:
+                setattr(session, name, copy.deepcopy(getattr(self._template, name)))
+            session.mount("https://", self._adapter)
+            session.mount("http://", self._adapter)
+            session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+            self._local.session = session
+        return session
+
+    def __getattr__(self, name):
+        return getattr(self.session(), name)
+
+    def close(self):
+        session = getattr(self._local, 'session', None)
+        if session is not None:
+            session.close()
+            self._local.session = None
+
+
+def new_client(max_connections: int = MAX_CONNECTIONS, keepalive: float = KEEPALIVE_SECONDS,
+               **kwargs) -> httpx.Client:
+    """An httpx.Client with keep-alive, cached DNS and HTTP/2 when available"""
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections,
+                          keepalive_expiry=keepalive)
+    transport = httpx.HTTPTransport(http2=HTTP2, limits=limits)
+    # httpx has no option for the network backend of its connection pool
+    transport._pool._network_backend = CachedDnsBackend()
+    return httpx.Client(transport=transport, follow_redirects=True, timeout=60.0, **kwargs)
+
+
+_adapter: Optional[PooledAdapter] = None
+_client: Optional[httpx.Client] = None
+_lock = threading.Lock()
+
+
+def shared_adapter() -> PooledAdapter:
+    global _adapter
+    with _lock:
+        if _adapter is None:
+            _adapter = new_adapter()
+        return _adapter
+
+
+def shared_client() -> httpx.Client:
+    global _client
+    with _lock:
+        if _client is None:
+            _client = new_client()
+        return _client
+
+
+def pool_toolkit(toolkit):
+    """Put the API clients of a toolkit that hold a requests.Session (e.g. TavilyTools.client.session)
+    on the shared pool. Clients calling module-level requests functions (exa_py) keep their own connections"""
+    if not HTTP_POOL:
+        return toolkit
+    for client in list(vars(toolkit).values()):
+        session = getattr(client, 'session', None)
+        if isinstance(session, requests.Session):
+            client.session = ThreadLocalSession(session)
+    return toolkit
+
+
+def pool_stats() -> dict:
+    """DNS cache hits and misses of the pooled clients of this process"""
+    return {"dns_hits": _dns_cache.hits, "dns_misses": _dns_cache.misses}
+
+
+# ========== BENCHMARK ==========
+
+class StubServer(ThreadingHTTPServer):
+    """HTTP stub answering every GET with a small JSON search result after ``rtt`` seconds.
+    A new connection additionally costs two round trips (the TCP and TLS 1.3 handshakes of a real provider)"""
+    daemon_threads = True
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.connections = 0
+        super().__init__(("127.0.0.1", 0), StubHandler)
+
+    def finish_request(self, request, client_address):
+        self.connections += 1
+        time.sleep(2 * self.rtt)
+        super().finish_request(request, client_address)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes: without TCP_NODELAY every keep-alive response stalls on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        time.sleep(self.server.rtt)
+        body = json.dumps({"query": self.path, "results": [{"title": "Stub result", "url": "https://example.com"}]})
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode('utf-8'))
+
+    def log_message(self, *args):
+        pass
+
+
+def _drive(call, agents: int, calls: int) -> Tuple[List[float], float]:
+    """Per-call latencies and wall time of ``agents`` threads making ``calls`` sequential calls each"""
+    def agent(index: int) -> List[float]:
+        latencies = []
+        for i in range(calls):
+            started = time.perf_counter()
+            call(f"/search?agent={index}&q={i}")
+            latencies.append(time.perf_counter() - started)
+        return latencies
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(agents) as pool:
+        latencies = [latency for result in pool.map(agent, range(agents)) for latency in result]
+    return latencies, time.perf_counter() - started
+
+
+def run_benchmark(agents: int, calls: int, rtt: float) -> Dict[str, dict]:
+    """Fresh connection per call vs. pooled requests sessions vs. the shared httpx client"""
+    server = StubServer(rtt)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://localhost:{server.server_address[1]}"
+
+    def fresh(path):
+        # What requests.get does on its own: a new Session, so a new connection per call
+        with requests.Session() as session:
+            session.get(base_url + path).raise_for_status()
+
+    # The sessions of one client, as pool_toolkit sets them up, on a pool of their own
+    adapter = new_adapter()
+    session = ThreadLocalSession(requests.Session(), adapter)
+    client = new_client()
+    modes = {
+        "fresh": fresh,
+        "pooled_requests": lambda path: session.get(base_url + path).raise_for_status(),
+        "pooled_httpx": lambda path: client.get(base_url + path).raise_for_status(),
+    }
+    results = {}
+    try:
+        for mode, call in modes.items():
+            connections = server.connections
+            latencies, elapsed = _drive(call, agents, calls)
+            results[mode] = {
+                "calls": len(latencies),
+                "connections": server.connections - connections,
+                "mean_ms": statistics.mean(latencies) * 1000,
+                "p50_ms": statistics.median(latencies) * 1000,
+                "p95_ms": sorted(latencies)[int(0.95 * (len(latencies) - 1))] * 1000,
+                "wall_seconds": elapsed,
+            }
+    finally:
+        adapter.poolmanager.clear()
+        client.close()
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+# ========== CLI ==========
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Shared HTTP connection pool tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    bench_parser = commands.add_parser("bench", help="Per-call latency with and without the shared pool")
+    bench_parser.add_argument("--agents", type=int, default=8, help="Concurrent agents (threads)")
+    bench_parser.add_argument("--calls", type=int, default=25, help="Sequential calls per agent")
+    bench_parser.add_argument("--rtt-ms", type=float, default=20.0, help="Simulated network round trip (ms)")
+    bench_parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    print(f"⏱️ {args.agents} agents x {args.calls} calls against a local HTTP stub, {args.rtt_ms:.0f} ms RTT...")
+    results = run_benchmark(args.agents, args.calls, args.rtt_ms / 1000)
+    print(f"{'mode':<16} {'calls':>6} {'conns':>6} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'wall s':>7}")
+    for mode, stats in results.items():
+        print(f"{mode:<16} {stats['calls']:>6} {stats['connections']:>6} {stats['mean_ms']:>8.1f} "
+              f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['wall_seconds']:>7.2f}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+        print(f"✅ Results saved: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,280 @@
+"""
+Offline load test of the AgentOS app
+Boots the same AgentOS app as multi_tools_search.py (or the fast profile) in
+a separate process, with every model and search provider replaced by fakes
+with lognormal latency, drives concurrent agent and workflow requests over
+HTTP and reports throughput, p50/p95/p99 latency, error rate and the server's
+memory growth. Needs no network access or API keys (Linux: RSS is read from /proc)
+
+Usage:
+    python load_test.py --requests 200 --concurrency 20
+    python load_test.py --profile fast --workflow-ratio 0.5 --output load_report.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks import BENCH_INPUT
+from fake_backends import fake_model_factory, fake_toolkit_factory, lognormal_latency
+
+
+# ========== SERVER ==========
+
+def build_fake_app(profile: str, model_median: float, tool_median: float, sigma: float,
+                   tool_calls: int, error_rate: float, seed: int):
+    """The AgentOS app of a profile with fake models and providers behind the real tool wrappers"""
+    from agno.os import AgentOS
+    from research_engine import InputDrivenDrugResearchWorkflow, build_research_team
+
+    team = build_research_team(
+        profile,
+        model_factory=fake_model_factory(latency=lognormal_latency(model_median, sigma, seed), tool_calls=tool_calls),
+        toolkit_factory=fake_toolkit_factory(latency=lognormal_latency(tool_median, sigma, seed + 1),
+                                             error_rate=error_rate, seed=seed),
+    )
+    agent_os = AgentOS(
+        os_id="load-test-drug-research",
+        description=f"Load test of the {profile} profile with fake backends",
+        agents=team.all_agents(),
+        workflows=[InputDrivenDrugResearchWorkflow(team=team)],
+        telemetry=False,
+    )
+    return agent_os.get_app()
+
+
+def serve(args) -> int:
+    """Run the fake-backed app under uvicorn (the server process of a load test)"""
+    import uvicorn
+
+    os.environ["AGNO_TELEMETRY"] = "false"
+    app = build_fake_app(args.profile, args.model_latency, args.tool_latency, args.latency_sigma,
+                         args.tool_calls, args.tool_error_rate, args.seed)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning", access_log=False)
+    return 0
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    """Resident set size of a process in MB (Linux)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+class RssSampler:
+    """Samples a process's RSS in a background thread"""
+
+    def __init__(self, pid: int, interval: float = 0.25):
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[float] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.is_set():
+            value = rss_mb(self.pid)
+            if value is not None:
+                self.samples.append(value)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+# ========== LOAD GENERATION ==========
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    # Nearest-rank percentile
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def summarize(latencies: List[float], errors: int, total: int, elapsed: float) -> Dict[str, Optional[float]]:
+    return {
+        "requests": total,
+        "errors": errors,
+        "error_rate": errors / total if total else 0.0,
+        "throughput_rps": total / elapsed if elapsed else 0.0,
+        "p50_seconds": percentile(latencies, 50),
+        "p95_seconds": percentile(latencies, 95),
+        "p99_seconds": percentile(latencies, 99),
+        "max_seconds": max(latencies) if latencies else None,
+    }
+
+
+async def drive(base_url: str, total: int, concurrency: int, workflow_ratio: float,
+                timeout: float, seed: int) -> Dict[str, dict]:
+    """Send ``total`` requests with at most ``concurrency`` in flight; returns per-kind latency summaries"""
+    rng = random.Random(seed)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        agent_ids = [agent["id"] for agent in (await client.get("/agents")).json()]
+        workflow_ids = [workflow["id"] for workflow in (await client.get("/workflows")).json()]
+        kinds = ["workflow" if workflow_ids and rng.random() < workflow_ratio else "agent" for _ in range(total)]
+        results: Dict[str, List] = {"agent": [], "workflow": []}
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(kind: str, index: int):
+            if kind == "workflow":
+                path = f"/workflows/{workflow_ids[index % len(workflow_ids)]}/runs"
+                message = BENCH_INPUT.model_dump_json()
+            else:
+                path = f"/agents/{agent_ids[index % len(agent_ids)]}/runs"
+                message = f"Research {BENCH_INPUT.get_search_context()}. {BENCH_INPUT.get_temporal_constraint()}"
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await client.post(path, data={"message": message, "stream": "false"})
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                results[kind].append((time.perf_counter() - started, ok))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(kind, i) for i, kind in enumerate(kinds)))
+        elapsed = time.perf_counter() - started
+
+    summary = {}
+    for kind, outcomes in list(results.items()) + [("all", results["agent"] + results["workflow"])]:
+        if outcomes:
+            latencies = [latency for latency, ok in outcomes if ok]
+            summary[kind] = summarize(latencies, sum(1 for _, ok in outcomes if not ok), len(outcomes), elapsed)
+    return summary
+
+
+def wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server not ready after {timeout:.0f}s")
+
+
+def run_load_test(args) -> dict:
+    port = args.port or free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server_args = [sys.executable, os.path.abspath(__file__), "serve", "--port", str(port),
+                   "--profile", args.profile, "--model-latency", str(args.model_latency),
+                   "--tool-latency", str(args.tool_latency), "--latency-sigma", str(args.latency_sigma),
+                   "--tool-calls", str(args.tool_calls), "--tool-error-rate", str(args.tool_error_rate),
+                   "--seed", str(args.seed)]
+    # The server writes CSVs, agent outputs and caches: run it in a scratch directory
+    with tempfile.TemporaryDirectory(prefix="drug-research-load-") as workdir:
+        env = {**os.environ, "AGNO_TELEMETRY": "false",
+               # Fake providers have no quota: the shared rate limits would only measure their own queueing
+               "DRUG_RESEARCH_RATE_LIMITING": "1" if args.rate_limits else "0",
+               "PYTHONPATH": os.pathsep.join(filter(None, [os.path.dirname(os.path.abspath(__file__)),
+                                                           os.environ.get("PYTHONPATH")]))}
+        process = subprocess.Popen(server_args, cwd=workdir, env=env, stdout=subprocess.DEVNULL)
+        try:
+            print(f"🚀 Booting {args.profile} profile app with fake backends on {base_url}...")
+            wait_until_ready(base_url, process)
+            rss_start = rss_mb(process.pid)
+            print(f"⏱️ {args.requests} requests, concurrency {args.concurrency}, "
+                  f"{args.workflow_ratio:.0%} workflow runs...")
+            with RssSampler(process.pid) as sampler:
+                summary = asyncio.run(drive(base_url, args.requests, args.concurrency, args.workflow_ratio,
+                                            args.timeout, args.seed))
+            rss_end = rss_mb(process.pid)
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    return {
+        "config": {key: value for key, value in vars(args).items() if key not in ("command", "output")},
+        "latency": summary,
+        "memory": {
+            "rss_start_mb": rss_start,
+            "rss_end_mb": rss_end,
+            "rss_peak_mb": max(sampler.samples) if sampler.samples else None,
+            "rss_growth_mb": (rss_end - rss_start) if rss_start and rss_end else None,
+        },
+    }
+
+
+def print_report(report: dict):
+    print("\n=== LOAD TEST REPORT ===")
+    for kind, stats in report["latency"].items():
+        latencies = " / ".join(f"{stats[key]:.2f}" if stats[key] is not None else "-"
+                               for key in ("p50_seconds", "p95_seconds", "p99_seconds"))
+        print(f"{kind:>9}: {stats['requests']} requests, {stats['throughput_rps']:.2f} req/s, "
+              f"p50/p95/p99 {latencies} s, {stats['error_rate']:.1%} errors")
+    memory = report["memory"]
+    if memory["rss_start_mb"] is not None:
+        print(f"   memory: RSS {memory['rss_start_mb']:.0f} MB -> {memory['rss_end_mb']:.0f} MB "
+              f"(peak {memory['rss_peak_mb']:.0f} MB, growth {memory['rss_growth_mb']:+.1f} MB)")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline load test of the AgentOS app with fake backends")
+    parser.add_argument("command", nargs="?", choices=["run", "serve"], default="run")
+    parser.add_argument("--profile", default="deep", help="Research profile whose app is served")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--workflow-ratio", type=float, default=0.1, help="Share of requests that are workflow runs")
+    parser.add_argument("--model-latency", type=float, default=1.0, help="Median fake model latency per call (s)")
+    parser.add_argument("--tool-latency", type=float, default=0.3, help="Median fake search latency per call (s)")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Lognormal sigma of fake latencies")
+    parser.add_argument("--tool-calls", type=int, default=1, help="Search calls the fake model makes per agent run")
+    parser.add_argument("--tool-error-rate", type=float, default=0.0, help="Injected fake provider failure rate")
+    parser.add_argument("--rate-limits", action="store_true", help="Keep the provider rate limits (rate_limit.py) on")
+    parser.add_argument("--timeout", type=float, default=600.0, help="Per-request timeout (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=0, help="Server port (default: a free port)")
+    parser.add_argument("--output", help="Write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        return serve(args)
+
+    report = run_load_test(args)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Report saved: {args.output}")
+    return 1 if report["latency"].get("all", {}).get("errors") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+Extractive pre-summarization of scraped pages
+Splits scraped text into passages, scores them against the drug/date/event
+terms and forwards only the best passages within a token budget, each tagged
+with its character offsets in the source text
+"""
+
+import os
+import re
+import threading
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from relevance import bm25_scores, query_terms
+from tool_hooks import current_research, wrap_tool, wrap_toolkit
+
+DEFAULT_TOKEN_BUDGET = int(os.getenv("DRUG_RESEARCH_SCRAPE_TOKEN_BUDGET", "1500"))
+
+# Terms for the event types the research agents report on
+EVENT_TERMS = [
+    'approval', 'approved', 'fda', 'label', 'indication', 'snda', 'sbla', 'pdufa', 'delay',
+    'safety', 'warning', 'adverse', 'recall', 'boxed', 'formulary', 'coverage', 'copay',
+    'reimbursement', 'guideline', 'trial', 'phase', 'endpoint', 'results', 'efficacy',
+    'real', 'world', 'evidence', 'launch', 'biosimilar', 'effective', 'date',
+]
+
+_PARAGRAPH = re.compile(r'\n\s*\n|\n')
+_SENTENCE = re.compile(r'(?<=[.!?])\s+')
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)"""
+    return (len(text) + 3) // 4
+
+
+def split_passages(text: str, target_words: int = 120) -> List[Tuple[int, int]]:
+    """Split text into (start, end) character spans of roughly ``target_words`` words"""
+    spans = []
+    position = 0
+    for separator in list(_PARAGRAPH.finditer(text)) + [None]:
+        end = separator.start() if separator else len(text)
+        if text[position:end].strip():
+            spans.append((position, end))
+        position = separator.end() if separator else len(text)
+
+    # Break long paragraphs at sentence boundaries
+    pieces = []
+    for start, end in spans:
+        if len(text[start:end].split()) <= target_words * 2:
+            pieces.append((start, end))
+            continue
+        piece_start = start
+        for boundary in _SENTENCE.finditer(text, start, end):
+            if len(text[piece_start:boundary.start()].split()) >= target_words:
+                pieces.append((piece_start, boundary.start()))
+                piece_start = boundary.end()
+        if text[piece_start:end].strip():
+            pieces.append((piece_start, end))
+
+    # Merge short neighbours so headings stay with their paragraph
+    passages: List[Tuple[int, int]] = []
+    for start, end in pieces:
+        if passages and len(text[passages[-1][0]:passages[-1][1]].split()) < target_words // 3:
+            passages[-1] = (passages[-1][0], end)
+        else:
+            passages.append((start, end))
+    return passages
+
+
+def select_passages(text: str, research_input, token_budget: int = DEFAULT_TOKEN_BUDGET) -> List[Tuple[int, int]]:
+    """Highest scoring passage spans that fit the budget, in document order"""
+    passages = split_passages(text)
+    terms: Dict[str, float] = {term: 1.0 for term in EVENT_TERMS}
+    terms.update(query_terms(research_input))
+    scores = bm25_scores([text[start:end] for start, end in passages], terms)
+
+    chosen = []
+    used = 0
+    for index in np.argsort(-scores, kind='stable'):
+        if scores[index] <= 0:
+            break
+        start, end = passages[index]
+        cost = estimate_tokens(text[start:end])
+        if used + cost > token_budget:
+            continue
+        chosen.append((start, end))
+        used += cost
+    return sorted(chosen)
+
+
+def condense_page(text: str, research_input, source: str = '', token_budget: int = DEFAULT_TOKEN_BUDGET) -> str:
+    """Return the selected passages of a scraped page with offsets back to the full text"""
+    if estimate_tokens(text) <= token_budget:
+        return text
+    if not text.strip():
+        # Whitespace only: there are no passages to select, and the padding is not worth forwarding
+        return ''
+    spans = select_passages(text, research_input, token_budget)
+    if not spans:
+        # No passage fits whole: forward the start of the best one
+        passages = split_passages(text)
+        best = passages[0]
+        if len(passages) > 1:
+            terms = {term: 1.0 for term in EVENT_TERMS}
+            terms.update(query_terms(research_input))
+            best = passages[int(np.argmax(bm25_scores([text[a:b] for a, b in passages], terms)))]
+        spans = [(best[0], min(best[1], best[0] + token_budget * 4))]
+    kept_tokens = sum(estimate_tokens(text[start:end]) for start, end in spans)
+    header = (f"[Extracted {len(spans)} most relevant passages (~{kept_tokens} of ~{estimate_tokens(text)} tokens)"
+              f"{' from ' + source if source else ''}. Offsets are character positions in the full page text.]")
+    body = [f"[chars {start}-{end}]\n{text[start:end].strip()}" for start, end in spans]
+    return header + "\n\n" + "\n\n".join(body)
+
+
+class PassageSelector:
+    """Condenses scraped pages for the active research input before they reach the model"""
+
+    def __init__(self, token_budget: int = DEFAULT_TOKEN_BUDGET):
+        self.token_budget = token_budget
+        self.stats = {'pages': 0, 'input_tokens': 0, 'forwarded_tokens': 0}
+        self._lock = threading.Lock()
+
+    def condense(self, output, source: str = ''):
+        research_input = current_research.get()
+        if research_input is None or not isinstance(output, str) or output.startswith('Error'):
+            return output
+        condensed = condense_page(output, research_input, source, self.token_budget)
+        with self._lock:
+            self.stats['pages'] += 1
+            self.stats['input_tokens'] += estimate_tokens(output)
+            self.stats['forwarded_tokens'] += estimate_tokens(condensed)
+        return condensed
+
+
+def condense_toolkit(toolkit, selector: PassageSelector):
+    """Condense every page a scraping toolkit returns"""
+
+    def condense(fn, *args, **kwargs):
+        source = str(args[0]) if args else str(next(iter(kwargs.values()), ''))
+        return selector.condense(fn(*args, **kwargs), source)
+
+    return wrap_toolkit(toolkit, lambda tool: wrap_tool(tool, condense))
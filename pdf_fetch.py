@@ -0,0 +1,255 @@
+"""
+Bounded-memory PDF fetching and page-range extraction
+PDFs are streamed to a size-capped file on disk, memory-mapped, and text is
+extracted lazily for the requested pages only, so peak memory stays flat no
+matter how large the label or FDA document is. The download cache is capped
+in total too: the least recently used files are evicted beyond
+DRUG_RESEARCH_PDF_CACHE_MB
+"""
+
+import contextlib
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+import httpx
+from agno.tools import Toolkit
+from pypdf import PdfReader
+
+PDF_CACHE_DIR = Path(os.getenv("DRUG_RESEARCH_PDF_CACHE", "research_cache/pdfs"))
+MAX_PDF_BYTES = int(float(os.getenv("DRUG_RESEARCH_PDF_MAX_MB", "100")) * 1024 * 1024)
+MAX_CACHE_BYTES = int(float(os.getenv("DRUG_RESEARCH_PDF_CACHE_MB", "1000")) * 1024 * 1024)
+MAX_PAGES_PER_CALL = int(os.getenv("DRUG_RESEARCH_PDF_MAX_PAGES", "10"))
+CHUNK_SIZE = 64 * 1024
+
+
+class PdfFetchError(Exception):
+    """Raised when a PDF cannot be downloaded or opened"""
+
+
+def parse_page_range(pages: str, page_count: int) -> List[int]:
+    """Parse "3", "1-3" or "2,5-7" into sorted zero-based page indexes"""
+    indexes = set()
+    for part in str(pages).replace(' ', '').split(','):
+        if not part:
+            continue
+        if '-' in part:
+            first, _, last = part.partition('-')
+            start = int(first) if first else 1
+            end = int(last) if last else page_count
+        else:
+            start = end = int(part)
+        for number in range(max(start, 1), min(end, page_count) + 1):
+            indexes.add(number - 1)
+    return sorted(indexes)
+
+
+def cached_path(url: str) -> Path:
+    return PDF_CACHE_DIR / f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}.pdf"
+
+
+def prune_cache(max_bytes: int = MAX_CACHE_BYTES, keep: Optional[Path] = None) -> int:
+    """Delete the least recently used cached PDFs (by mtime, refreshed on every hit) until the cache
+    fits in ``max_bytes``; ``keep`` is never deleted. Returns the number of files deleted"""
+    files = []
+    for path in PDF_CACHE_DIR.glob("*.pdf"):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in files)
+    deleted = 0
+    for _, size, path in sorted(files, key=lambda item: item[0]):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            path.unlink()
+        except OSError:
+            # Still mapped on platforms that lock open files; it goes on a later prune
+            continue
+        total -= size
+        deleted += 1
+    return deleted
+
+
+def download_pdf(url: str, client: Optional[httpx.Client] = None, max_bytes: int = MAX_PDF_BYTES) -> Path:
+    """Stream a PDF to the on-disk cache, enforcing a size cap, and return its path"""
+    PDF_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    path = cached_path(url)
+    if path.exists():
+        # Marks it recently used for prune_cache
+        with contextlib.suppress(OSError):
+            os.utime(path)
+        return path
+
+    handle, partial_name = tempfile.mkstemp(dir=PDF_CACHE_DIR, suffix='.part')
+    os.close(handle)
+    partial = Path(partial_name)
+    owns_client = client is None
+    client = client or httpx.Client(follow_redirects=True, timeout=60.0)
+    try:
+        with client.stream('GET', url) as response:
+            response.raise_for_status()
+            declared = int(response.headers.get('content-length') or 0)
+            if declared > max_bytes:
+                raise PdfFetchError(f"PDF is {declared / 1e6:.1f} MB, above the {max_bytes / 1e6:.0f} MB cap")
+            written = 0
+            with open(partial, 'wb') as f:
+                for chunk in response.iter_bytes(CHUNK_SIZE):
+                    written += len(chunk)
+                    if written > max_bytes:
+                        raise PdfFetchError(f"PDF exceeds the {max_bytes / 1e6:.0f} MB cap")
+                    f.write(chunk)
+        with open(partial, 'rb') as f:
+            if not f.read(1024).lstrip().startswith(b'%PDF'):
+                raise PdfFetchError("URL did not return a PDF document")
+        partial.replace(path)
+        prune_cache(keep=path)
+        return path
+    except httpx.HTTPError as e:
+        raise PdfFetchError(f"Download failed: {e}") from e
+    finally:
+        partial.unlink(missing_ok=True)
+        if owns_client:
+            client.close()
+
+
+class MappedPdf:
+    """A memory-mapped PDF whose pages are parsed only when requested"""
+
+    def __init__(self, path: Path):
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            self._file.close()
+            path.unlink(missing_ok=True)
+            raise PdfFetchError(f"Cannot map the cached PDF: {e}") from e
+        try:
+            self.reader = PdfReader(self._map)
+            # Encrypted documents are readable only if they open with an empty password
+            if self.reader.is_encrypted and not self.reader.decrypt(""):
+                raise PdfFetchError("PDF is password protected")
+        except Exception as e:
+            # A corrupt or locked file would fail the same way on every later call: drop it from the cache
+            self.close()
+            path.unlink(missing_ok=True)
+            if isinstance(e, PdfFetchError):
+                raise
+            raise PdfFetchError(f"Not a readable PDF: {e}") from e
+        # The reader seeks one shared stream, so pages are parsed one call at a time
+        self._lock = threading.Lock()
+        # Tool calls using the document; an evicted document is closed once the last one is done
+        self.readers = 0
+        self.evicted = False
+
+    @property
+    def page_count(self) -> int:
+        with self._lock:
+            return len(self.reader.pages)
+
+    def extract_pages(self, indexes: List[int]) -> List[str]:
+        with self._lock:
+            return [self.reader.pages[i].extract_text() or '' for i in indexes]
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+class PdfTools(Toolkit):
+    """Agent tools for reading specific pages of PDF documents"""
+
+    def __init__(self, client: Optional[httpx.Client] = None, max_open: int = 4, **kwargs):
+        self.client = client
+        self.max_open = max_open
+        self._open: 'OrderedDict[str, MappedPdf]' = OrderedDict()
+        self._lock = threading.Lock()
+        super().__init__(name="pdf_tools", tools=[self.get_pdf_page_count, self.read_pdf_pages], **kwargs)
+
+    @contextlib.contextmanager
+    def _document(self, url: str) -> Iterator[MappedPdf]:
+        """The open document of a URL, held open for the duration of the block even if another
+        call evicts it meanwhile (the least recently used maps beyond ``max_open`` are closed)"""
+        with self._lock:
+            document = self._open.get(url)
+            if document is not None:
+                self._open.move_to_end(url)
+                document.readers += 1
+        if document is None:
+            opened = MappedPdf(download_pdf(url, self.client))
+            with self._lock:
+                document = self._open.get(url)
+                if document is None:
+                    # Another call may have opened the same URL meanwhile; the first one is kept
+                    document, opened = opened, None
+                    self._open[url] = document
+                document.readers += 1
+                idle = self._evict()
+            for evicted in idle + ([opened] if opened else []):
+                evicted.close()
+        try:
+            yield document
+        finally:
+            with self._lock:
+                document.readers -= 1
+                idle = document.evicted and document.readers == 0
+            if idle:
+                document.close()
+
+    def _evict(self) -> List[MappedPdf]:
+        """Drop the least recently used documents beyond ``max_open`` (lock held); returns the dropped
+        ones no call is using, which the caller closes outside the lock"""
+        idle = []
+        while len(self._open) > self.max_open:
+            document = self._open.popitem(last=False)[1]
+            document.evicted = True
+            if document.readers == 0:
+                idle.append(document)
+        return idle
+
+    def get_pdf_page_count(self, url: str) -> str:
+        """Get the number of pages of a PDF document without reading its text.
+
+        Args:
+            url (str): Direct URL of the PDF.
+
+        Returns:
+            str: Page count, or an error message.
+        """
+        try:
+            with self._document(url) as document:
+                return f"{url} has {document.page_count} pages"
+        except Exception as e:
+            return f"Error: could not open PDF {url}: {e}"
+
+    def read_pdf_pages(self, url: str, pages: str = "1-3") -> str:
+        """Extract text from specific pages of a PDF (e.g. labels, FDA letters).
+        Request only the pages you need; cite them as "see p.N" in your findings.
+
+        Args:
+            url (str): Direct URL of the PDF.
+            pages (str): Page numbers to read, e.g. "3", "1-3" or "2,5-7" (max 10 pages per call).
+
+        Returns:
+            str: Text of each requested page prefixed with its page number, or an error message.
+        """
+        try:
+            with self._document(url) as document:
+                page_count = document.page_count
+                indexes = parse_page_range(pages, page_count)[:MAX_PAGES_PER_CALL]
+                if not indexes:
+                    return f"Error: no pages in range '{pages}' (document has {page_count} pages)"
+                texts = document.extract_pages(indexes)
+        except Exception as e:
+            return f"Error: could not read PDF {url}: {e}"
+        header = f"PDF {url} ({page_count} pages)"
+        return header + "\n\n" + "\n\n".join(f"[Page {i + 1}]\n{text.strip()}" for i, text in zip(indexes, texts))
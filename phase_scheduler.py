@@ -0,0 +1,303 @@
+"""
+Makespan-aware scheduling of Phase 1 research agents
+Records how long each research agent takes and dispatches agent runs
+longest-expected-first (LPT) within a concurrency cap, across every run of a
+batch, so the slowest agents start first and the last one finishes sooner.
+The simulator replays latencies recorded in run_report.json files under
+submission order and LPT order to show the gain
+
+Usage:
+    python phase_scheduler.py simulate agent_outputs/ --concurrency 2 3 4
+"""
+
+import argparse
+import contextvars
+import heapq
+import itertools
+import os
+import sqlite3
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import CancelledError
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_LATENCY_DB = os.getenv("DRUG_RESEARCH_LATENCY_DB", "research_cache/agent_latency.db")
+
+# Phase 1 agents running at once (1 = one after another)
+PHASE_ONE_CONCURRENCY = int(os.getenv("DRUG_RESEARCH_PHASE1_CONCURRENCY", "1"))
+
+# Latest runs per agent whose median is the expected latency
+LATENCY_WINDOW = 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS agent_latency (
+    id INTEGER PRIMARY KEY,
+    agent TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    recorded_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_agent_latency_agent ON agent_latency(agent, id);
+"""
+
+
+class LatencyHistory:
+    """SQLite log of agent run durations, keyed by agent and model"""
+
+    def __init__(self, path: str = DEFAULT_LATENCY_DB, window: int = LATENCY_WINDOW):
+        self.path = path
+        self.window = window
+        if path != ':memory:':
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    def record(self, agent: str, seconds: float):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO agent_latency (agent, seconds, recorded_at) VALUES (?, ?, ?)",
+                               (agent, seconds, datetime.now().isoformat(timespec='seconds')))
+
+    def expected(self, agent: str) -> Optional[float]:
+        """Median of the agent's recent durations (None if it never ran)"""
+        with self._lock:
+            rows = self._conn.execute("SELECT seconds FROM agent_latency WHERE agent = ? ORDER BY id DESC LIMIT ?",
+                                      (agent, self.window)).fetchall()
+        return statistics.median(seconds for seconds, in rows) if rows else None
+
+
+# ========== SCHEDULER ==========
+
+@dataclass
+class PhaseJob:
+    """One agent run to schedule; ``key`` identifies the agent (and model) in the latency history"""
+    key: str
+    fn: Callable[[], object]
+    expected: float = 0.0
+    result: object = None
+    error: Optional[BaseException] = None
+    seconds: float = 0.0
+    # Called on the worker thread as soon as the job has finished (e.g. to start its downstream work)
+    on_done: Optional[Callable[['PhaseJob'], None]] = None
+
+
+class LptScheduler:
+    """Runs PhaseJobs on ``concurrency`` worker threads, longest expected latency first.
+    With ``submitters`` > 1 (a batch), dispatch waits until that many callers have submitted
+    their last jobs, or ``gate_timeout`` seconds after the first submission, so LPT ordering
+    spans the batch; a single submitter's jobs start as soon as they are queued"""
+
+    def __init__(self, concurrency: int = PHASE_ONE_CONCURRENCY, history: Optional[LatencyHistory] = None,
+                 submitters: int = 1, gate_timeout: float = 5.0):
+        self.concurrency = max(1, concurrency)
+        self.history = history
+        self.gate_timeout = gate_timeout
+        self._awaiting = submitters if submitters > 1 else 0
+        self._gate_deadline: Optional[float] = None
+        self._heap: List[Tuple[float, int, PhaseJob, threading.Event]] = []
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+        self._workers: List[threading.Thread] = []
+        self._closed = False
+
+    def expected_latency(self, key: str, submitting: Sequence[str] = ()) -> float:
+        """Historical median; agents without history rank as the longest known one, queued or
+        ``submitting`` together with them, so they start early"""
+        expected = self.history.expected(key) if self.history else None
+        if expected is not None:
+            return expected
+        known = [self.history.expected(other) for other in submitting] if self.history else []
+        return max([job.expected for _, _, job, _ in self._heap] + [value for value in known if value is not None],
+                   default=0.0) + 1.0
+
+    def run(self, jobs: Sequence[PhaseJob]) -> List[PhaseJob]:
+        """Queue jobs, block until all have finished and return them in submission order.
+        The first job error is re-raised once every job is done"""
+        for done in self.submit(jobs):
+            done.wait()
+        for job in jobs:
+            if job.error is not None:
+                raise job.error
+        return list(jobs)
+
+    def submit(self, jobs: Sequence[PhaseJob], last: bool = True) -> List[threading.Event]:
+        """Queue jobs without waiting; returns an event per job, set once it has finished.
+        Callers submitting their jobs in several calls pass ``last`` False on all but the final one"""
+        done_events = []
+        with self._cond:
+            self._start_workers()
+            keys = [job.key for job in jobs]
+            for job in jobs:
+                job.expected = self.expected_latency(job.key, keys)
+                # Each job runs in a copy of the caller's context (active research input, tool meter)
+                job.fn = _in_context(contextvars.copy_context(), job.fn)
+                done = threading.Event()
+                heapq.heappush(self._heap, (-job.expected, next(self._order), job, done))
+                done_events.append(done)
+            if last:
+                self._awaiting = max(0, self._awaiting - 1)
+            if self._gate_deadline is None:
+                self._gate_deadline = time.monotonic() + self.gate_timeout
+            self._cond.notify_all()
+        return done_events
+
+    def cancel(self, jobs: Optional[Sequence[PhaseJob]] = None) -> int:
+        """Drop queued jobs (default: all of them) so they never run; each fails with CancelledError
+        and is finished as usual. Jobs already running are left alone. Returns the number dropped"""
+        with self._cond:
+            drop = set(map(id, jobs)) if jobs is not None else None
+            cancelled = [entry for entry in self._heap if drop is None or id(entry[2]) in drop]
+            self._heap = [entry for entry in self._heap if drop is not None and id(entry[2]) not in drop]
+            heapq.heapify(self._heap)
+        for _, _, job, done in cancelled:
+            job.error = CancelledError(f"{job.key} was cancelled before it started")
+            self._finish(job, done)
+        return len(cancelled)
+
+    def close(self, cancel: bool = False):
+        """Stop the workers once the queued jobs have run; with ``cancel`` they are dropped instead"""
+        if cancel:
+            self.cancel()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for worker in self._workers:
+            worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        # After a failure the queued agents would only spend model calls on a run that is given up
+        self.close(cancel=exc_type is not None)
+
+    def _start_workers(self):
+        if self._workers:
+            return
+        for i in range(self.concurrency):
+            worker = threading.Thread(target=self._work, name=f"phase-one-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def _gate_open(self) -> bool:
+        return self._awaiting == 0 or (self._gate_deadline is not None and time.monotonic() >= self._gate_deadline)
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._closed and not (self._heap and self._gate_open()):
+                    timeout = None
+                    if self._heap and self._gate_deadline is not None:
+                        timeout = max(0.0, self._gate_deadline - time.monotonic())
+                    self._cond.wait(timeout)
+                if not self._heap:
+                    return
+                _, _, job, done = heapq.heappop(self._heap)
+            started = time.perf_counter()
+            try:
+                job.result = job.fn()
+            except BaseException as e:
+                job.error = e
+            job.seconds = time.perf_counter() - started
+            if self.history and job.error is None:
+                try:
+                    self.history.record(job.key, job.seconds)
+                except sqlite3.Error as e:
+                    print(f"   ⚠️ Latency history update failed: {e}")
+            self._finish(job, done)
+
+    def _finish(self, job: PhaseJob, done: threading.Event):
+        if job.on_done is not None:
+            try:
+                job.on_done(job)
+            except Exception as e:
+                print(f"   ⚠️ Job completion callback failed: {e}")
+        done.set()
+
+
+def _in_context(context: contextvars.Context, fn: Callable[[], object]) -> Callable[[], object]:
+    return lambda: context.run(fn)
+
+
+# ========== SIMULATION ==========
+
+def simulate_makespan(durations: Sequence[float], order: Sequence[int], concurrency: int) -> float:
+    """Makespan of running jobs with the given durations in ``order`` on ``concurrency`` workers"""
+    workers = [0.0] * max(1, concurrency)
+    for index in order:
+        start = heapq.heappop(workers)
+        heapq.heappush(workers, start + durations[index])
+    return max(workers)
+
+
+def simulate_batch(batch: List[List[Tuple[str, float]]], concurrency: int,
+                   expected: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """Makespan of a batch of runs (each a list of (agent, seconds) in Phase 1 order) dispatched in
+    submission order vs. LPT by expected latency (default: the median recorded latency per agent)"""
+    jobs = [job for run in batch for job in run]
+    if expected is None:
+        per_agent: Dict[str, List[float]] = {}
+        for agent, seconds in jobs:
+            per_agent.setdefault(agent, []).append(seconds)
+        expected = {agent: statistics.median(samples) for agent, samples in per_agent.items()}
+    durations = [seconds for _, seconds in jobs]
+    fifo = list(range(len(jobs)))
+    lpt = sorted(fifo, key=lambda i: -expected.get(jobs[i][0], 0.0))
+    fifo_makespan = simulate_makespan(durations, fifo, concurrency)
+    lpt_makespan = simulate_makespan(durations, lpt, concurrency)
+    return {
+        "jobs": len(jobs),
+        "concurrency": concurrency,
+        "fifo_seconds": fifo_makespan,
+        "lpt_seconds": lpt_makespan,
+        "lower_bound_seconds": max(sum(durations) / max(1, concurrency), max(durations, default=0.0)),
+        "saving": 1 - lpt_makespan / fifo_makespan if fifo_makespan else 0.0,
+    }
+
+
+def phase_one_latencies(report: dict) -> List[Tuple[str, float]]:
+    """(agent, seconds) of a run report's research agents, in Phase 1 order"""
+    research_phases = report.get("agent_modes") or {}
+    return [(phase["agent"], phase["wall_seconds"]) for name, phase in report["phases"].items()
+            if name in research_phases and phase.get("agent")]
+
+
+# ========== CLI ==========
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from run_report import load_reports
+
+    parser = argparse.ArgumentParser(description="Phase 1 scheduling tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    simulate_parser = commands.add_parser("simulate", help="Replay recorded agent latencies under FIFO and LPT order")
+    simulate_parser.add_argument("paths", nargs="+", help="run_report.json files or directories containing them")
+    simulate_parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 3, 4, 7])
+    simulate_parser.add_argument("--batch-size", type=int, default=0,
+                                 help="Runs dispatched together (default: all reports as one batch)")
+    args = parser.parse_args(argv)
+
+    runs = [latencies for latencies in map(phase_one_latencies, load_reports(args.paths)) if latencies]
+    if not runs:
+        print("❌ No run reports with Phase 1 agents found")
+        return 1
+    batch_size = args.batch_size or len(runs)
+    batches = [runs[i:i + batch_size] for i in range(0, len(runs), batch_size)]
+    print(f"⏱️ {len(runs)} runs in {len(batches)} batches of up to {batch_size}")
+    print(f"{'concurrency':>11} {'FIFO s':>9} {'LPT s':>9} {'bound s':>9} {'saving':>7}")
+    for concurrency in args.concurrency:
+        results = [simulate_batch(batch, concurrency) for batch in batches]
+        fifo = sum(result["fifo_seconds"] for result in results)
+        lpt = sum(result["lpt_seconds"] for result in results)
+        bound = sum(result["lower_bound_seconds"] for result in results)
+        print(f"{concurrency:>11} {fifo:>9.1f} {lpt:>9.1f} {bound:>9.1f} {1 - lpt / fifo if fifo else 0:>7.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
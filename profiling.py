@@ -0,0 +1,236 @@
+"""
+Opt-in CPU and memory profiling of workflow runs
+With DRUG_RESEARCH_PROFILING=1 (or research_cli.py --profiling) every stage of
+a run's graph is profiled with cProfile on the thread it runs on, and a
+tracemalloc snapshot diff shows its top allocation sites. Each Phase 1 agent
+gets its own CPU profile from the scheduler thread it runs in. The results are
+written to agent_outputs/<run>/profile/:
+    NN_<stage>.prof        cProfile stats (python -m pstats, snakeviz)
+    NN_<stage>.txt         top functions by cumulative time and top allocation sites
+    profile_summary.json   peak traced memory of the run, wall time, hot spots and memory of every stage
+
+tracemalloc is process-wide: the memory figures of stages running alongside
+each other (in one run or in overlapping runs of a batch) include each other's
+allocations
+
+From Python 3.12, cProfile is built on sys.monitoring and only one profiler can
+be active in a process, whatever thread it runs on. There, stages are CPU
+profiled one at a time: a stage that starts while another is being profiled
+(or while another profiling tool is active) only gets its wall time and
+memory figures, and its summary entry has no .prof file
+
+Usage:
+    DRUG_RESEARCH_PROFILING=1 python test_multi_tools.py
+    python profiling.py show agent_outputs/Dupixent_Sanofi_20251019_101500
+"""
+
+import argparse
+import contextlib
+import cProfile
+import io
+import itertools
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PROFILING = os.getenv("DRUG_RESEARCH_PROFILING", "0") == "1"
+# Functions and allocation sites listed per phase
+PROFILE_TOP = int(os.getenv("DRUG_RESEARCH_PROFILING_TOP", "25"))
+# Stack frames kept per traced allocation (more frames = more detail and more overhead)
+PROFILE_FRAMES = int(os.getenv("DRUG_RESEARCH_PROFILING_FRAMES", "1"))
+
+PROFILE_DIR = "profile"
+SUMMARY_FILE = "profile_summary.json"
+
+# Allocations of the profiler itself, left out of the memory report
+_SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, cProfile.__file__),
+    tracemalloc.Filter(False, pstats.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+# Python 3.12+ allows one active cProfile.Profile per process (sys.monitoring), older versions one per thread
+ONE_PROFILER_PER_PROCESS = sys.version_info >= (3, 12)
+_cpu_profile_lock = threading.Lock()
+
+
+def _start_cpu_profile() -> Optional[cProfile.Profile]:
+    """An enabled profiler for the current thread, or None if another one holds the process"""
+    if ONE_PROFILER_PER_PROCESS and not _cpu_profile_lock.acquire(blocking=False):
+        return None
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # "Another profiling tool is already active", e.g. a debugger or an outer profiler
+        if ONE_PROFILER_PER_PROCESS:
+            _cpu_profile_lock.release()
+        return None
+    return profile
+
+
+def _stop_cpu_profile(profile: cProfile.Profile):
+    profile.disable()
+    if ONE_PROFILER_PER_PROCESS:
+        _cpu_profile_lock.release()
+
+
+# Profilers of concurrent runs share one tracemalloc session, stopped when the last of them closes
+# (and never if something else had already started tracing)
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_owned = False
+
+
+def _acquire_tracing(frames: int):
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            _tracing_owned = True
+        _tracing_users += 1
+
+
+def _release_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_owned:
+            tracemalloc.stop()
+            _tracing_owned = False
+
+
+def _slug(name: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+
+
+def top_functions(profile: cProfile.Profile, limit: int) -> List[dict]:
+    """The ``limit`` functions with the highest cumulative time"""
+    stats = pstats.Stats(profile)
+    rows = []
+    for (filename, line, function), (_, calls, own, cumulative, _) in stats.stats.items():
+        rows.append({"function": f"{function} ({os.path.basename(filename)}:{line})", "calls": calls,
+                     "own_seconds": round(own, 4), "cumulative_seconds": round(cumulative, 4)})
+    rows.sort(key=lambda row: row["cumulative_seconds"], reverse=True)
+    return rows[:limit]
+
+
+def top_allocations(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, limit: int) -> List[dict]:
+    """The ``limit`` source lines whose net allocated memory grew the most between two snapshots"""
+    diffs = after.filter_traces(_SNAPSHOT_FILTERS).compare_to(before.filter_traces(_SNAPSHOT_FILTERS), 'lineno')
+    return [{"site": f"{diff.traceback[0].filename}:{diff.traceback[0].lineno}", "size_kb": round(diff.size / 1024, 1),
+             "size_diff_kb": round(diff.size_diff / 1024, 1), "count_diff": diff.count_diff}
+            for diff in diffs[:limit]]
+
+
+class RunProfiler:
+    """Profiles the stages of one run into <run dir>/profile/, each on the thread it runs on"""
+
+    def __init__(self, run_dir: Path, top: int = PROFILE_TOP, frames: int = PROFILE_FRAMES):
+        self.directory = Path(run_dir) / PROFILE_DIR
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.top = top
+        self.phases: Dict[str, dict] = {}
+        self._order = itertools.count(1)
+        self._lock = threading.Lock()
+        _acquire_tracing(frames)
+        tracemalloc.reset_peak()
+
+    @contextlib.contextmanager
+    def phase(self, name: str, memory: bool = True):
+        """CPU profile of a block on the current thread (when no other stage holds the profiler, see
+        above) and, with ``memory``, the allocations made while it ran (process-wide, so including
+        those of stages running alongside it)"""
+        before = tracemalloc.take_snapshot() if memory else None
+        started = time.perf_counter()
+        profile = _start_cpu_profile()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                _stop_cpu_profile(profile)
+            seconds = time.perf_counter() - started
+            report = None
+            if memory:
+                after = tracemalloc.take_snapshot()
+                report = {
+                    "allocated_mb": round(sum(diff.size_diff for diff in after.compare_to(before, 'filename')) / 1e6, 2),
+                    "top_allocations": top_allocations(before, after, self.top),
+                }
+            self._write(name, profile, seconds, report)
+
+    def _write(self, name: str, profile: Optional[cProfile.Profile], seconds: float, memory: Optional[dict]):
+        with self._lock:
+            stem = f"{next(self._order):02d}_{_slug(name)}"
+        phase = {"file": None, "wall_seconds": round(seconds, 4), "top_functions": []}
+        if memory is not None:
+            phase["memory"] = memory
+
+        report = io.StringIO()
+        if profile is not None:
+            profile.dump_stats(self.directory / f"{stem}.prof")
+            phase.update(file=f"{stem}.prof", top_functions=top_functions(profile, self.top))
+            pstats.Stats(profile, stream=report).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+        else:
+            report.write(f"No CPU profile: another profiler was active (wall time {seconds:.4f}s)\n")
+        if memory is not None:
+            report.write(f"\nNet allocated: {memory['allocated_mb']} MB\nTop allocation sites:\n")
+            for allocation in memory["top_allocations"]:
+                report.write(f"  {allocation['size_diff_kb']:>+10.1f} KB  {allocation['count_diff']:>+8}  {allocation['site']}\n")
+        (self.directory / f"{stem}.txt").write_text(report.getvalue(), encoding='utf-8')
+        with self._lock:
+            self.phases[name] = phase
+
+    def close(self) -> Path:
+        """Write the summary with the run's peak traced memory and stop tracing; returns the profile directory"""
+        _, peak = tracemalloc.get_traced_memory()
+        _release_tracing()
+        with open(self.directory / SUMMARY_FILE, 'w', encoding='utf-8') as f:
+            json.dump({"peak_traced_mb": round(peak / 1e6, 2), "phases": self.phases}, f, indent=2)
+        return self.directory
+
+
+# ========== CLI ==========
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Summarize the profiles of a profiled run")
+    commands = parser.add_subparsers(dest="command", required=True)
+    show_parser = commands.add_parser("show", help="Hot spots and memory per stage of a run")
+    show_parser.add_argument("run_dir")
+    show_parser.add_argument("--top", type=int, default=5, help="Functions and allocation sites per stage")
+    args = parser.parse_args(argv)
+
+    path = Path(args.run_dir) / PROFILE_DIR / SUMMARY_FILE
+    if not path.exists():
+        print(f"❌ No {PROFILE_DIR}/{SUMMARY_FILE} in {args.run_dir} (run with DRUG_RESEARCH_PROFILING=1)")
+        return 1
+    with open(path, encoding='utf-8') as f:
+        summary = json.load(f)
+    if "peak_traced_mb" in summary:
+        print(f"🔬 Peak traced memory: {summary['peak_traced_mb']} MB")
+    for name, phase in summary["phases"].items():
+        memory = phase.get("memory")
+        print(f"\n🔬 {name}: {phase['wall_seconds']:.2f}s" +
+              (f", net {memory['allocated_mb']:+} MB" if memory else "") +
+              f" ({phase['file'] or 'no CPU profile'})")
+        for function in phase["top_functions"][:args.top]:
+            print(f"   {function['cumulative_seconds']:>9.3f}s {function['calls']:>8}  {function['function']}")
+        for allocation in (memory or {}).get("top_allocations", [])[:args.top]:
+            print(f"   {allocation['size_diff_kb']:>+9.1f}KB {allocation['count_diff']:>+8}  {allocation['site']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,343 @@
+"""
+Row provenance: which fetched document and passage each finding came from
+Every search hit, scraped page and PDF extract is appended once (deduplicated
+by content hash) to an append-only blob file, with its offset, length and URL
+in SQLite. Final rows are linked to (document ID, byte range) of their best
+evidence passage, found by scanning the memory-mapped document for the row's
+distinctive terms, so an audit shows the source passage instantly without a
+refetch or copying whole documents into Python strings
+
+Usage:
+    python provenance_store.py stats
+    python provenance_store.py audit --run-id Dupixent_Sanofi_20251019_101500
+    python provenance_store.py show <row signature>
+"""
+
+import argparse
+import hashlib
+import mmap
+import os
+import re
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from research_schema import canonicalize_url, row_signature
+from tool_hooks import current_research, parse_search_results, wrap_tool, wrap_toolkit
+
+DEFAULT_PROVENANCE_DIR = os.getenv("DRUG_RESEARCH_PROVENANCE_DIR", "research_cache/provenance")
+
+# Set DRUG_RESEARCH_PROVENANCE=0 to stop storing documents and linking rows
+PROVENANCE = os.getenv("DRUG_RESEARCH_PROVENANCE", "1") == "1"
+
+# Bytes of the evidence window scored around term hits, and how far it may grow to a sentence boundary
+EVIDENCE_WINDOW = 600
+SENTENCE_SLACK = 200
+# Distinctive terms taken from a row to locate its evidence
+MAX_TERMS = 40
+
+# Row columns whose words identify the evidence: Date, Development Summary, Detailed Description
+EVIDENCE_COLUMNS = (2, 7, 8)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    canonical_url TEXT NOT NULL,
+    sha1 TEXT NOT NULL UNIQUE,
+    blob_offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    source TEXT,
+    kind TEXT,
+    drug TEXT,
+    fetched_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_documents_canonical_url ON documents(canonical_url, id);
+CREATE TABLE IF NOT EXISTS evidence (
+    id INTEGER PRIMARY KEY,
+    row_signature TEXT NOT NULL,
+    run_id TEXT,
+    document_id INTEGER NOT NULL REFERENCES documents(id),
+    byte_start INTEGER NOT NULL,
+    byte_end INTEGER NOT NULL,
+    matched_terms INTEGER NOT NULL,
+    drug TEXT,
+    date TEXT,
+    summary TEXT,
+    linked_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_evidence_signature ON evidence(row_signature);
+CREATE INDEX IF NOT EXISTS idx_evidence_run ON evidence(run_id);
+"""
+
+# A row is linked to a passage once; stores created before the constraint are deduplicated first
+_EVIDENCE_UNIQUE = """
+DELETE FROM evidence WHERE id NOT IN (
+    SELECT MIN(id) FROM evidence GROUP BY row_signature, document_id, byte_start, byte_end);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_evidence_unique ON evidence(row_signature, document_id, byte_start, byte_end);
+"""
+
+_URL = re.compile(r'https?://[^\s)\]>|"]+')
+_WORD = re.compile(r'[A-Za-z][A-Za-z0-9-]{3,}|\d[\d.,%-]*\d')
+_STOPWORDS = {
+    'with', 'from', 'that', 'this', 'were', 'which', 'their', 'have', 'been', 'will', 'also', 'after', 'into',
+    'than', 'more', 'other', 'such', 'over', 'under', 'about', 'available', 'based', 'patients', 'data',
+}
+_SENTENCE_END = re.compile(rb'[.!?]\s|\n')
+
+
+def row_urls(row: Sequence[str]) -> List[str]:
+    """Canonical URLs cited in a row's URL column (plain or markdown links)"""
+    return [canonicalize_url(url) for url in _URL.findall(str(row[-1]))] if row else []
+
+
+def evidence_terms(row: Sequence[str]) -> List[bytes]:
+    """Distinctive words and numbers of a row, longest first"""
+    words = []
+    for column in EVIDENCE_COLUMNS:
+        if column < len(row):
+            words.extend(_WORD.findall(str(row[column])))
+    unique = {word.lower(): word for word in words if word.lower() not in _STOPWORDS}
+    ranked = sorted(unique, key=len, reverse=True)[:MAX_TERMS]
+    return [word.encode('utf-8') for word in ranked]
+
+
+def best_window(hits: List[Tuple[int, bytes]], window: int = EVIDENCE_WINDOW) -> Tuple[int, int, int]:
+    """(start, end, distinct terms) of the ``window``-byte span covering the most distinct terms"""
+    best = (0, 0, 0)
+    left = 0
+    counts: Dict[bytes, int] = {}
+    for position, term in hits:
+        counts[term] = counts.get(term, 0) + 1
+        while position - hits[left][0] > window:
+            left_term = hits[left][1]
+            counts[left_term] -= 1
+            if not counts[left_term]:
+                del counts[left_term]
+            left += 1
+        if len(counts) > best[2]:
+            best = (hits[left][0], position + len(term), len(counts))
+    return best
+
+
+class ProvenanceStore:
+    """Append-only blob file of fetched documents plus SQLite metadata and row evidence links"""
+
+    def __init__(self, directory: str = DEFAULT_PROVENANCE_DIR):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.blob_path = self.directory / "documents.blob"
+        self.blob_path.touch(exist_ok=True)
+        # Transactions are managed explicitly: BEGIN IMMEDIATE serialises blob appends across processes
+        self._conn = sqlite3.connect(str(self.directory / "provenance.db"), timeout=30, isolation_level=None,
+                                     check_same_thread=False)
+        self._lock = threading.Lock()
+        self._map: Optional[mmap.mmap] = None
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            if not self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'idx_evidence_unique'").fetchone():
+                self._conn.executescript(f"BEGIN IMMEDIATE; {_EVIDENCE_UNIQUE} COMMIT;")
+        self.stats = {'documents': 0, 'duplicates': 0, 'linked': 0, 'unlinked': 0}
+
+    # ---------- documents ----------
+
+    def add_document(self, url: str, content: str, source: str = '', kind: str = 'page') -> Optional[int]:
+        """Store a document once (by content hash); returns its ID"""
+        if not url or not content:
+            return None
+        data = content.encode('utf-8')
+        digest = hashlib.sha1(data).hexdigest()
+        research_input = current_research.get()
+        with self._lock:
+            row = self._conn.execute("SELECT id FROM documents WHERE sha1 = ?", (digest,)).fetchone()
+            if row:
+                self.stats['duplicates'] += 1
+                return row[0]
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Another process may have stored it between the check and the lock
+                row = self._conn.execute("SELECT id FROM documents WHERE sha1 = ?", (digest,)).fetchone()
+                if row is None:
+                    with open(self.blob_path, 'ab') as f:
+                        offset = f.tell()
+                        f.write(data)
+                    row = (self._conn.execute(
+                        "INSERT INTO documents (url, canonical_url, sha1, blob_offset, length, source, kind, drug, fetched_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (url, canonicalize_url(url), digest, offset, len(data), source, kind,
+                         research_input.drug_name if research_input else '',
+                         datetime.now().isoformat(timespec='seconds'))).lastrowid,)
+                    self.stats['documents'] += 1
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return row[0]
+
+    def _mapped(self, end: int) -> mmap.mmap:
+        """A read-only map of the blob file covering at least ``end`` bytes (remapped as the file grows)"""
+        with self._lock:
+            if self._map is None or len(self._map) < end:
+                with open(self.blob_path, 'rb') as f:
+                    # The previous map is left to the garbage collector: callers may still hold views into it
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._map
+
+    def _location(self, document_id: int) -> Tuple[int, int]:
+        with self._lock:
+            row = self._conn.execute("SELECT blob_offset, length FROM documents WHERE id = ?", (document_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"No document {document_id}")
+        return row
+
+    def view(self, document_id: int, start: int = 0, end: Optional[int] = None) -> memoryview:
+        """Zero-copy view of a document's bytes (or of the byte range [start, end) within it)"""
+        offset, length = self._location(document_id)
+        end = length if end is None else min(end, length)
+        return memoryview(self._mapped(offset + length))[offset + start:offset + end]
+
+    def passage(self, document_id: int, start: int, end: int) -> str:
+        """Text of a byte range of a document (only that range is decoded)"""
+        return bytes(self.view(document_id, start, end)).decode('utf-8', errors='replace')
+
+    def documents_for_url(self, url: str) -> List[int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT id FROM documents WHERE canonical_url = ? ORDER BY id DESC",
+                                      (canonicalize_url(url),)).fetchall()
+        return [document_id for document_id, in rows]
+
+    # ---------- evidence ----------
+
+    def locate(self, document_id: int, terms: List[bytes]) -> Optional[Tuple[int, int, int]]:
+        """(start, end, distinct terms) of the best evidence passage in a document, scanned in place"""
+        if not terms:
+            return None
+        offset, length = self._location(document_id)
+        blob = self._mapped(offset + length)
+        pattern = re.compile(b'|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+        hits = [(match.start() - offset, match.group().lower()) for match in pattern.finditer(blob, offset, offset + length)]
+        if not hits:
+            return None
+        start, end, matched = best_window(hits)
+        # Widen to sentence boundaries, within a bounded slack
+        before = blob.rfind(b'\n', max(offset, offset + start - SENTENCE_SLACK), offset + start)
+        sentence_end = _SENTENCE_END.search(blob, offset + end, min(offset + length, offset + end + SENTENCE_SLACK))
+        start = before - offset + 1 if before >= 0 else max(0, start - SENTENCE_SLACK // 4)
+        end = sentence_end.end() - offset if sentence_end else min(length, end + SENTENCE_SLACK // 4)
+        return start, end, matched
+
+    def link_rows(self, rows: Sequence[Sequence[str]], run_id: str = '') -> int:
+        """Link each row to the best passage among the stored documents of its cited URLs; returns rows linked.
+        A row already linked to the same passage (by an earlier run) keeps its first link"""
+        links = []
+        for row in rows:
+            terms = evidence_terms(row)
+            best = None
+            for url in row_urls(row):
+                for document_id in self.documents_for_url(url):
+                    found = self.locate(document_id, terms)
+                    if found and (best is None or found[2] > best[3]):
+                        best = (document_id, *found)
+            if best is None:
+                self.stats['unlinked'] += 1
+                continue
+            links.append((row_signature(row), run_id, *best, row[3] if len(row) > 3 else '',
+                          row[2] if len(row) > 2 else '', row[7] if len(row) > 7 else '',
+                          datetime.now().isoformat(timespec='seconds')))
+        if not links:
+            return 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO evidence (row_signature, run_id, document_id, byte_start, byte_end, matched_terms, drug, date, "
+                "summary, linked_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", links)
+            self._conn.execute("COMMIT")
+        self.stats['linked'] += len(links)
+        return len(links)
+
+    def evidence(self, signature: Optional[str] = None, run_id: Optional[str] = None) -> List[dict]:
+        """Evidence links of a row signature and/or run, newest first, with document URL and location"""
+        sql = ("SELECT e.row_signature, e.run_id, e.document_id, e.byte_start AS start, e.byte_end AS end, e.matched_terms, e.drug, e.date, "
+               "e.summary, d.url FROM evidence e JOIN documents d ON d.id = e.document_id WHERE 1 = 1")
+        params = []
+        if signature:
+            sql += " AND e.row_signature = ?"
+            params.append(signature)
+        if run_id:
+            sql += " AND e.run_id = ?"
+            params.append(run_id)
+        with self._lock:
+            cursor = self._conn.execute(sql + " ORDER BY e.id DESC", params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def summary(self) -> dict:
+        with self._lock:
+            documents, stored = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM documents").fetchone()
+            links, rows = self._conn.execute("SELECT COUNT(*), COUNT(DISTINCT row_signature) FROM evidence").fetchone()
+        return {"documents": documents, "stored_bytes": stored, "evidence_links": links, "rows": rows}
+
+
+# ========== TOOLKIT INGESTION ==========
+
+def provenance_toolkit(toolkit, store: ProvenanceStore, source: str, kind: str = 'search'):
+    """Store every document a toolkit returns in the blob file, passing output through unchanged"""
+
+    def record(fn, *args, **kwargs):
+        output = fn(*args, **kwargs)
+        argument = args[0] if args else next(iter(kwargs.values()), '')
+        try:
+            if kind == 'page':
+                if isinstance(output, str) and output and not output.startswith('Error'):
+                    store.add_document(str(argument), output, source=source, kind='page')
+            else:
+                for result in parse_search_results(output):
+                    store.add_document(result['url'], result['content'], source=source, kind='search')
+        except (sqlite3.Error, OSError) as e:
+            print(f"   ⚠️ Provenance store ingestion failed: {e}")
+        return output
+
+    return wrap_toolkit(toolkit, lambda tool: wrap_tool(tool, record))
+
+
+# ========== CLI ==========
+
+def print_evidence(store: ProvenanceStore, links: List[dict]):
+    for link in links:
+        print(f"\n{link['date']} | {link['drug']} | {link['summary']}")
+        print(f"   row {link['row_signature'][:12]}  run {link['run_id']}  {link['matched_terms']} terms matched")
+        print(f"   📄 {link['url']} (document {link['document_id']}, bytes {link['start']}-{link['end']})")
+        print(f"   > {' '.join(store.passage(link['document_id'], link['start'], link['end']).split())}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Audit where research findings came from")
+    parser.add_argument("--dir", default=DEFAULT_PROVENANCE_DIR, help="Provenance store directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="Stored documents and evidence links")
+    audit_parser = commands.add_parser("audit", help="Evidence passages of every row of a run")
+    audit_parser.add_argument("--run-id", required=True, help="Run directory name under agent_outputs/")
+    show_parser = commands.add_parser("show", help="Evidence passages of one row")
+    show_parser.add_argument("signature", help="Row signature (as in the findings database)")
+    args = parser.parse_args(argv)
+
+    store = ProvenanceStore(args.dir)
+    if args.command == "stats":
+        summary = store.summary()
+        print(f"📚 {summary['documents']} documents ({summary['stored_bytes'] / 1e6:.1f} MB), "
+              f"{summary['evidence_links']} evidence links for {summary['rows']} rows")
+        return 0
+    links = store.evidence(run_id=args.run_id) if args.command == "audit" else store.evidence(signature=args.signature)
+    if not links:
+        print("❌ No evidence links found")
+        return 1
+    print_evidence(store, links)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+"""
+Deterministic upfront query planning for the research agents
+Expands the search patterns of ENHANCED_RESEARCH_INSTRUCTIONS (brand + event +
+month, site:fda.gov, site:<company>.com, filetype:pdf, alternative date formats,
+generic name) from the DrugResearchInput into a query set per research agent,
+runs each agent's searches concurrently through the wrapped search tools and
+hands it a deduplicated result bundle as soon as its own searches are back, so
+agents start extracting instead of discovering queries one model round trip at
+a time. A (provider, query) pair planned by several agents is searched once
+
+Usage:
+    python query_planner.py plan --drug Dupixent --manufacturer Sanofi --month October --year 2025
+    python query_planner.py plan --drug Dupixent --manufacturer Sanofi --month January --year 2025 \
+        --end-month March --agent regulatory --providers tavily duckduckgo
+"""
+
+import argparse
+import contextvars
+import os
+import re
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from research_schema import canonicalize_url
+from row_repair import MONTHS, research_window
+from tool_hooks import agent_scope, parse_search_results
+
+# Set DRUG_RESEARCH_QUERY_PLANNER=0 to let agents find their own queries again
+QUERY_PLANNER = os.getenv("DRUG_RESEARCH_QUERY_PLANNER", "1") == "1"
+# Planned search calls per agent (profiles with a tool_call_limit plan fewer, see research_engine.planner_calls)
+PLANNER_CALLS_PER_AGENT = int(os.getenv("DRUG_RESEARCH_PLANNER_CALLS", "8"))
+# Searches in flight at once across all agents; each still passes its provider's rate limit
+PLANNER_CONCURRENCY = int(os.getenv("DRUG_RESEARCH_PLANNER_CONCURRENCY", "8"))
+# Results per agent bundle and snippet length, to keep the bundle well inside the prompt budget
+BUNDLE_RESULTS = int(os.getenv("DRUG_RESEARCH_PLANNER_RESULTS", "15"))
+BUNDLE_SNIPPET_CHARS = int(os.getenv("DRUG_RESEARCH_PLANNER_SNIPPET", "300"))
+
+# Search method of each provider toolkit (same names as the fake_backends toolkits)
+SEARCH_TOOLS = {"tavily": "web_search_using_tavily", "exa": "search_exa", "duckduckgo": "duckduckgo_search"}
+
+# Event terms per research agent, most productive first; other agents search for their topic
+AGENT_EVENT_TERMS = {
+    "market_research": ("sales", "market share"),
+    "clinical_trials": ("clinical trial results", "phase 3"),
+    "copay_coverage": ("formulary coverage", "copay program"),
+    "breakthrough": ("breakthrough therapy", "new indication"),
+    "regulatory": ("FDA approval", "label update"),
+    "safety": ("safety warning", "adverse events"),
+    "competitive_intel": ("competitor", "biosimilar"),
+}
+
+# (pattern, query template, preferred providers) in priority order. Operator queries (site:, filetype:)
+# go to the keyword engines; Exa's semantic search gets the plain phrasings
+QUERY_PATTERNS = [
+    ("event", '"{brand}" {event} {date}', ("tavily", "exa")),
+    ("fda", 'site:fda.gov "{brand}" {date}', ("tavily", "duckduckgo")),
+    ("company", 'site:{company_domain} "{brand}" press release {date}', ("tavily", "duckduckgo")),
+    ("event_alt", '"{brand}" {event_alt} {date}', ("tavily", "exa")),
+    ("pdf", '"{brand}" {event} filetype:pdf {date}', ("duckduckgo", "tavily")),
+    ("alt_date", '"{brand}" {event} {alt_date}', ("tavily", "duckduckgo")),
+    ("generic", '"{generic}" {event} {date}', ("exa", "tavily")),
+]
+
+_CORPORATE_WORDS = {"inc", "ltd", "llc", "plc", "corp", "corporation", "co", "company", "ag", "sa", "se", "nv",
+                    "gmbh", "pharmaceuticals", "pharmaceutical", "pharma", "therapeutics", "biosciences", "group",
+                    "holdings", "laboratories", "labs", "&", "and", "the"}
+
+
+@dataclass(frozen=True)
+class PlannedQuery:
+    """One search call of a plan"""
+    pattern: str
+    provider: str
+    query: str
+
+
+def company_domain(manufacturer: str) -> str:
+    """Best-guess corporate domain ("Sanofi" -> sanofi.com, "Eli Lilly and Company" -> elililly.com)"""
+    words = [word for word in re.findall(r"[a-z0-9&]+", manufacturer.lower()) if word not in _CORPORATE_WORDS]
+    return ''.join(words or re.findall(r"[a-z0-9]+", manufacturer.lower())) + ".com"
+
+
+def date_terms(research_input) -> Tuple[str, Optional[str]]:
+    """(main, alternative) date spellings of the research period: ("October 2025", "Oct 2025 2025-10"),
+    or the years of a date range with no alternative"""
+    window = research_window(research_input)
+    if len(window) > 1:
+        return ' OR '.join(dict.fromkeys(str(year) for year, _ in window)), None
+    if not window:
+        return f"{research_input.target_month} {research_input.target_year}", None
+    year, month = window[0]
+    return f"{MONTHS[month - 1].title()} {year}", f"{MONTHS[month - 1][:3].title()} {year} {year}-{month:02d}"
+
+
+def plan_agent_queries(research_input, agent_key: str, topic: str, providers: Sequence[str],
+                       max_calls: int = PLANNER_CALLS_PER_AGENT) -> List[PlannedQuery]:
+    """The search calls of one research agent, highest priority first, limited to ``max_calls``.
+    The budget goes to every pattern on its first provider before any pattern gets a second one.
+    Patterns whose fields are missing (no generic name, date range without alternative dates) are left out"""
+    providers = [provider for provider in providers if provider in SEARCH_TOOLS]
+    if not providers:
+        return []
+    events = AGENT_EVENT_TERMS.get(agent_key, (topic,))
+    date, alt_date = date_terms(research_input)
+    fields = {
+        "brand": research_input.drug_name,
+        "generic": research_input.generic_name,
+        "company_domain": company_domain(research_input.manufacturer),
+        "event": events[0],
+        "event_alt": events[1] if len(events) > 1 else None,
+        "date": date,
+        "alt_date": alt_date,
+    }
+
+    rounds: List[List[PlannedQuery]] = []
+    for pattern, template, preferred in QUERY_PATTERNS:
+        names = re.findall(r'{(\w+)}', template)
+        if any(not fields[name] for name in names):
+            continue
+        query = template.format(**{name: fields[name] for name in names})
+        # Every preferred provider the profile has, else the profile's first search provider;
+        # the n-th provider of each pattern goes into round n
+        for i, provider in enumerate([p for p in preferred if p in providers] or providers[:1]):
+            if i == len(rounds):
+                rounds.append([])
+            rounds[i].append(PlannedQuery(pattern, provider, query))
+    planned = [planned for calls in rounds for planned in calls]
+    return list(dict.fromkeys(planned))[:max(0, max_calls)]
+
+
+def search_tool(toolkit, provider: str):
+    """The wrapped search method of a toolkit (guard, index, ranking and metering included)"""
+    name = SEARCH_TOOLS[provider]
+    for tool in getattr(toolkit, 'tools', None) or []:
+        if getattr(tool, '__name__', None) == name:
+            return tool
+    return getattr(toolkit, name, None)
+
+
+class QueryPlanner:
+    """Plans the searches of a set of research agents and fetches each agent's results on a shared
+    pool when it asks for them; a search planned by several agents runs once and all of them wait
+    for that call"""
+
+    def __init__(self, toolkits: Dict[str, object], max_calls: int = PLANNER_CALLS_PER_AGENT,
+                 concurrency: int = PLANNER_CONCURRENCY):
+        self.tools = {provider: tool for provider in SEARCH_TOOLS if provider in toolkits
+                      for tool in [search_tool(toolkits[provider], provider)] if tool is not None}
+        self.max_calls = max_calls
+        self.concurrency = max(1, concurrency)
+        self.stats = {'agents': 0, 'planned': 0, 'executed': 0, 'errors': 0, 'results': 0}
+        # Planned queries per agent key
+        self.planned: Dict[str, List[PlannedQuery]] = {}
+        self._searches: Dict[PlannedQuery, Future] = {}
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def plan(self, research_input, agents: Sequence[Tuple[str, str]]) -> Dict[str, List[PlannedQuery]]:
+        """{agent key: planned queries} for (agent key, topic) pairs, kept for ``fetch``"""
+        plan = {key: plan_agent_queries(research_input, key, topic, list(self.tools), self.max_calls)
+                for key, topic in agents}
+        with self._lock:
+            self.planned.update(plan)
+            self.stats['agents'] += len(plan)
+            self.stats['planned'] += sum(len(queries) for queries in plan.values())
+        return plan
+
+    def fetch(self, key: str) -> List[Dict[str, str]]:
+        """Deduplicated search records of one planned agent; starts its searches that no other agent
+        has started yet and waits for all of them"""
+        queries = self.planned.get(key, [])
+        records, seen = [], set()
+        for future in self._start(queries):
+            for record in future.result():
+                url = canonicalize_url(record['url'])
+                if url not in seen:
+                    seen.add(url)
+                    records.append(record)
+        with self._lock:
+            self.stats['results'] += len(records)
+        return records
+
+    def prefetch(self, research_input, agents: Sequence[Tuple[str, str]]) -> Dict[str, List[Dict[str, str]]]:
+        """{agent key: deduplicated search records} of every agent, searched at once"""
+        plan = self.plan(research_input, agents)
+        for queries in plan.values():
+            self._start(queries)
+        return {key: self.fetch(key) for key in plan}
+
+    def close(self):
+        """Stop the search pool, dropping searches nobody has waited for yet"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _start(self, queries: Sequence[PlannedQuery]) -> List[Future]:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="query-planner")
+            for planned in queries:
+                if planned not in self._searches:
+                    agents = [key for key, planned_queries in self.planned.items() if planned in planned_queries]
+                    # Runs in a copy of the caller's context, so the wrappers still see the active
+                    # research input and the tool meter of the agent that started it
+                    self._searches[planned] = self._pool.submit(contextvars.copy_context().run, self._search,
+                                                                planned, agents)
+                    self.stats['executed'] += 1
+            return [self._searches[planned] for planned in queries]
+
+    def _search(self, planned: PlannedQuery, agents: List[str]) -> List[Dict[str, str]]:
+        try:
+            # Made for every agent that planned it (relevance ranking skips some agents' searches)
+            with agent_scope(*agents):
+                output = self.tools[planned.provider](planned.query)
+        except Exception as e:
+            print(f"   ⚠️ Planned search failed ({planned.provider}: {planned.query}): {e}")
+            with self._lock:
+                self.stats['errors'] += 1
+            return []
+        return parse_search_results(output if isinstance(output, str) else str(output))
+
+
+def format_bundle(records: Sequence[Dict[str, str]], queries: int, max_results: int = BUNDLE_RESULTS,
+                  snippet_chars: int = BUNDLE_SNIPPET_CHARS) -> str:
+    """Prompt section handing an agent its pre-fetched results ('' when there are none)"""
+    if not records:
+        return ''
+    lines = []
+    for i, record in enumerate(records[:max_results], 1):
+        snippet = ' '.join(record['content'].split())
+        if len(snippet) > snippet_chars:
+            snippet = snippet[:snippet_chars].rsplit(' ', 1)[0] + '...'
+        date = f" ({record['published_date']})" if record['published_date'] else ''
+        lines.append(f"{i}. [{record['title'] or record['url']}]({record['url']}){date}\n   {snippet}")
+    shown = min(len(records), max_results)
+    return (f"\n\nPRE-FETCHED SEARCH RESULTS ({shown} unique results from {queries} planned searches; "
+            f"they are already in the local index):\n" + "\n".join(lines) +
+            "\n\nStart from these results: scrape the relevant ones and extract findings. Do NOT repeat these "
+            "searches; only search further for gaps they leave.")
+
+
+# ========== CLI ==========
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Show the searches the query planner runs for a research input")
+    commands = parser.add_subparsers(dest="command", required=True)
+    plan_parser = commands.add_parser("plan", help="Print the planned queries per research agent")
+    plan_parser.add_argument("--drug", required=True)
+    plan_parser.add_argument("--manufacturer", required=True)
+    plan_parser.add_argument("--generic")
+    plan_parser.add_argument("--month", required=True)
+    plan_parser.add_argument("--year", required=True)
+    plan_parser.add_argument("--end-month")
+    plan_parser.add_argument("--end-year")
+    plan_parser.add_argument("--agent", action="append", help="Research agent key (default: all)")
+    plan_parser.add_argument("--providers", nargs="+", default=list(SEARCH_TOOLS))
+    plan_parser.add_argument("--max-calls", type=int, default=PLANNER_CALLS_PER_AGENT)
+    args = parser.parse_args(argv)
+
+    from research_engine import RESEARCH_AGENT_SPECS, DrugResearchInput
+
+    research_input = DrugResearchInput(drug_name=args.drug, manufacturer=args.manufacturer,
+                                       generic_name=args.generic, target_month=args.month, target_year=args.year,
+                                       end_month=args.end_month, end_year=args.end_year)
+    keys = args.agent or list(RESEARCH_AGENT_SPECS)
+    unique = set()
+    for key in keys:
+        queries = plan_agent_queries(research_input, key, RESEARCH_AGENT_SPECS[key].topic, args.providers,
+                                     args.max_calls)
+        unique.update(queries)
+        print(f"\n🗺️ {RESEARCH_AGENT_SPECS[key].label} ({len(queries)} searches)")
+        for planned in queries:
+            print(f"   {planned.provider:<11} {planned.pattern:<9} {planned.query}")
+    print(f"\n✅ {len(unique)} distinct searches for {len(keys)} agents")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+"""
+Cross-process token-bucket rate limiting per provider and API key
+Buckets live in a SQLite file, so every thread and worker process on the
+machine draws from the same quota. Callers reserve a token atomically and
+sleep until their slot instead of firing and getting a 429, which keeps
+throughput at the quota ceiling without retry storms. Waits are recorded
+per bucket as metrics
+
+Limits are "<requests>/<s|min|h>" per provider, overridable per env var
+(e.g. TAVILY_RATE_LIMIT=100/min, GEMINI_RATE_LIMIT=5/min, EXA_RATE_LIMIT=off)
+An idle bucket holds the requests of one limit period, at most a minute's
+worth (100 for "100/min", 5 for "5/s", 33 for "2000/h"), so a quiet quota
+serves a batch of calls at once instead of spacing them out one by one;
+<PROVIDER>_RATE_BURST overrides it (e.g. DDG_RATE_BURST=5)
+
+Usage:
+    python rate_limit.py stats
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_RATE_LIMIT_DB = os.getenv("DRUG_RESEARCH_RATE_LIMIT_DB", "research_cache/rate_limits.db")
+
+# Set DRUG_RESEARCH_RATE_LIMITING=0 to disable every bucket (e.g. for load tests against fakes)
+RATE_LIMITING = os.getenv("DRUG_RESEARCH_RATE_LIMITING", "1") == "1"
+
+# Longest a tool call queues for a token before it is answered with an error instead
+MAX_TOOL_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT_SECONDS", "60"))
+
+# Provider -> (limit env var, env var of the API key the quota belongs to, default limit)
+PROVIDER_LIMITS: Dict[str, Tuple[str, Optional[str], str]] = {
+    "tavily": ("TAVILY_RATE_LIMIT", "TAVILY_API_KEY", "100/min"),
+    "exa": ("EXA_RATE_LIMIT", "EXA_API_KEY", "5/s"),
+    "duckduckgo": ("DDG_RATE_LIMIT", None, "20/min"),
+    "gemini": ("GEMINI_RATE_LIMIT", "GOOGLE_API_KEY", "150/min"),
+    "openai": ("OPENAI_RATE_LIMIT", "OPENAI_API_KEY", "500/min"),
+}
+
+# Longest stretch of a limit an idle bucket can spend at once
+BURST_WINDOW = 60.0
+
+_PERIODS = {"s": 1.0, "sec": 1.0, "second": 1.0, "m": 60.0, "min": 60.0, "minute": 60.0, "h": 3600.0, "hour": 3600.0}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL,
+    acquired INTEGER NOT NULL DEFAULT 0,
+    waits INTEGER NOT NULL DEFAULT 0,
+    wait_seconds REAL NOT NULL DEFAULT 0,
+    max_wait REAL NOT NULL DEFAULT 0,
+    rejected INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def _parse(limit: str) -> Optional[Tuple[float, float]]:
+    """(requests, period seconds) of "100/min", "5/s" or "2000/h" (None for "off", "0" or "")"""
+    limit = (limit or "").strip().lower()
+    if limit in ("", "0", "off", "none"):
+        return None
+    count, _, period = limit.partition("/")
+    if period not in _PERIODS and period:
+        raise ValueError(f"Unknown rate limit period in '{limit}' (use s, min or h)")
+    return float(count), _PERIODS.get(period or "s")
+
+
+def parse_limit(limit: str) -> Optional[float]:
+    """Requests per second of "100/min", "5/s" or "2000/h" (None for "off", "0" or "")"""
+    parsed = _parse(limit)
+    return parsed[0] / parsed[1] if parsed else None
+
+
+def limit_burst(limit: str) -> Optional[float]:
+    """Default burst of a limit: the requests of one period, at most BURST_WINDOW seconds' worth"""
+    parsed = _parse(limit)
+    if parsed is None:
+        return None
+    count, period = parsed
+    return max(1.0, count * min(1.0, BURST_WINDOW / period))
+
+
+class RateLimitStore:
+    """Token buckets in a SQLite file shared by every process using the same path"""
+
+    def __init__(self, path: str = DEFAULT_RATE_LIMIT_DB):
+        self.path = path
+        if path != ':memory:':
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Transactions are managed explicitly: BEGIN IMMEDIATE serialises reservations across processes
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    def reserve(self, name: str, rate: float, burst: float, tokens: float = 1.0,
+                max_wait: Optional[float] = None) -> Optional[float]:
+        """Take ``tokens`` from a bucket now and return how long the caller must wait before using them.
+        The level may go negative: each reservation queues behind the previous ones. Returns None
+        without taking anything if the wait would exceed ``max_wait``"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self._conn.execute("SELECT tokens, updated FROM buckets WHERE name = ?", (name,)).fetchone()
+                level = burst if row is None else min(burst, row[0] + max(0.0, now - row[1]) * rate)
+                wait = max(0.0, (tokens - level) / rate)
+                if max_wait is not None and wait > max_wait:
+                    self._conn.execute(
+                        "INSERT INTO buckets (name, tokens, updated, rejected) VALUES (?, ?, ?, 1) "
+                        "ON CONFLICT(name) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated, "
+                        "rejected = rejected + 1", (name, level, now))
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "INSERT INTO buckets (name, tokens, updated, acquired, waits, wait_seconds, max_wait) "
+                    "VALUES (?, ?, ?, 1, ?, ?, ?) ON CONFLICT(name) DO UPDATE SET "
+                    "tokens = excluded.tokens, updated = excluded.updated, acquired = acquired + 1, "
+                    "waits = waits + excluded.waits, wait_seconds = wait_seconds + excluded.wait_seconds, "
+                    "max_wait = MAX(max_wait, excluded.max_wait)",
+                    (name, level - tokens, now, 1 if wait > 0 else 0, wait, wait))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    def metrics(self) -> List[dict]:
+        """Cumulative acquisitions, waits and rejections per bucket, across all processes"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT name, acquired, waits, wait_seconds, max_wait, rejected FROM buckets ORDER BY name")
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+class TokenBucket:
+    """Rate limit of one provider and API key: ``rate`` requests per second, bursts of up to ``burst``
+    (default: BURST_WINDOW seconds' worth of requests)"""
+
+    def __init__(self, name: str, rate: float, burst: Optional[float] = None,
+                 store: Optional[RateLimitStore] = None):
+        self.name = name
+        self.rate = rate
+        self.burst = burst or max(1.0, rate * BURST_WINDOW)
+        self.store = store or RateLimitStore()
+        # This process's share of the bucket's traffic; RateLimitStore.metrics has the cross-process totals
+        self.stats = {'acquired': 0, 'waits': 0, 'wait_seconds': 0.0, 'max_wait': 0.0, 'rejected': 0}
+        self._lock = threading.Lock()
+
+    def _reserve(self, max_wait: Optional[float]) -> Optional[float]:
+        wait = self.store.reserve(self.name, self.rate, self.burst, max_wait=max_wait)
+        with self._lock:
+            if wait is None:
+                self.stats['rejected'] += 1
+            else:
+                self.stats['acquired'] += 1
+                self.stats['waits'] += 1 if wait > 0 else 0
+                self.stats['wait_seconds'] += wait
+                self.stats['max_wait'] = max(self.stats['max_wait'], wait)
+        return wait
+
+    def acquire(self, max_wait: Optional[float] = None) -> Optional[float]:
+        """Block until a token is available; returns the seconds waited (None, without waiting,
+        if the queue is longer than ``max_wait``)"""
+        wait = self._reserve(max_wait)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, max_wait: Optional[float] = None) -> Optional[float]:
+        wait = await asyncio.to_thread(self._reserve, max_wait)
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+    def try_acquire(self) -> bool:
+        """Take a token only if one is available right now"""
+        return self._reserve(0.0) is not None
+
+
+# ========== PROVIDER BUCKETS ==========
+
+_buckets: Dict[str, Optional[TokenBucket]] = {}
+_buckets_lock = threading.Lock()
+_store: Optional[RateLimitStore] = None
+
+
+def provider_bucket(provider: str) -> Optional[TokenBucket]:
+    """The process-wide bucket of a provider and its configured API key (None if unlimited)"""
+    global _store
+    if not RATE_LIMITING or provider not in PROVIDER_LIMITS:
+        return None
+    with _buckets_lock:
+        if provider not in _buckets:
+            limit_env, key_env, default_limit = PROVIDER_LIMITS[provider]
+            limit = os.getenv(limit_env, default_limit)
+            rate = parse_limit(limit)
+            if rate is None:
+                _buckets[provider] = None
+            else:
+                # Buckets are per API key (hashed, never stored), so separate keys get separate quotas
+                api_key = os.getenv(key_env, "") if key_env else ""
+                key_id = hashlib.sha1(api_key.encode('utf-8')).hexdigest()[:12] if api_key else "default"
+                burst = os.getenv(limit_env.replace("_LIMIT", "_BURST"))
+                _store = _store or RateLimitStore()
+                _buckets[provider] = TokenBucket(f"{provider}:{key_id}", rate,
+                                                 float(burst) if burst else limit_burst(limit), store=_store)
+        return _buckets[provider]
+
+
+def wait_for_quota(provider: str):
+    """Block until the provider's bucket grants a request (no-op when unlimited)"""
+    bucket = provider_bucket(provider)
+    if bucket is not None:
+        bucket.acquire()
+
+
+async def wait_for_quota_async(provider: str):
+    bucket = provider_bucket(provider)
+    if bucket is not None:
+        await bucket.acquire_async()
+
+
+# ========== CLI ==========
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect the shared rate limit buckets")
+    parser.add_argument("--db", default=DEFAULT_RATE_LIMIT_DB, help="Path to the rate limit database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="Acquisitions, waits and rejections per bucket")
+    args = parser.parse_args(argv)
+
+    print(f"{'Bucket':<26} {'acquired':>9} {'waits':>7} {'wait s':>9} {'mean wait':>10} {'max wait':>9} {'rejected':>9}")
+    for bucket in RateLimitStore(args.db).metrics():
+        mean_wait = bucket['wait_seconds'] / bucket['waits'] if bucket['waits'] else 0.0
+        print(f"{bucket['name']:<26} {bucket['acquired']:>9} {bucket['waits']:>7} {bucket['wait_seconds']:>9.1f} "
+              f"{mean_wait:>10.2f} {bucket['max_wait']:>9.2f} {bucket['rejected']:>9}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
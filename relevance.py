@@ -0,0 +1,155 @@
+"""
+Cheap relevance ranking of search hits before scraping
+Scores the title and snippet of each candidate against the DrugResearchInput
+fields with NumPy BM25 vectors and keeps only the top-k above a threshold, so
+agents scrape fewer marginal pages. Scores are relative to a hit naming the
+drug, so on-target hits pass even when they match no other field, and hits
+naming neither the drug nor its manufacturer score 0. Competitive intelligence
+searches are about other companies' drugs and are not ranked
+"""
+
+import json
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from tool_hooks import current_agents, current_research, parse_search_results, wrap_tool, wrap_toolkit
+
+DEFAULT_TOP_K = int(os.getenv("DRUG_RESEARCH_SCRAPE_TOP_K", "5"))
+DEFAULT_THRESHOLD = float(os.getenv("DRUG_RESEARCH_RELEVANCE_THRESHOLD", "0.15"))
+# Research agents whose hits are passed through unranked: their targets rarely name the researched drug
+UNRANKED_AGENTS = ("competitive_intel",)
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+# Field weights: the drug identity matters most, then who makes it, then when/what
+FIELD_WEIGHTS = {
+    'drug_name': 3.0,
+    'generic_name': 3.0,
+    'manufacturer': 1.5,
+    'therapeutic_area': 1.0,
+    'target_month': 1.0,
+    'target_year': 1.0,
+}
+# Fields naming the drug itself; a hit matching one of them sets the score scale
+IDENTITY_FIELDS = ('drug_name', 'generic_name')
+# A hit must name the drug or its maker; the period and therapeutic area only qualify such a hit
+ANCHOR_FIELDS = IDENTITY_FIELDS + ('manufacturer',)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens"""
+    return _TOKEN.findall((text or '').lower())
+
+
+def query_terms(research_input, fields: Iterable[str] = FIELD_WEIGHTS) -> Dict[str, float]:
+    """Weighted query terms built from the DrugResearchInput fields (every weighted field by default)"""
+    terms: Dict[str, float] = {}
+    for field in fields:
+        weight = FIELD_WEIGHTS[field]
+        value = getattr(research_input, field, None)
+        if not value:
+            continue
+        tokens = tokenize(value)
+        if field == 'target_month' and tokens:
+            tokens.append(tokens[0][:3])  # "October" also matches "Oct"
+        for token in tokens:
+            if len(token) > 1:
+                terms[token] = max(terms.get(token, 0.0), weight)
+    return terms
+
+
+def bm25_scores(documents: List[str], terms: Dict[str, float], k1: float = 1.2, b: float = 0.75,
+                reference: Optional[Iterable[str]] = None) -> np.ndarray:
+    """Weighted BM25 of each document against the query terms, normalised by the upper bound of the
+    ``reference`` terms (default: every query term) and capped at 1"""
+    if not documents or not terms:
+        return np.zeros(len(documents))
+    vocabulary = {term: i for i, term in enumerate(terms)}
+    weights = np.array(list(terms.values()))
+
+    tf = np.zeros((len(documents), len(vocabulary)))
+    lengths = np.zeros(len(documents))
+    for row, document in enumerate(documents):
+        tokens = tokenize(document)
+        lengths[row] = len(tokens)
+        for token in tokens:
+            column = vocabulary.get(token)
+            if column is not None:
+                tf[row, column] += 1
+
+    n_docs = len(documents)
+    df = np.count_nonzero(tf, axis=0)
+    # Smoothed idf that stays positive for terms present in every candidate
+    idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)) + 1.0
+    avg_length = max(lengths.mean(), 1.0)
+    norm = k1 * (1 - b + b * lengths / avg_length)
+    saturated = tf * (k1 + 1) / (tf + norm[:, None])
+    scores = saturated @ (idf * weights)
+    reference = set(terms if reference is None else reference).intersection(terms) or set(terms)
+    mask = np.array([term in reference for term in vocabulary])
+    upper_bound = float(((k1 + 1) * idf * weights)[mask].sum())
+    return np.minimum(scores / upper_bound, 1.0)
+
+
+def identity_reference(research_input) -> Optional[List[str]]:
+    """The reference term of the score scale: the best-weighted token naming the drug"""
+    identity = query_terms(research_input, IDENTITY_FIELDS)
+    return [max(identity, key=identity.get)] if identity else None
+
+
+def rank_candidates(candidates: List[Dict[str, str]], research_input, top_k: int = DEFAULT_TOP_K,
+                    threshold: float = DEFAULT_THRESHOLD) -> List[Tuple[float, Dict[str, str]]]:
+    """Return the top-k (score, candidate) pairs scoring at or above ``threshold``"""
+    documents = [f"{c.get('title', '')} {c.get('title', '')} {c.get('content', '')}" for c in candidates]
+    # Scaled by a hit naming the drug, not by one matching every field at once, so a hit
+    # like "Dupixent label update" passes without the manufacturer or period in its snippet
+    scores = bm25_scores(documents, query_terms(research_input), reference=identity_reference(research_input))
+    anchors = query_terms(research_input, ANCHOR_FIELDS)
+    if anchors:
+        scores = np.where(bm25_scores(documents, anchors) > 0, scores, 0.0)
+    order = np.argsort(-scores, kind='stable')
+    return [(float(scores[i]), candidates[i]) for i in order[:top_k] if scores[i] >= threshold]
+
+
+class RelevanceFilter:
+    """Prunes search tool output to the most relevant hits for the active research input"""
+
+    def __init__(self, top_k: int = DEFAULT_TOP_K, threshold: float = DEFAULT_THRESHOLD,
+                 unranked_agents: Iterable[str] = UNRANKED_AGENTS):
+        self.top_k = top_k
+        self.threshold = threshold
+        self.unranked_agents = frozenset(unranked_agents)
+        self.stats = {'candidates': 0, 'kept': 0, 'unranked': 0}
+        self._lock = threading.Lock()
+
+    def filter_output(self, output: str) -> str:
+        research_input = current_research.get()
+        candidates = parse_search_results(output) if isinstance(output, str) else []
+        if research_input is None or not candidates:
+            return output
+        if self.unranked_agents.intersection(current_agents.get()):
+            with self._lock:
+                self.stats['unranked'] += len(candidates)
+            return output
+        ranked = rank_candidates(candidates, research_input, self.top_k, self.threshold)
+        with self._lock:
+            self.stats['candidates'] += len(candidates)
+            self.stats['kept'] += len(ranked)
+        if not ranked:
+            return (f"No sufficiently relevant results ({len(candidates)} hits scored below the relevance "
+                    f"threshold for {research_input.drug_name}). Try a different query.")
+        return json.dumps([
+            {'title': c['title'], 'url': c['url'], 'content': c['content'],
+             'published_date': c['published_date'], 'relevance': round(score, 3)}
+            for score, c in ranked
+        ], ensure_ascii=False)
+
+
+def rank_toolkit(toolkit, relevance_filter: RelevanceFilter):
+    """Pass every search result of a toolkit through the relevance filter"""
+    return wrap_toolkit(toolkit, lambda tool: wrap_tool(
+        tool, lambda fn, *args, **kwargs: relevance_filter.filter_output(fn(*args, **kwargs))))
@@ -0,0 +1,144 @@
+"""
+Non-interactive batch research CLI
+Reads DrugResearchInput records as JSON lines from a file or stdin, researches
+them with a configurable number of concurrent runs and streams the results to
+stdout as JSON lines as each run finishes: one "row" event per final findings
+row, then one "run" summary per input, then a closing "batch" summary.
+Progress messages go to stderr, so stdout can be piped straight into ingestion
+
+Input lines hold DrugResearchInput fields plus an optional "id" echoed in every
+event of that input; blank lines and lines starting with # are skipped:
+    {"id": "dup-oct", "drug_name": "Dupixent", "manufacturer": "Sanofi", "target_month": "October", "target_year": "2025"}
+
+Usage:
+    python research_cli.py inputs.jsonl --profile fast --runs 4 > results.jsonl
+    cat inputs.jsonl | python research_cli.py - --concurrency 6 | ingest
+    python research_cli.py inputs.jsonl --fake    # offline dry run with fake models and providers
+"""
+
+import argparse
+import contextlib
+import json
+import sys
+import threading
+import time
+from typing import IO, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from phase_scheduler import PHASE_ONE_CONCURRENCY
+from research_engine import PROFILES, DrugResearchInput, build_research_team, run_batch
+from research_schema import TABLE_COLUMNS
+
+
+def read_inputs(lines) -> Tuple[List[Tuple[str, DrugResearchInput]], List[dict]]:
+    """((id, input) per valid record, "invalid" run events for the lines that are not)"""
+    inputs, invalid = [], []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        record_id = str(number)
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("expected a JSON object")
+            record_id = str(record.pop("id", number))
+            inputs.append((record_id, DrugResearchInput.model_validate(record)))
+        except (ValueError, ValidationError) as e:
+            invalid.append({"type": "run", "id": record_id, "status": "invalid", "line": number,
+                            "error": ' '.join(str(e).split())})
+    return inputs, invalid
+
+
+class JsonlWriter:
+    """Writes events as JSON lines, one flushed line per event, safe to call from run threads"""
+
+    def __init__(self, stream: IO[str]):
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def write(self, event: dict):
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+def run_events(record_id: str, research_input: DrugResearchInput, workflow, error: Optional[Exception]) -> List[dict]:
+    """The row events and run summary of one finished run"""
+    report = workflow.run_report.to_dict() if workflow.run_report is not None else {}
+    summary = {
+        "type": "run",
+        "id": record_id,
+        "status": "failed" if error else "ok",
+        "run_id": report.get("run_id"),
+        "drug_name": research_input.drug_name,
+        "manufacturer": research_input.manufacturer,
+        "period": research_input.get_period(),
+        "rows": 0 if error else len(workflow.final_rows),
+        "output_dir": str(workflow.output_dir) if workflow.output_dir else None,
+        "totals": report.get("totals"),
+    }
+    if error:
+        summary["error"] = str(error)
+        return [summary]
+    rows = [{"type": "row", "id": record_id, "run_id": summary["run_id"], "row": dict(zip(TABLE_COLUMNS, row))}
+            for row in workflow.final_rows]
+    return rows + [summary]
+
+
+# ========== CLI ==========
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Research DrugResearchInput JSON lines and stream results as JSONL")
+    parser.add_argument("input", nargs="?", default="-", help="JSONL file of research inputs ('-' = stdin)")
+    parser.add_argument("--profile", default="deep", help=f"Research profile ({', '.join(PROFILES)})")
+    parser.add_argument("--runs", type=int, default=4, help="Research runs in flight at once")
+    parser.add_argument("--concurrency", type=int, default=PHASE_ONE_CONCURRENCY,
+                        help="Phase 1 agents running at once across the whole batch")
+    parser.add_argument("--economy", action="store_true", help="Skip or downgrade low-yield research agents")
+    parser.add_argument("--profiling", action="store_true",
+                        help="Write cProfile/tracemalloc profiles of every phase to each run directory")
+    parser.add_argument("--fake", action="store_true", help="Use fake models and providers (no network or API keys)")
+    args = parser.parse_args(argv)
+
+    writer = JsonlWriter(sys.stdout)
+    if args.input == "-":
+        inputs, invalid = read_inputs(sys.stdin)
+    else:
+        with open(args.input, encoding="utf-8") as f:
+            inputs, invalid = read_inputs(f)
+    for event in invalid:
+        writer.write(event)
+
+    team = None
+    if args.fake:
+        from fake_backends import fake_model_factory, fake_toolkit_factory
+        team = build_research_team(args.profile, model_factory=fake_model_factory(),
+                                   toolkit_factory=fake_toolkit_factory())
+
+    counts: Dict[str, int] = {"ok": 0, "failed": 0, "rows": 0}
+    started = time.perf_counter()
+
+    def on_finish(index: int, workflow, error: Optional[Exception]):
+        record_id, research_input = inputs[index]
+        for event in run_events(record_id, research_input, workflow, error):
+            writer.write(event)
+        counts["failed" if error else "ok"] += 1
+        counts["rows"] += 0 if error else len(workflow.final_rows)
+
+    # Workflow progress messages go to stderr; stdout only carries the JSONL events
+    with contextlib.redirect_stdout(sys.stderr):
+        run_batch([research_input for _, research_input in inputs], profile=args.profile, team=team,
+                  concurrency=args.concurrency, economy=args.economy, max_runs=args.runs, on_finish=on_finish,
+                  profiling=args.profiling or None)
+
+    writer.write({"type": "batch", "runs": len(inputs), "ok": counts["ok"], "failed": counts["failed"],
+                  "invalid": len(invalid), "rows": counts["rows"],
+                  "wall_seconds": round(time.perf_counter() - started, 3)})
+    return 1 if counts["failed"] or invalid else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1775 @@
+"""
+Drug research engine shared by every entry point
+Parsing, output formatting, caches, agent definitions and the input-driven
+workflow, parameterised by a research profile:
+- deep: Gemini 2.5 Pro, every search provider, 7 research agents plus
+  synthesis, analysis and validation (monthly reports)
+- tavily: GPT-4o with Tavily only, 7 research agents plus synthesis, analysis
+  and validation on GPT-4o mini
+- fast: a cheap model, Tavily only, 3 research agents and a tight tool-call
+  budget, no support phases (quick checks)
+multi_tools_search.py serves the deep profile, structureoutput_main.py the tavily one
+"""
+
+import asyncio
+import contextlib
+import functools
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from agno.agent import Agent
+from agno.models.google import Gemini
+from agno.models.openai import OpenAIChat
+from agno.workflow import Workflow
+from pydantic import BaseModel, Field, model_validator
+
+from agent_yield import DOWNGRADE, FULL, SKIP, YieldHistory
+from findings_store import FindingsStore
+from http_pool import HTTP_POOL, pool_toolkit, shared_client
+from passage_selector import PassageSelector, condense_toolkit
+from phase_scheduler import PHASE_ONE_CONCURRENCY, LatencyHistory, LptScheduler, PhaseJob
+from profiling import PROFILING, RunProfiler
+from provenance_store import PROVENANCE, ProvenanceStore, provenance_toolkit
+from query_planner import PLANNER_CALLS_PER_AGENT, QUERY_PLANNER, QueryPlanner, format_bundle
+from rate_limit import provider_bucket, wait_for_quota, wait_for_quota_async
+from relevance import RelevanceFilter, rank_toolkit
+from research_schema import TABLE_COLUMNS, ResearchFindings
+from resilient_tools import ProviderGuard, guard_toolkit
+from row_repair import (
+    MONTHS, RowRepairer, deterministic_fix, month_number, research_months, research_period, research_window,
+    row_problems,
+)
+from run_archive import output_writer
+from run_report import RunReport, ToolMeter, aggregate_reports, meter_toolkit, metered
+from search_index import SearchIndex, SearchIndexTools, index_toolkit
+from tool_hooks import agent_scope, research_scope
+from validation_cache import VALIDATION_CACHE, IncrementalValidator, VerdictStore
+from workflow_graph import GRAPH_WORKERS, StageGraph
+
+# ========== OUTPUT MODE ==========
+# "markdown": agents emit pipe-delimited table rows that are parsed with regexes (default)
+# "structured": agents return a ResearchFindings object via agno structured output, no parsing needed
+OUTPUT_MODE = os.getenv("DRUG_RESEARCH_OUTPUT_MODE", "markdown")
+research_output_schema = ResearchFindings if OUTPUT_MODE == "structured" else None
+
+# ========== HELPER FUNCTION ==========
+def extract_content(result) -> str:
+    """Extract string content from RunOutput object"""
+    if hasattr(result, 'content'):
+        return str(result.content)
+    elif hasattr(result, 'text'):
+        return str(result.text)
+    elif hasattr(result, 'message'):
+        return str(result.message)
+    else:
+        return str(result)
+
+# ========== HELPER FUNCTIONS FOR DATA PARSING ==========
+
+def parse_markdown_table_row(line: str) -> List[str]:
+    """Parse a markdown table row into list of column values"""
+    # Remove pipe symbols and split
+    line = line.strip()
+    if not line.startswith('|'):
+        return None
+    
+    # Remove leading and trailing pipes
+    line = line[1:-1] if line.endswith('|') else line[1:]
+    
+    # Split by pipe and strip whitespace
+    columns = [col.strip() for col in line.split('|')]
+    
+    # Filter out separator rows (contain only dashes and hyphens)
+    if all(re.match(r'^[\s\-:]+$', col) for col in columns):
+        return None
+    
+    return columns
+
+
+def convert_url_to_plain_text(text: str) -> str:
+    """Convert markdown link format [text](url) to plain URL"""
+    # Pattern for markdown links
+    pattern = r'\[([^\]]+)\]\(([^)]+)\)'
+    
+    # Replace [text](url) with just url
+    def replacer(match):
+        return match.group(2)
+    
+    result = re.sub(pattern, replacer, text)
+    return result.strip()
+
+
+def normalize_row(columns: List[str]) -> List[str]:
+    """Clean each column: remove markdown links, newlines and commas"""
+    cleaned_columns = [convert_url_to_plain_text(str(col).strip()) for col in columns]
+    return [col.replace('\n', ' ').replace(',', ';') for col in cleaned_columns]  # Replace newlines and commas in content
+
+
+def dedupe_key(row: List[str]) -> tuple:
+    """Duplicate key of a cleaned row: its first 6 columns"""
+    return tuple(row[:6])
+
+
+def dedupe_rows(rows: List[List[str]]) -> List[List[str]]:
+    """Drop header-like rows and duplicates (same first 6 columns), keeping first occurrence"""
+    clean_rows = []
+    seen_rows = set()  # Track seen rows to avoid duplicates
+    
+    for row in rows:
+        # Skip header-like rows (rows that match column names exactly)
+        if row[0].lower() in ['category', 'sub category', 'category ']:
+            continue
+        
+        # Create a signature for the row to avoid duplicates
+        signature = dedupe_key(row)
+        if signature not in seen_rows:
+            seen_rows.add(signature)
+            clean_rows.append(row)
+    
+    return clean_rows
+
+
+def kept_row_keys(rows: List[List[str]], months) -> set:
+    """Dedupe keys of the rows that validate as-is or after deterministic fixes"""
+    keys = set()
+    for row in rows:
+        fixed = deterministic_fix(row)
+        if not row_problems(fixed, months):
+            keys.add(dedupe_key(fixed))
+    return keys
+
+
+def clean_table_data(content: str, malformed: Optional[List[List[str]]] = None) -> List[List[str]]:
+    """Extract and clean table data from markdown content"""
+    rows = []
+    findings_table = False  # Inside a table whose header row has the findings columns
+    for line in content.split('\n'):
+        if not line.strip():
+            continue
+        if not line.strip().startswith('|'):
+            findings_table = False
+            continue
+        
+        parsed = parse_markdown_table_row(line)
+        if not parsed:
+            continue
+        if parsed[0].lower() == 'category':
+            findings_table = len(parsed) >= len(TABLE_COLUMNS)
+        elif len(parsed) >= len(TABLE_COLUMNS):  # Must have all columns
+            rows.append(normalize_row(parsed))
+        elif findings_table and malformed is not None and len(parsed) > 1:
+            # Short rows of a findings table are kept aside for the repair stage instead of being lost;
+            # rows of other tables (summaries, comparisons) are not findings
+            malformed.append(normalize_row(parsed))
+    
+    return dedupe_rows(rows)
+
+
+def findings_to_rows(findings: ResearchFindings) -> List[List[str]]:
+    """Cleaned table rows from a structured agent output (no markdown parsing needed)"""
+    return [normalize_row(finding.to_row()) for finding in findings.findings]
+
+
+def rows_to_markdown(rows: List[List[str]]) -> str:
+    """Compact pipe-delimited rows, used to pass structured findings on to later agents"""
+    return '\n'.join('| ' + ' | '.join(row) + ' |' for row in rows)
+
+
+def collect_agent_output(result, malformed: Optional[List[List[str]]] = None) -> tuple:
+    """Return (text, rows) for an agent result in either markdown or structured mode"""
+    content = getattr(result, 'content', None)
+    if isinstance(content, ResearchFindings):
+        rows = findings_to_rows(content)
+        return rows_to_markdown(rows), rows
+    text = extract_content(result)
+    return text, clean_table_data(text, malformed)
+
+
+# ========== OUTPUT FORMATTER ==========
+def format_to_structured_table(content: str, research_input) -> str:
+    """Convert research content to structured table format with CORRECT column order"""
+    # Parse and clean the table data
+    return render_structured_table(clean_table_data(content), research_input)
+
+
+def render_structured_table(parsed_rows: List[List[str]], research_input, csv_suffix: str = '') -> str:
+    """Render cleaned rows as the markdown report, CSV file and findings database entries"""
+    
+    # CORRECTED COLUMN ORDER (URL is LAST):
+    # Category, Sub Category, Date, Drug Name, Generic Name, Manufacturer, Disease Name, 
+    # Development Summary, Detailed Description, Country, Competitive Implication, 
+    # Patient Population Affected, URL
+    
+    header_row = """Category,Sub Category,Date,Drug Name,Generic Name,Manufacturer,Disease Name,Development Summary,Detailed Description,Country,Competitive Implication,Patient Population Affected,URL
+"""
+    
+    # Create markdown table header (for display)
+    markdown_table = """
+# Comprehensive Drug Research Report - Structured Output
+
+## Research Parameters
+- **Drug Name:** {drug_name}
+- **Generic Name:** {generic_name}
+- **Manufacturer:** {manufacturer}
+- **Research Period:** {target_month} {target_year}
+- **Therapeutic Area:** {therapeutic_area}
+
+## Research Results Table
+
+| Category | Sub Category | Date | Drug Name | Generic Name | Manufacturer | Disease Name | Development Summary | Detailed Description | Country | Competitive Implication | Patient Population Affected | URL |
+|----------|--------------|------|-----------|--------------|--------------|--------------|-------------------|-------------------|---------|----------------------|---------------------------|-----|
+""".format(
+        drug_name=research_input.drug_name,
+        generic_name=research_input.generic_name or 'Not specified',
+        manufacturer=research_input.manufacturer,
+        target_month=research_input.target_month,
+        target_year=research_input.target_year,
+        therapeutic_area=research_input.therapeutic_area or 'Not specified'
+    )
+    
+    # Convert to CSV format
+    csv_rows = []
+    for row in parsed_rows:
+        if len(row) >= 13:
+            # Reorder columns: Keep the structure as-is since agents should output in correct order
+            csv_row = ','.join(f'"{col}"' for col in row)
+            csv_rows.append(csv_row)
+    
+    csv_content = header_row + '\n'.join(csv_rows) + '\n'
+    
+    # Build markdown table
+    markdown_rows = []
+    for row in parsed_rows:
+        if len(row) >= 13:
+            # Convert to markdown format
+            markdown_row = '| ' + ' | '.join(row) + ' |'
+            markdown_rows.append(markdown_row)
+    
+    markdown_table += '\n'.join(markdown_rows)
+    
+    # Save CSV file
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    # Replace special characters that cause file system errors
+    safe_manufacturer = research_input.manufacturer.replace('/', '_').replace('\\', '_').replace(' ', '_')
+    csv_filename = f"{research_input.drug_name.replace(' ', '_')}_{safe_manufacturer}_{timestamp}{csv_suffix}.csv"
+    
+    try:
+        # Runs of a batch can finish in the same second: never overwrite another run's CSV
+        suffix = 1
+        while True:
+            try:
+                with open(csv_filename, 'x', newline='', encoding='utf-8') as f:
+                    f.write(csv_content)
+                break
+            except FileExistsError:
+                suffix += 1
+                csv_filename = f"{research_input.drug_name.replace(' ', '_')}_{safe_manufacturer}_{timestamp}{csv_suffix}_{suffix}.csv"
+        csv_status = f"✅ CSV file saved: {csv_filename}"
+    except Exception as e:
+        csv_status = f"❌ Error saving CSV: {str(e)}"
+    
+    # Upsert into the indexed findings database (query with: python findings_store.py query ...)
+    try:
+        findings_store = shared_findings_store()
+        stored = findings_store.upsert_rows(
+            parsed_rows,
+            target_period=f"{research_input.target_month} {research_input.target_year}",
+            run_id=csv_filename[:-4],
+        )
+        csv_status += f"\n✅ {stored} rows upserted into findings database: {findings_store.path}"
+    except Exception as e:
+        csv_status += f"\n❌ Error updating findings database: {str(e)}"
+    
+    return f"{markdown_table}\n\n---\n\n## File Output\n{csv_status}"
+
+
+def bucket_rows_by_month(rows: List[List[str]], research_input) -> Dict[Tuple[int, int], List[List[str]]]:
+    """Validated rows grouped by the month of their YYYY-MM-DD Date, for every month of the research
+    window in order (months without findings get an empty list)"""
+    buckets: Dict[Tuple[int, int], List[List[str]]] = {month: [] for month in research_window(research_input)}
+    for row in rows:
+        month = (int(row[2][:4]), int(row[2][5:7]))
+        if month in buckets:
+            buckets[month].append(row)
+    return buckets
+
+# ========== INPUT DATA MODEL ==========
+class DrugResearchInput(BaseModel):
+    """Structured input for drug research queries"""
+    drug_name: str = Field(description="Brand/trade name of the drug")
+    manufacturer: str = Field(description="Pharmaceutical company that manufactures the drug")
+    generic_name: Optional[str] = Field(default=None, description="Generic/chemical name of the drug")
+    target_month: str = Field(description="Target month for research (e.g., 'January', 'February')")
+    target_year: str = Field(description="Target year for research (e.g., '2024', '2025')")
+    therapeutic_area: Optional[str] = Field(default=None, description="Therapeutic area or indication (optional)")
+    # Date range mode: target_month/target_year is the first month, end_month/end_year the last
+    end_month: Optional[str] = Field(default=None, description="Last month of a date range (optional)")
+    end_year: Optional[str] = Field(default=None, description="Year of end_month (optional, defaults to target_year)")
+
+    @model_validator(mode='after')
+    def check_date_range(self):
+        if self.end_month:
+            if month_number(self.end_month) is None:
+                raise ValueError(f"Unknown end month '{self.end_month}'")
+            if not research_window(self):
+                raise ValueError(f"Date range ends before it starts ({self.get_period()} to "
+                                 f"{self.end_month} {self.end_year or self.target_year})")
+        return self
+
+    def is_date_range(self) -> bool:
+        return len(research_window(self)) > 1
+
+    def get_period(self) -> str:
+        """Label of the research period: "October 2025", or "January 2025 to December 2025" in date range mode"""
+        return research_period(self)
+
+    def for_month(self, year: int, month: int) -> 'DrugResearchInput':
+        """The single-month input of one month of a date range"""
+        return self.model_copy(update={"target_month": MONTHS[month - 1].title(), "target_year": str(year),
+                                       "end_month": None, "end_year": None})
+
+    def get_search_context(self) -> str:
+        """Generate search context string for agents"""
+        context = f"Drug: {self.drug_name}"
+        if self.generic_name:
+            context += f" (Generic: {self.generic_name})"
+        context += f" | Manufacturer: {self.manufacturer}"
+        context += f" | Time Period: {self.get_period()}"
+        if self.therapeutic_area:
+            context += f" | Therapeutic Area: {self.therapeutic_area}"
+        return context
+
+    def get_temporal_constraint(self) -> str:
+        """Generate temporal constraint for searches"""
+        return f"Only search for information from {self.get_period()} or specify if data is from a different time period"
+
+# ========== STRUCTURED OUTPUT INSTRUCTIONS ==========
+STRUCTURED_OUTPUT_INSTRUCTIONS = """
+
+CRITICAL: Format ALL your findings as table rows using this EXACT format:
+
+| Category | Sub Category | Date | Drug Name | Generic Name | Manufacturer | Disease Name | Development Summary | Detailed Description | Country | Competitive Implication | Patient Population Affected | URL |
+
+NOTE: URL is the LAST column (13th position)!
+
+MANDATORY OUTPUT REQUIREMENTS:
+1. Each finding must be ONE table row in the above format
+2. Use pipe (|) separators between columns
+3. Fill ALL columns for each row - use "Not Available" if information is missing
+4. Detailed Description must be comprehensive (100-200 words capturing ALL relevant information from the source)
+5. Date format: STRICTLY use YYYY-MM-DD format ONLY (e.g., 2025-10-15). NEVER use "Month YYYY" format. If exact day is unknown, use first day of month (e.g., 2025-10-01)
+6. URL: Include ONLY working, accessible URLs - Verify URLs work before including. Use direct links to PDFs or primary sources when available. If URL doesn't work, mark as "Not Available"
+7. Country: Specify US, Canada, or "US, Canada" - be specific
+8. Competitive Implication: Provide strategic analysis (2-4 sentences) focusing on impact on key competitors (Dupixent, Adbry, Opzelura, Ebglyss, etc.). If document contains no competitive implication, write "No competitive implication stated."
+9. Patient Population Affected: Use exact phrasing from document (e.g., "Adults ≥18 with moderate-to-severe atopic dermatitis inadequately controlled by topical corticosteroids")
+10. Provide multiple rows if you find multiple relevant findings
+11. Date Extraction Priority: Use effective date from document, then publication date, then regulatory action date - ALL must be within specified month/year
+
+EXAMPLE ROW FORMAT:
+| Marketed Assets | Label Updates | 2025-09-18 | Opzelura | ruxolitinib | Incyte | atopic dermatitis | FDA approved expanded indication for children ages 2-11 | FDA approved supplemental New Drug Application (sNDA) for Opzelura (ruxolitinib) cream 1.5% for short-term and non-continuous chronic treatment of mild to moderate atopic dermatitis in non-immunocompromised children 2 years and older. Approval based on pivotal Phase 3 TRuE-AD3 trial (NCT04921969) that met primary endpoint of IGA-TS and secondary endpoint of EASI75. Safety profile consistent with previous data with no new safety signals. Most common adverse reaction was upper respiratory tract infection. Regulatory driver: sNDA approval following successful Phase 3 pediatric trial results. | United States | Significant competitive advantage for Opzelura over Dupixent, Adbry, and other systemic agents by expanding into younger pediatric population where topical alternatives are preferred. First JAK inhibitor approved for this age group in AD, potentially capturing market share from topical corticosteroids and positioning favorably against biologics requiring injections in young children. | Non-immunocompromised children ages 2-11 years with mild to moderate atopic dermatitis whose disease is not well controlled with topical prescription therapies or when those therapies are not recommended | https://www.drugs.com/newdrugs/incyte-announces-additional-fda-approval-opzelura-ruxolitinib-cream-children-ages-2-11-atopic-6615.html |
+
+CRITICAL CATEGORY RESTRICTIONS:
+- ONLY use "Marketed Assets" as the Category for ALL findings
+- ALLOWED Sub Categories (use these EXACTLY):
+  * Label Updates (for FDA approvals, sNDAs, indication expansions)
+  * Safety Concern (for safety warnings, adverse events, recalls)
+  * Market Dynamics (for market access, formulary listings, pricing changes)
+  * Guideline Update (for treatment guideline changes, care standards)
+  * Clinical Data (for published study results, trial outcomes)
+  * Regulatory Delay (for delayed approvals, missed PDUFA dates)
+  * RWE Study (for real-world evidence, observational studies)
+
+DO NOT use any other categories or subcategories!
+
+CRITICAL DATE EXTRACTION RULES:
+- Date MUST be in STRICT YYYY-MM-DD format (e.g., 2025-10-15)
+- NEVER use "October 2025" or "Month YYYY" format
+- Date Priority Order:
+  1. Use effective date from document (the date the change became effective)
+  2. If no effective date, use document publication/posting date
+  3. If no explicit date, use regulatory action date mentioned
+  4. If exact day unknown but month confirmed, use first day (e.g., 2025-10-01)
+- All dates MUST fall within the specified target month
+- Cross-reference multiple date fields in source documents
+- Flag and exclude any dates outside the target period
+
+URL VALIDATION REQUIREMENTS:
+- ONLY include URLs that are accessible and lead to the actual document
+- Prefer direct links to PDFs or primary sources
+- For press releases referencing documents, include primary PDF URL
+- Test URLs before including - if a URL doesn't work, mark as "Not Available"
+- For multiple URLs: put primary first, append others in parentheses
+- Never include URLs to documents that don't exist or return 404
+
+EVIDENCE EXTRACTION STANDARDS:
+- Extract ONLY facts explicitly present in the document
+- Do NOT infer, speculate, or add interpretation
+- For each field, capture direct quotes when possible
+- Include page/paragraph reference for PDFs (e.g., "see p.3, item 2")
+- Maintain source URL and retrieval timestamp
+- If document references multiple drugs/developments, create separate row for each
+
+CLINICAL TRIAL REPORTING STANDARDS (if applicable):
+1. Maintain boundaries between different trials - format: "[STUDY NAME] (N=[sample size]): [finding]"
+2. ALL efficacy/safety results MUST include comparator: "X% treatment group vs. Y% comparator group"
+3. When source mentions multiple studies, extract each study's data separately with clear labeling
+
+"""
+
+if OUTPUT_MODE == "structured":
+    STRUCTURED_OUTPUT_INSTRUCTIONS = """
+
+OUTPUT MODE: Return your findings as the ResearchFindings schema - one ResearchFinding object per finding
+(an empty list if nothing was found) instead of markdown table rows. Every field rule below applies to the
+corresponding field; the table layout is only shown to define the fields and their order.
+""" + STRUCTURED_OUTPUT_INSTRUCTIONS
+
+
+# ========== RESEARCH INSTRUCTIONS ==========
+
+# Enhanced Research Instructions with Deep Search Strategy
+ENHANCED_RESEARCH_INSTRUCTIONS = """
+
+CRITICAL: You MUST conduct multiple, varied searches REGARDLESS OF THE DATE PROVIDED. Use ALL available tools for deep research.
+
+AVAILABLE TOOLS - USE THEM ALL:
+0. Local Search Index (search_local_index) - ALWAYS query first; documents already fetched in earlier runs, no API cost
+1. Tavily Tools - Primary search engine
+2. Exa Tools - Deep semantic search with content understanding
+3. Trafilatura Tools - Web scraping for full content extraction
+   PDF Tools (get_pdf_page_count, read_pdf_pages) - Read specific pages of PDF documents
+4. DuckDuckGo Tools - Additional search engine with unique results
+
+SEARCH STRATEGY:
+
+0. LOCAL INDEX FIRST:
+   - Call search_local_index with the drug name and event type before any web search
+   - Reuse relevant indexed documents; still run web searches for anything not covered
+
+1. PRIMARY SEARCHES (Use Tavily + Exa + DuckDuckGo):
+   - Search: "drug name" + "event type" + "month year"
+   - Company press releases: site:company.com + "drug name" + date
+   - Regulatory sites: site:fda.gov + "drug name" + date
+   - Search with filetype:pdf for downloadable documents
+   - USE EXA for semantic search to find conceptually related content
+   - USE TRAFILATURA to scrape full content from URLs you find (results are pre-ranked by relevance - scrape from the top)
+
+2. SECONDARY SEARCHES (If primary fails):
+   - Use alternative date formats: "Oct 2024", "2024-10", "October 20, 2024"
+   - Search with generic name if brand name yields no results
+   - Try competitor comparisons: "drug name vs competitor" + date
+   - Look for conference abstracts: "drug name" + "conference" + date
+
+3. DEEP CONTENT EXTRACTION:
+   - When you find a relevant URL, USE TRAFILATURA to scrape full content
+   - Look for PDFs: "drug name" filetype:pdf + date
+   - For PDF links use read_pdf_pages with a page range (e.g. "1-3") instead of scraping the whole file; cite pages as "see p.3"
+   - Check regulatory databases: FDA, Health Canada, ClinicalTrials.gov
+   - Search medical journals: site:nejm.org OR site:jama.com + "drug name" + date
+   - USE EXA to find semantically similar documents
+
+4. MULTI-TOOL VALIDATION:
+   - Cross-reference findings from multiple tools
+   - Use Tavily for broad search, Exa for deep understanding, DuckDuckGo for alternative sources
+   - Use Trafilatura to extract full content from promising URLs
+   - If you find information from one tool, verify with another tool
+
+5. HANDLING "NO DATA FOUND":
+   - MUST try ALL tools (Tavily, Exa, DuckDuckGo) before reporting "no data"
+   - USE TRAFILATURA to scrape any URLs you find
+   - Try at least 5-10 different search strategies across all tools
+   - NEVER assume "no data" just because of the date - ACTUALLY USE ALL TOOLS
+   - Look for press releases, filings, or announcements near the date
+   - Check if the event happened but was published slightly later
+   - Only report "no data found" if ALL tools and searches return empty results
+
+MANDATORY: Before reporting "no data", you must:
+- Have used Tavily search at least 3 times with different queries
+- Have used Exa search at least 2 times with different queries
+- Have used DuckDuckGo search at least 2 times with different queries
+- Have attempted scraping URLs if any were found
+
+"""
+
+# Search guidance for the fast profile: one provider and a small tool-call budget
+FAST_SEARCH_INSTRUCTIONS = """
+
+QUICK CHECK MODE: You have a budget of only a few tool calls - spend them well.
+
+AVAILABLE TOOLS:
+0. Local Search Index (search_local_index) - query first; documents fetched in earlier runs, no API cost
+1. Tavily Tools - the only web search engine in this mode
+
+SEARCH STRATEGY:
+- One search_local_index call with the drug name and event type
+- Then 1-3 targeted Tavily searches: "drug name" + "event type" + "month year", or site:fda.gov / site:company.com
+- Results are pre-ranked by relevance; report findings from the top results instead of searching further
+- If nothing is found within the budget, say so - do not keep searching
+
+"""
+
+# ========== RESEARCH PROFILES ==========
+
+@dataclass(frozen=True)
+class ResearchProfile:
+    """Models, providers, agents and budgets of one way of running the research"""
+    name: str
+    description: str
+    research_model: str
+    support_model: str
+    # Toolkits given to research agents, in order: local_index, tavily, exa, scraping, pdf, duckduckgo
+    providers: Tuple[str, ...]
+    # Research agents run in Phase 1 (keys of RESEARCH_AGENT_SPECS), in order
+    agents: Tuple[str, ...]
+    # Phases 2-4: knowledge synthesis, content analysis and validation
+    support_phases: bool = True
+    # Max tool calls per agent run (None = unlimited)
+    tool_call_limit: Optional[int] = None
+    # Gemini thinking budget for research and support agents (None = model default)
+    thinking_budget: Optional[int] = None
+    # Opening instruction of every research agent
+    search_instruction: str = ""
+    # Include ENHANCED_RESEARCH_INSTRUCTIONS for agents whose spec asks for it
+    enhanced_search: bool = False
+    # Extra search guidance given to every research agent
+    search_strategy: str = ""
+    # Cheaper model and tool-call budget for low-yield research agents in economy mode (None = no downgrade)
+    economy_model: Optional[str] = None
+    economy_tool_call_limit: Optional[int] = None
+    # Tool-less model that repairs malformed rows in one batch
+    repair_model: str = os.getenv("DRUG_RESEARCH_REPAIR_MODEL", "gemini-2.5-flash")
+
+
+PROFILES: Dict[str, ResearchProfile] = {
+    "deep": ResearchProfile(
+        name="deep",
+        description="Multi-agent pharmaceutical research with structured table output",
+        research_model=os.getenv("DRUG_RESEARCH_DEEP_MODEL", "gemini-2.5-pro"),
+        support_model=os.getenv("DRUG_RESEARCH_DEEP_MODEL", "gemini-2.5-pro"),
+        providers=("local_index", "tavily", "exa", "scraping", "pdf", "duckduckgo"),
+        agents=("market_research", "clinical_trials", "copay_coverage", "breakthrough",
+                "regulatory", "safety", "competitive_intel"),
+        thinking_budget=1280,
+        enhanced_search=True,
+        economy_model=os.getenv("DRUG_RESEARCH_ECONOMY_MODEL", "gemini-2.5-flash"),
+        economy_tool_call_limit=int(os.getenv("DRUG_RESEARCH_ECONOMY_TOOL_CALLS", "6")),
+        search_instruction="CRITICAL: NEVER refuse to search based on date. Use all available tools (Tavily, Exa, scraping, DuckDuckGo) to conduct deep searches. If the user asks for October 2025 data, you MUST search using these tools and report results.",
+    ),
+    "tavily": ResearchProfile(
+        name="tavily",
+        description="Structured pharmaceutical research system using Tavily with table output",
+        research_model=os.getenv("DRUG_RESEARCH_TAVILY_MODEL", "gpt-4o"),
+        support_model=os.getenv("DRUG_RESEARCH_TAVILY_SUPPORT_MODEL", "gpt-4o-mini"),
+        providers=("local_index", "tavily"),
+        agents=("market_research", "clinical_trials", "copay_coverage", "breakthrough",
+                "regulatory", "safety", "competitive_intel"),
+        repair_model=os.getenv("DRUG_RESEARCH_REPAIR_MODEL", "gpt-4o-mini"),
+        search_instruction="CRITICAL: NEVER refuse to search based on date. Use the local index and Tavily search to find results for the requested month and year and report what they return.",
+    ),
+    "fast": ResearchProfile(
+        name="fast",
+        description="Quick pharmaceutical research check (Tavily only) with structured table output",
+        research_model=os.getenv("DRUG_RESEARCH_FAST_MODEL", "gemini-2.5-flash"),
+        support_model=os.getenv("DRUG_RESEARCH_FAST_MODEL", "gemini-2.5-flash"),
+        providers=("local_index", "tavily"),
+        agents=("market_research", "regulatory", "safety"),
+        support_phases=False,
+        tool_call_limit=int(os.getenv("DRUG_RESEARCH_FAST_TOOL_CALLS", "4")),
+        search_instruction="CRITICAL: NEVER refuse to search based on date. Use the local index and Tavily search to find results for the requested month and year and report what they return.",
+        search_strategy=FAST_SEARCH_INSTRUCTIONS,
+    ),
+}
+
+
+def get_profile(profile) -> ResearchProfile:
+    """Resolve a profile name (or pass a ResearchProfile through)"""
+    if isinstance(profile, ResearchProfile):
+        return profile
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown research profile '{profile}' (choose from: {', '.join(PROFILES)})")
+    return PROFILES[profile]
+
+
+def planner_calls(profile: ResearchProfile) -> int:
+    """Searches the query planner pre-fetches per research agent. In a profile with a tool_call_limit
+    they come out of the agents' budget: the planner takes half of it, the agent keeps the rest"""
+    if not QUERY_PLANNER:
+        return 0
+    if profile.tool_call_limit is None:
+        return PLANNER_CALLS_PER_AGENT
+    return min(PLANNER_CALLS_PER_AGENT, profile.tool_call_limit // 2)
+
+
+def research_tool_call_limit(profile: ResearchProfile) -> Optional[int]:
+    """Tool calls left to a research agent once the query planner has made its searches"""
+    if profile.tool_call_limit is None:
+        return None
+    return max(1, profile.tool_call_limit - planner_calls(profile))
+
+
+class RateLimitedModel:
+    """Mixin that queues every model request for a token of the provider's shared rate limit bucket,
+    so concurrent agents and worker processes stay under the API quota instead of hitting 429s"""
+    rate_limit_provider = ""
+
+    def invoke(self, *args, **kwargs):
+        wait_for_quota(self.rate_limit_provider)
+        return super().invoke(*args, **kwargs)
+
+    async def ainvoke(self, *args, **kwargs):
+        await wait_for_quota_async(self.rate_limit_provider)
+        return await super().ainvoke(*args, **kwargs)
+
+    def invoke_stream(self, *args, **kwargs):
+        wait_for_quota(self.rate_limit_provider)
+        yield from super().invoke_stream(*args, **kwargs)
+
+    async def ainvoke_stream(self, *args, **kwargs):
+        await wait_for_quota_async(self.rate_limit_provider)
+        async for response in super().ainvoke_stream(*args, **kwargs):
+            yield response
+
+
+@dataclass
+class RateLimitedGemini(RateLimitedModel, Gemini):
+    rate_limit_provider = "gemini"
+
+
+@dataclass
+class RateLimitedOpenAIChat(RateLimitedModel, OpenAIChat):
+    rate_limit_provider = "openai"
+
+
+def make_model(model_id: str, thinking_budget: Optional[int] = None):
+    """Gemini or OpenAI chat model for a model id, rate limited per API key (see rate_limit.py)"""
+    if model_id.startswith(("gpt-", "o1", "o3", "o4")):
+        return RateLimitedOpenAIChat(id=model_id)
+    if thinking_budget:
+        return RateLimitedGemini(id=model_id, thinking_budget=thinking_budget, include_thoughts=True)
+    return RateLimitedGemini(id=model_id)
+
+
+# ========== SHARED CACHES ==========
+# One search index, findings database, relevance filter, passage selector and set of provider
+# guards per process, shared by every profile. Created on first use so importing the engine
+# opens no files and builds no clients.
+
+_shared: Dict[str, object] = {}
+_shared_lock = threading.Lock()
+
+
+def _shared_instance(key: str, factory: Callable):
+    with _shared_lock:
+        if key not in _shared:
+            _shared[key] = factory()
+        return _shared[key]
+
+
+def shared_search_index() -> SearchIndex:
+    return _shared_instance("search_index", SearchIndex)
+
+
+def shared_findings_store() -> FindingsStore:
+    return _shared_instance("findings_store", FindingsStore)
+
+
+def shared_verdict_store() -> VerdictStore:
+    return _shared_instance("verdict_store", VerdictStore)
+
+
+def shared_provenance_store() -> ProvenanceStore:
+    return _shared_instance("provenance_store", ProvenanceStore)
+
+
+def shared_relevance_filter() -> RelevanceFilter:
+    return _shared_instance("relevance_filter", RelevanceFilter)
+
+
+def shared_passage_selector() -> PassageSelector:
+    return _shared_instance("passage_selector", PassageSelector)
+
+
+def shared_yield_history() -> YieldHistory:
+    return _shared_instance("yield_history", YieldHistory)
+
+
+def shared_latency_history() -> LatencyHistory:
+    return _shared_instance("latency_history", LatencyHistory)
+
+
+# Provider -> (guard name, timeout env var, default timeout seconds, may hedge)
+PROVIDER_GUARDS = {
+    "tavily": ("Tavily", "TAVILY_TIMEOUT_SECONDS", "30", True),
+    "exa": ("Exa", "EXA_TIMEOUT_SECONDS", "45", True),
+    "duckduckgo": ("DuckDuckGo", "DDG_TIMEOUT_SECONDS", "20", True),
+    "scraping": ("Trafilatura", "TRAFILATURA_TIMEOUT_SECONDS", "45", False),
+    "pdf": ("PDF", "PDF_TIMEOUT_SECONDS", "120", False),
+}
+
+
+def provider_guard(provider: str) -> ProviderGuard:
+    """The process-wide guard of a provider, so breakers, rate limits and latency stats span profiles.
+    Set DRUG_RESEARCH_HEDGING=1 to also fire the query at an alternate provider once the
+    primary exceeds its p95 latency (costs extra quota on slow calls)."""
+    name, timeout_env, default_timeout, may_hedge = PROVIDER_GUARDS[provider]
+    hedging = may_hedge and os.getenv("DRUG_RESEARCH_HEDGING", "0") == "1"
+    return _shared_instance(f"guard:{provider}", lambda: ProviderGuard(
+        name, timeout=float(os.getenv(timeout_env, default_timeout)), hedging=hedging,
+        rate_limit=provider_bucket(provider)))
+
+
+# ========== TOOLKITS ==========
+
+# agno tool modules are imported on demand, so a profile only needs its own providers installed.
+# API clients holding a requests session, and the PDF fetcher, are put on the shared keep-alive
+# connection pools with cached DNS (see http_pool)
+def _new_toolkit(provider: str):
+    if provider == "tavily":
+        from agno.tools.tavily import TavilyTools
+        return pool_toolkit(TavilyTools())
+    if provider == "exa":
+        from agno.tools.exa import ExaTools
+        return pool_toolkit(ExaTools())  # Need EXA_API_KEY env variable
+    if provider == "scraping":
+        from agno.tools.trafilatura import TrafilaturaTools  # Web scraping, no API key needed
+        return pool_toolkit(TrafilaturaTools())
+    if provider == "duckduckgo":
+        from agno.tools.duckduckgo import DuckDuckGoTools  # Additional search, no API key needed
+        return pool_toolkit(DuckDuckGoTools())
+    if provider == "pdf":
+        from pdf_fetch import PdfTools  # Streams PDFs to a size-capped cache, extracts requested pages only
+        return PdfTools(client=shared_client() if HTTP_POOL else None)
+    raise ValueError(f"Unknown provider '{provider}'")
+
+
+INDEX_SOURCES = {"tavily": "Tavily", "exa": "Exa", "duckduckgo": "DuckDuckGo", "scraping": "Trafilatura", "pdf": "PDF"}
+PAGE_PROVIDERS = ("scraping", "pdf")
+RANKED_PROVIDERS = ("tavily", "exa", "duckduckgo")
+
+# Fallback search method on another provider, used when the primary fails, times out or is hedged
+ALTERNATES = {
+    "tavily": ("web_search_using_tavily", "duckduckgo", "duckduckgo_search"),
+    "exa": ("search_exa", "tavily", "web_search_using_tavily"),
+    "duckduckgo": ("duckduckgo_search", "tavily", "web_search_using_tavily"),
+}
+
+
+def build_toolkits(profile: ResearchProfile, toolkit_factory: Optional[Callable[[str], object]] = None) -> Dict[str, object]:
+    """Create a profile's toolkits with every wrapper layered on (guard -> index -> rank -> condense).
+    ``toolkit_factory`` (provider -> toolkit) replaces the real clients, e.g. with fake_backends toolkits"""
+    toolkit_factory = toolkit_factory or _new_toolkit
+    toolkits = {provider: toolkit_factory(provider) for provider in profile.providers if provider != "local_index"}
+
+    # Per-call deadlines and circuit breakers so one slow/failing provider cannot stall an agent.
+    # Alternates are the raw search methods of another provider of the profile, routed through that provider's guard
+    for provider, toolkit in toolkits.items():
+        alternates = {}
+        if provider in ALTERNATES:
+            tool_name, alternate, alternate_tool = ALTERNATES[provider]
+            if alternate in toolkits:
+                alternates[tool_name] = (provider_guard(alternate), getattr(toolkits[alternate], alternate_tool))
+        guard_toolkit(toolkit, provider_guard(provider), alternates=alternates)
+
+    # Every search hit and scraped page is kept in the local FTS index that agents query first
+    search_index = shared_search_index()
+    for provider, toolkit in toolkits.items():
+        index_toolkit(toolkit, search_index, INDEX_SOURCES[provider],
+                      kind="page" if provider in PAGE_PROVIDERS else "search")
+    if "local_index" in profile.providers:
+        toolkits["local_index"] = SearchIndexTools(search_index)
+
+    # ...and appended once to the provenance blob file, so final rows can be linked to their source passage
+    if PROVENANCE:
+        provenance = shared_provenance_store()
+        for provider, toolkit in toolkits.items():
+            if provider in INDEX_SOURCES:
+                provenance_toolkit(toolkit, provenance, INDEX_SOURCES[provider],
+                                   kind="page" if provider in PAGE_PROVIDERS else "search")
+
+    # Agents only see the top-k hits scoring above the threshold against the research input,
+    # so they scrape fewer marginal pages (the index above still keeps every raw hit)
+    for provider in RANKED_PROVIDERS:
+        if provider in toolkits:
+            rank_toolkit(toolkits[provider], shared_relevance_filter())
+
+    # Only the highest scoring passages of a scraped page (within a token budget, tagged with
+    # character offsets into the full text) are forwarded to the model; the index keeps the full page
+    if "scraping" in toolkits:
+        condense_toolkit(toolkits["scraping"], shared_passage_selector())
+
+    # Outermost layer: calls, time and local index hits per agent run, for run_report.json
+    for provider, toolkit in toolkits.items():
+        meter_toolkit(toolkit, provider)
+
+    return toolkits
+
+
+# ========== RESEARCH AGENT SPECS ==========
+
+@dataclass(frozen=True)
+class ResearchAgentSpec:
+    """Role of one Phase 1 research agent, independent of model and tools"""
+    key: str
+    label: str
+    name: str
+    # What Phase 1 asks the agent to research ("Research <topic> for ...")
+    topic: str
+    role_instructions: List[str] = field(default_factory=list)
+    enhanced_search: bool = False
+
+
+CATEGORY_INSTRUCTIONS = [
+    "MANDATORY: Use ONLY 'Marketed Assets' as Category",
+    "Use appropriate subcategories: Label Updates, Safety Concern, Market Dynamics, Guideline Update, Clinical Data, Regulatory Delay, or RWE Study",
+]
+
+RESEARCH_AGENT_SPECS: Dict[str, ResearchAgentSpec] = {spec.key: spec for spec in [
+    ResearchAgentSpec(
+        key="market_research", label="Market Research", topic="market data",
+        name="Drug Market Research Specialist",
+        enhanced_search=True,
+        role_instructions=[
+            "You are a pharmaceutical market research specialist with STRICT INPUT ADHERENCE:",
+            "",
+            "MANDATORY REQUIREMENTS:",
+            "1. ONLY search for the EXACT drug name, manufacturer, and generic name provided",
+            "2. Conduct comprehensive searches for the SPECIFIC month and year provided - search tools may find data regardless of date",
+            "3. If searches return no results, then clearly state this - but DO NOT assume no data exists just because it's a 'future' date",
+            "4. Do NOT search for similar drugs or different time periods",
+            "",
+            "YOUR RESEARCH FOCUS:",
+            "1. Market size, revenue, and growth trends for the SPECIFIC drug",
+            "2. Competitor analysis and market share data for that EXACT time period",
+            "3. Pricing strategies and market access for the specified drug",
+            "4. Market forecasts specifically mentioning the target drug",
+            "5. Regulatory approvals affecting the specified drug in that time frame",
+            "",
+            "ENHANCED SEARCH STRATEGIES:",
+            "- Search company press releases and investor presentations (site:company.com + 'press release' + date)",
+            "- Look for FDA/Health Canada notices, label changes, safety communications",
+            "- Search for payer/insurance documents (copay, formulary, medical policy, coverage)",
+            "- Include SEC filings (site:sec.gov) and HTA documents",
+            "- Use filetype:pdf to find downloadable documents",
+            "- For Market Dynamics: search formulary listings, PBM memos, coverage changes",
+        ],
+    ),
+    ResearchAgentSpec(
+        key="clinical_trials", label="Clinical Trials", topic="clinical trials",
+        name="Clinical Trials Research Specialist",
+        role_instructions=[
+            "You are a clinical trials research specialist with STRICT INPUT ADHERENCE:",
+            "",
+            "MANDATORY REQUIREMENTS:",
+            "1. ONLY search for trials involving the EXACT drug name provided",
+            "2. Conduct comprehensive searches for the SPECIFIC month and year - use search tools without date assumptions",
+            "3. Include manufacturer name in searches to avoid confusion with similar drugs",
+            "4. If using generic name, ensure it matches the specified drug exactly",
+            "5. DO NOT assume data doesn't exist - SEARCH FIRST, then report results",
+            "YOUR RESEARCH FOCUS:",
+            "1. Clinical trials for the SPECIFIC drug in the target time period",
+            "2. Trial results and data published/updated in that exact month/year",
+            "3. FDA submissions and regulatory filings for that specific time frame",
+            "4. Trial phase updates and recruitment status from that period",
+            "5. Principal investigator announcements for the specified drug/time",
+            "",
+            "ENHANCED SEARCH STRATEGIES:",
+            "- Check site:clinicaltrials.gov for trial updates with specific date range",
+            "- Search medical journals (NEJM, JAMA, Lancet) and conference abstracts",
+            "- Look for published results, interim data, readouts from specific time period",
+            "- Search for pivotal trials, Phase 3 results, primary endpoints",
+            "- For Clinical Data subcategory: focus on published peer-reviewed results",
+        ],
+    ),
+    ResearchAgentSpec(
+        key="copay_coverage", label="Coverage & Copay", topic="coverage information",
+        name="Drug Coverage & Copay Specialist",
+        role_instructions=[
+            "You are a drug coverage and copay research specialist with STRICT INPUT ADHERENCE:",
+            "",
+            "MANDATORY REQUIREMENTS:",
+            "1. ONLY research coverage for the EXACT drug name provided",
+            "2. Conduct comprehensive searches for the SPECIFIC month and year provided",
+            "3. Include manufacturer name to distinguish from similar drugs",
+            "4. DO NOT reject searches based on date - let search tools find data if it exists",
+            "",
+            "YOUR RESEARCH FOCUS:",
+            "1. Insurance formulary changes for the specific drug in target month/year",
+            "2. Copay assistance program updates from that exact time period",
+            "3. Medicare/Medicaid coverage policy changes for that drug/timeframe",
+            "4. Prior authorization requirement updates in the specified period",
+            "5. Patient access program announcements from that month/year",
+            "",
+            "ENHANCED SEARCH STRATEGIES:",
+            "- Search PBM documents (site:express-scripts.com OR site:optum.com OR site:cvs.com + 'medical policy')",
+            "- Look for CMS/Medicaid coverage memos and provincial formulary updates",
+            "- Search for copay cards, patient assistance programs, reimbursement policies",
+            "- Include payer bulletins, coverage criteria, formulary tier changes",
+            "- Use terms: 'copay', 'reimbursement memo', 'medical policy', 'formulary decision', 'coverage criteria'",
+            "- Search filetype:pdf for downloadable policy documents",
+        ],
+    ),
+    ResearchAgentSpec(
+        key="breakthrough", label="Breakthrough Research", topic="breakthrough developments",
+        name="Drug Breakthrough & Innovation Specialist",
+        role_instructions=[
+            "You are a breakthrough drugs and innovation specialist with STRICT INPUT ADHERENCE:",
+            "",
+            "MANDATORY REQUIREMENTS:",
+            "1. ONLY search for breakthrough designations for the EXACT drug specified",
+            "2. Conduct comprehensive searches for the SPECIFIC month and year using search tools",
+            "3. Include manufacturer name to ensure correct drug identification",
+            "4. DO NOT assume future dates have no data - SEARCH and find results if they exist",
+            "",
+            "YOUR RESEARCH FOCUS:",
+            "1. FDA breakthrough therapy designations for the specific drug in target period",
+            "2. Orphan drug designations announced in that exact month/year",
+            "3. Accelerated approval pathway updates for the specified drug/timeframe",
+            "4. Scientific publication mentions of the drug from that time period",
+            "5. Innovation awards or recognition for the specific drug in that timeframe",
+            "",
+            "ENHANCED SEARCH STRATEGIES:",
+            "- Search FDA BLA/NDA approval letters and breakthrough designations",
+            "- Look for FDA approvals, PDUFA dates, regulatory communications",
+            "- Search site:fda.gov + drug name + date for label updates",
+            "- Check for orphan drug designations (site:fda.gov/rare-diseases)",
+            "- For Label Updates subcategory: focus on FDA approval actions and label changes",
+        ],
+    ),
+    ResearchAgentSpec(
+        key="regulatory", label="Regulatory Analysis", topic="regulatory updates",
+        name="Drug Regulatory & Compliance Specialist",
+        role_instructions=[
+            "You are a pharmaceutical regulatory specialist with STRICT INPUT ADHERENCE:",
+            "",
+            "MANDATORY REQUIREMENTS:",
+            "1. ONLY search for regulatory updates for the EXACT drug specified",
+            "2. Conduct comprehensive searches for the SPECIFIC month and year",
+            "3. Include manufacturer name in all searches for precise identification",
+            "4. Search regulatory sources without date-based assumptions",
+            "",
+            "YOUR RESEARCH FOCUS:",
+            "1. FDA approvals/rejections for the specific drug in target month/year",
+            "2. Regulatory guidance updates affecting the drug in that period",
+            "3. Safety communications specific to the drug from that timeframe",
+            "4. Manufacturing compliance issues for the drug/manufacturer in that period",
+            "5. REMS program updates for the specific drug in target timeframe",
+            "",
+            "ENHANCED SEARCH STRATEGIES:",
+            "- Search site:fda.gov for safety communications, MedWatch alerts",
+            "- Look for 'Dear Healthcare Provider' letters and FDA warnings",
+            "- Check for product monograph updates, prescribing information changes",
+            "- Search Health Canada notices (site:healthycanadians.gc.ca)",
+            "- For Safety Concern subcategory: focus on adverse events, recalls, warnings",
+        ],
+    ),
+    ResearchAgentSpec(
+        key="safety", label="Safety Monitoring", topic="safety information",
+        name="Drug Safety & Adverse Events Specialist",
+        role_instructions=[
+            "You are a drug safety and adverse events specialist with STRICT INPUT ADHERENCE:",
+            "",
+            "MANDATORY REQUIREMENTS:",
+            "1. ONLY search for safety data for the EXACT drug specified",
+            "2. Conduct comprehensive searches using the provided month and year",
+            "3. Include manufacturer name to distinguish from other similar drugs",
+            "4. Use search tools without date restrictions - find data if it exists",
+            "",
+            "YOUR RESEARCH FOCUS:",
+            "1. Adverse event reports for the specific drug in target month/year",
+            "2. FDA safety communications about the drug from that exact period",
+            "3. Drug recall notices for the specific drug/manufacturer in that timeframe",
+            "4. Safety profile updates or label changes from that period",
+            "5. Pharmacovigilance data specific to the drug from that month/year",
+            "",
+            "ENHANCED SEARCH STRATEGIES:",
+            "- Search FDA MedWatch, Health Canada advisories for that specific period",
+            "- Look for safety data sheets, pharmacovigilance reports",
+            "- Check for drug recalls, manufacturing issues, safety labeling changes",
+            "- Search terms: 'safety', 'adverse event', 'warning', 'precaution', 'MedWatch'",
+            "- For Safety Concern subcategory: focus on documented safety issues and warnings",
+        ],
+    ),
+    ResearchAgentSpec(
+        key="competitive_intel", label="Competitive Intelligence", topic="competitive intelligence",
+        name="Drug Competitive Intelligence Specialist",
+        role_instructions=[
+            "You are a pharmaceutical competitive intelligence specialist with STRICT INPUT ADHERENCE:",
+            "",
+            "MANDATORY REQUIREMENTS:",
+            "1. ONLY search for competitive intelligence about the EXACT drug specified",
+            "2. Conduct comprehensive searches for the SPECIFIC month and year provided",
+            "3. Include manufacturer name to ensure correct drug identification",
+            "4. DO NOT reject searches based on date assumptions - let search tools work",
+            "",
+            "YOUR RESEARCH FOCUS:",
+            "1. Competitor drug launches targeting the same indication in that period",
+            "2. Patent challenges or generic competition announcements for that timeframe",
+            "3. Biosimilar developments affecting the specific drug in target period",
+            "4. Partnership or licensing deals involving the drug from that month/year",
+            "5. Market positioning changes for the drug in the specified timeframe",
+            "",
+            "ENHANCED SEARCH STRATEGIES:",
+            "- Compare against Dupixent, Adbry, Opzelura, Ebglyss, Cibinqo, Rinvoq",
+            "- Look for competitor FDA approvals, market entry, new indications",
+            "- Search for head-to-head studies, comparative effectiveness data",
+            "- Monitor competitor websites, press releases, investor presentations",
+            "- For competitive analysis: focus on how developments affect market positioning",
+        ],
+    ),
+]}
+
+
+def research_instructions(spec: ResearchAgentSpec, profile: ResearchProfile) -> List[str]:
+    """Full instruction list of a research agent under a profile"""
+    instructions = [profile.search_instruction, ""]
+    if spec.enhanced_search and profile.enhanced_search:
+        instructions += [ENHANCED_RESEARCH_INSTRUCTIONS, ""]
+    if profile.search_strategy:
+        instructions += [profile.search_strategy, ""]
+    return instructions + spec.role_instructions + [STRUCTURED_OUTPUT_INSTRUCTIONS, ""] + CATEGORY_INSTRUCTIONS
+
+
+# ========== RESEARCH TEAM ==========
+
+@dataclass
+class ResearchTeam:
+    """The agents of one profile; support agents are None when the profile skips those phases"""
+    profile: ResearchProfile
+    # Research agents keyed by spec key, in Phase 1 order
+    agents: Dict[str, Agent]
+    knowledge_agent: Optional[Agent] = None
+    content_analyzer: Optional[Agent] = None
+    validation_agent: Optional[Agent] = None
+    row_repair_agent: Optional[Agent] = None
+    toolkits: Dict[str, object] = field(default_factory=dict)
+    # Research agents on the profile's economy model, run instead of the full agents in economy mode
+    economy_agents: Dict[str, Agent] = field(default_factory=dict)
+
+    def phase_one(self) -> List[Tuple[str, str, Agent, str]]:
+        """(key, label, agent, topic) for every research agent"""
+        return [(key, RESEARCH_AGENT_SPECS[key].label, agent, RESEARCH_AGENT_SPECS[key].topic)
+                for key, agent in self.agents.items()]
+
+    def all_agents(self) -> List[Agent]:
+        """Research and support agents, for serving through AgentOS"""
+        support = [self.knowledge_agent, self.content_analyzer, self.validation_agent]
+        return list(self.agents.values()) + [agent for agent in support if agent is not None]
+
+    def repair_rows(self, prompt: str, results: Optional[list] = None) -> List[List[str]]:
+        """Send the batched repair prompt to the row repair agent and parse its rows
+        (the raw agent result is appended to ``results`` when given)"""
+        result = self.row_repair_agent.run(prompt)
+        if results is not None:
+            results.append(result)
+        return clean_table_data(extract_content(result))
+
+    def validate_rows(self, prompt: str, results: Optional[list] = None,
+                      malformed: Optional[List[List[str]]] = None) -> List[List[str]]:
+        """Send one batch of findings to the validation agent and parse the rows it confirms
+        (the raw agent result is appended to ``results`` when given)"""
+        result = self.validation_agent.run(prompt)
+        if results is not None:
+            results.append(result)
+        return collect_agent_output(result, malformed)[1]
+
+
+def build_research_team(profile, model_factory: Callable = make_model,
+                        toolkit_factory: Optional[Callable[[str], object]] = None) -> ResearchTeam:
+    """Create the toolkits and agents of a profile; the factories let tests and load tests swap in fakes"""
+    profile = get_profile(profile)
+    toolkits = build_toolkits(profile, toolkit_factory)
+    research_tools = [toolkits[provider] for provider in profile.providers]
+
+    agents = {}
+    for key in profile.agents:
+        spec = RESEARCH_AGENT_SPECS[key]
+        agents[key] = Agent(
+            name=spec.name,
+            model=model_factory(profile.research_model, profile.thinking_budget),
+            tools=research_tools,
+            instructions=research_instructions(spec, profile),
+            markdown=True,
+            output_schema=research_output_schema,
+            tool_call_limit=research_tool_call_limit(profile),
+        )
+
+    team = ResearchTeam(profile=profile, agents=agents, toolkits=toolkits)
+
+    if profile.economy_model:
+        for key in profile.agents:
+            spec = RESEARCH_AGENT_SPECS[key]
+            team.economy_agents[key] = Agent(
+                name=spec.name,
+                model=model_factory(profile.economy_model),
+                tools=research_tools,
+                instructions=research_instructions(spec, profile),
+                markdown=True,
+                output_schema=research_output_schema,
+                tool_call_limit=profile.economy_tool_call_limit,
+            )
+
+    if profile.support_phases:
+        # Knowledge Synthesis Agent (Table Format)
+        team.knowledge_agent = Agent(
+            name="Pharmaceutical Knowledge Synthesizer",
+            model=model_factory(profile.support_model, profile.thinking_budget),
+            tools=[],
+            instructions=[
+                "You synthesize pharmaceutical research with STRICT ADHERENCE to user input parameters:",
+                "",
+                "SYNTHESIS REQUIREMENTS:",
+                "1. ONLY synthesize data about the EXACT drug name specified by user",
+                "2. ONLY include findings from the SPECIFIC month and year provided",
+                "3. Clearly separate findings by time period if any data is from different dates",
+                "4. Explicitly state when no data was found for the specified parameters",
+                "",
+                "CRITICAL: Convert ALL synthesis findings into the structured table format:",
+                STRUCTURED_OUTPUT_INSTRUCTIONS,
+                "",
+                "MANDATORY: Use ONLY 'Marketed Assets' as Category for all findings",
+                "Use appropriate subcategories: Label Updates, Safety Concern, Market Dynamics, Guideline Update, Clinical Data, Regulatory Delay, or RWE Study",
+                "",
+                "Take all the research agent outputs and consolidate them into additional table rows with synthesis insights."
+            ],
+            markdown=True,
+            output_schema=research_output_schema,
+        )
+
+        # Content Analyzer Agent (Table Format)
+        team.content_analyzer = Agent(
+            name="Pharmaceutical Content Analyzer",
+            model=model_factory(profile.support_model, profile.thinking_budget),
+            tools=[],
+            instructions=[
+                "You analyze pharmaceutical research content with STRICT INPUT ADHERENCE:",
+                "",
+                "ANALYSIS REQUIREMENTS:",
+                "1. ONLY analyze content related to the EXACT drug specified by user",
+                "2. ONLY analyze data from the SPECIFIC month and year provided",
+                "3. Focus analysis exclusively on the specified manufacturer's drug",
+                "4. Clearly distinguish between target timeframe data and other periods",
+                "",
+                "CRITICAL: Present ALL analysis as structured table rows:",
+                STRUCTURED_OUTPUT_INSTRUCTIONS,
+                "",
+                "MANDATORY: Use ONLY 'Marketed Assets' as Category for all findings",
+                "Use appropriate subcategories: Label Updates, Safety Concern, Market Dynamics, Guideline Update, Clinical Data, Regulatory Delay, or RWE Study",
+                "",
+                "Analyze the consolidated research and present insights as additional table rows."
+            ],
+            markdown=True,
+            output_schema=research_output_schema,
+        )
+
+        # Validation Agent (Table Format)
+        team.validation_agent = Agent(
+            name="Research Validation Specialist",
+            model=model_factory(profile.support_model, profile.thinking_budget),
+            tools=research_tools,
+            instructions=[
+                profile.search_instruction,
+                "",
+                "You validate pharmaceutical research with ABSOLUTE ADHERENCE to user input:",
+                "",
+                "VALIDATION REQUIREMENTS:",
+                "1. ONLY validate information about the EXACT drug name provided",
+                "2. ONLY validate data from the SPECIFIC month and year specified",
+                "3. Use additional searches ONLY for the specified drug/manufacturer/timeframe",
+                "4. Flag any information that doesn't match the exact input parameters",
+                "",
+                "CRITICAL: Present ALL validation findings as structured table rows:",
+                STRUCTURED_OUTPUT_INSTRUCTIONS,
+                "",
+                "MANDATORY: Use ONLY 'Marketed Assets' as Category for all findings",
+                "Use appropriate subcategories: Label Updates, Safety Concern, Market Dynamics, Guideline Update, Clinical Data, Regulatory Delay, or RWE Study",
+                "",
+                "Validate the research findings and present validation results as additional table rows."
+            ],
+            markdown=True,
+            output_schema=research_output_schema,
+            tool_call_limit=profile.tool_call_limit,
+        )
+
+    # Row Repair Agent (cheap, tool-less, called once per run with all defective rows)
+    team.row_repair_agent = Agent(
+        name="Research Row Repair Specialist",
+        model=model_factory(profile.repair_model),
+        tools=[],
+        instructions=[
+            "You repair malformed pharmaceutical research table rows.",
+            "Only restructure and reformat the information given - never add new facts.",
+            "Never make up a date or move one into the research period: omit a row without a usable date.",
+            "Output only pipe-delimited table rows with exactly 13 columns, one per line.",
+        ],
+        markdown=True,
+    )
+    return team
+
+
+_teams: Dict[str, ResearchTeam] = {}
+_teams_lock = threading.Lock()
+
+
+def get_research_team(profile_name: str) -> ResearchTeam:
+    """The process-wide team of a named profile, built on first use"""
+    with _teams_lock:
+        if profile_name not in _teams:
+            _teams[profile_name] = build_research_team(profile_name)
+        return _teams[profile_name]
+
+
+# ========== CORRECTED WORKFLOW CLASS ==========
+
+@dataclass
+class StageOutput:
+    """Output of one agent stage of a run, recorded in the run report once its rows are merged"""
+    name: str
+    agent: Optional[Agent]
+    result: object
+    meter: Optional[ToolMeter]
+    seconds: float
+    content: str = ''
+    rows: List[List[str]] = field(default_factory=list)
+    malformed: List[List[str]] = field(default_factory=list)
+
+
+@dataclass
+class ResearchRun:
+    """State of one workflow run. Every run gets its own, so runs served concurrently by one
+    workflow instance (AgentOS runs each in a worker thread) never share reports or profiles"""
+    research_input: DrugResearchInput
+    output_dir: Path
+    # Cost and yield of each phase, also written to <output_dir>/run_report.json
+    report: RunReport
+    # cProfile/tracemalloc profiles of every phase, written to <output_dir>/profile/ (see profiling.py)
+    profiler: Optional[RunProfiler] = None
+    # Wall time in seconds of each phase, keyed by phase name
+    phase_timings: Dict[str, float] = field(default_factory=dict)
+    # Validated, deduplicated findings rows
+    final_rows: List[List[str]] = field(default_factory=list)
+
+
+class InputDrivenDrugResearchWorkflow(Workflow):
+    def __init__(self, profile: str = "deep", team: Optional[ResearchTeam] = None,
+                 economy: Optional[bool] = None, yield_history: Optional[YieldHistory] = None,
+                 scheduler: Optional[LptScheduler] = None, profiling: Optional[bool] = None):
+        research_profile = get_profile(team.profile if team else profile)
+        super().__init__(
+            name="Input-Driven Structured Drug Research Workflow" + ("" if research_profile.name == "deep" else f" ({research_profile.name})"),
+            description=research_profile.description,
+            # AgentOS runs go through arun: the message is validated as DrugResearchInput JSON
+            input_schema=DrugResearchInput,
+            steps=self._serve,
+        )
+        self.research_profile = research_profile
+        # An explicit team (e.g. agents with fake models) replaces the profile's shared team
+        self._research_team = team
+        # The most recently started run; concurrent runs each keep their state in their own ResearchRun
+        self.last_run: Optional[ResearchRun] = None
+        # Economy mode skips or downgrades research agents whose historical yield for the drug is low
+        self.economy = os.getenv("DRUG_RESEARCH_ECONOMY", "0") == "1" if economy is None else economy
+        self._yield_history = yield_history
+        # Phase 1 scheduler shared by the runs of a batch (None = a scheduler per run)
+        self.scheduler = scheduler
+        # cProfile/tracemalloc profiles of every phase, written to <output_dir>/profile/ (see profiling.py)
+        self.profiling = PROFILING if profiling is None else profiling
+
+    # Results of the last run, for callers that run a workflow once (research_cli, benchmarks)
+    @property
+    def phase_timings(self) -> Dict[str, float]:
+        return self.last_run.phase_timings if self.last_run else {}
+
+    @property
+    def output_dir(self) -> Optional[Path]:
+        return self.last_run.output_dir if self.last_run else None
+
+    @property
+    def final_rows(self) -> List[List[str]]:
+        return self.last_run.final_rows if self.last_run else []
+
+    @property
+    def run_report(self) -> Optional[RunReport]:
+        return self.last_run.report if self.last_run else None
+
+    @property
+    def research_team(self) -> ResearchTeam:
+        return self._research_team or get_research_team(self.research_profile.name)
+
+    @property
+    def yield_history(self) -> YieldHistory:
+        return self._yield_history or shared_yield_history()
+
+    def run(self, research_input: DrugResearchInput) -> str:
+        """Execute research workflow with structured table output"""
+
+        print(f"🔬 Starting targeted drug research ({self.research_profile.name} profile):")
+        print(f"   Drug: {research_input.drug_name} ({research_input.generic_name or 'Generic name not provided'})")
+        print(f"   Manufacturer: {research_input.manufacturer}")
+        print(f"   Target Period: {research_input.get_period()}")
+
+        run = self._start_run(research_input)
+        try:
+            with research_scope(research_input):
+                return self._run(run)
+        finally:
+            if run.profiler is not None:
+                print(f"🔬 Profiles saved to: {run.profiler.close()}")
+
+    def _start_run(self, research_input: DrugResearchInput) -> ResearchRun:
+        """Create the output directory, run report and profiler of a new run"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        safe_manufacturer = research_input.manufacturer.replace('/', '_').replace('\\', '_').replace(' ', '_')
+        output_dir = new_run_dir(Path(f"agent_outputs/{research_input.drug_name.replace(' ', '_')}_{safe_manufacturer}_{timestamp}"))
+        run = ResearchRun(research_input, output_dir, RunReport(output_dir.name, self.research_profile.name, research_input),
+                          profiler=RunProfiler(output_dir) if self.profiling else None)
+        self.last_run = run
+        return run
+
+    async def _serve(self, execution_input) -> str:
+        """Entry point for AgentOS workflow runs; the blocking run executes in a worker thread"""
+        return await asyncio.to_thread(self.run, execution_input.input)
+
+    def _run_agent(self, agent: Agent, query: str) -> tuple:
+        """Run one agent with its tool calls metered; returns (result, meter)"""
+        meter = ToolMeter()
+        with metered(meter):
+            result = agent.run(query)
+        return result, meter
+
+    def _run_research_agent(self, run: ResearchRun, key: str, name: str, agent: Agent, query: str) -> tuple:
+        print(f"📊 {name} research for {run.research_input.drug_name}...")
+        with agent_scope(key):
+            if run.profiler is None:
+                return self._run_agent(agent, query)
+            with run.profiler.phase(name, memory=False):
+                return self._run_agent(agent, query)
+
+    @staticmethod
+    def _run_stage(run: ResearchRun, stage, call):
+        """Stage hook of the run graph: profiles every stage when profiling is on"""
+        if run.profiler is None:
+            return call()
+        with run.profiler.phase(stage.name):
+            return call()
+
+    def _finish_phase(self, run: ResearchRun, output: 'StageOutput', seen_rows: set, keys: set,
+                      producers: Optional[Counter] = None):
+        """Record a phase's wall time and its run report entry. ``keys`` are the dedupe keys of the
+        phase's valid rows (see kept_row_keys). A row counts as kept if no earlier phase produced it;
+        phases are accounted in the workflow's fixed order, whatever order they finished in, so the
+        counts are reproducible. The yield credited to a research agent, which economy mode decides
+        on, splits each row evenly among the ``producers`` (Phase 1 agents) that found it instead"""
+        run.phase_timings[output.name] = output.seconds
+        credited = sum(1 / producers[key] for key in keys) if producers is not None else None
+        run.report.add_phase(output.name, output.seconds, agent=output.agent.name, result=output.result,
+                             meter=output.meter, rows_produced=len(output.rows),
+                             rows_malformed=len(output.malformed), rows_kept=len(keys - seen_rows),
+                             rows_credited=credited)
+        seen_rows.update(keys)
+
+    def _plan_phase_one(self, run: ResearchRun, team: ResearchTeam) -> List[Tuple[str, str, Optional[Agent], str]]:
+        """(key, label, agent, topic) per research agent; in economy mode agents are swapped for their
+        economy version or None (skipped) by historical yield, and the decisions go into the run report"""
+        plan = []
+        for key, name, agent, topic in team.phase_one():
+            mode, reason = FULL, "economy mode off"
+            if self.economy:
+                mode, reason = self.yield_history.decide(run.research_input.drug_name, key)
+                if mode == DOWNGRADE and key not in team.economy_agents:
+                    mode, reason = FULL, f"{reason}, no economy model in the {team.profile.name} profile"
+            if mode == SKIP:
+                print(f"💰 Skipping {name}: {reason}")
+                agent = None
+            elif mode == DOWNGRADE:
+                print(f"💰 {name} on {team.profile.economy_model}: {reason}")
+                agent = team.economy_agents[key]
+            run.report.agent_modes[name] = {"agent": key, "mode": mode, "reason": reason}
+            plan.append((key, name, agent, topic))
+        return plan
+
+    def _prefetch_searches(self, run: ResearchRun, planner: QueryPlanner, key: str, name: str) -> str:
+        """Fetch the planned searches of one Phase 1 agent; returns the result bundle to append to its
+        query ('' when nothing was planned for it)"""
+        if key not in planner.planned:
+            return ''
+        meter = ToolMeter()
+        started = time.perf_counter()
+        with metered(meter):
+            records = planner.fetch(key)
+        seconds = time.perf_counter() - started
+        run.phase_timings[f"{name} Plan"] = seconds
+        run.report.add_phase(f"{name} Plan", seconds, meter=meter)
+        print(f"   🗺️ {name}: {len(records)} results from {len(planner.planned[key])} planned searches in {seconds:.1f}s")
+        return format_bundle(records, len(planner.planned[key]))
+
+    def _record_yields(self, run: ResearchRun):
+        """Log the kept rows of every research agent of the finished run to the yield history"""
+        for name, decision in run.report.agent_modes.items():
+            rows_kept = run.report.phases[name]["rows_credited"] if name in run.report.phases else 0
+            self.yield_history.record(run.research_input.drug_name, decision["agent"], decision["mode"],
+                                      rows_kept, run_id=run.report.run_id)
+
+    def _run(self, run: ResearchRun) -> str:
+        """Workflow body, executed with the run's research input as the active research context"""
+        team = self.research_team
+        research_input, output_dir = run.research_input, run.output_dir
+        run_started = time.perf_counter()
+
+        # Individual agent outputs are saved to the run's output directory
+        outputs = output_writer(output_dir, research_input)
+        print(f"\n📁 Saving individual agent outputs to: {getattr(outputs, 'path', output_dir)}")
+        seen_rows = set()  # Dedupe keys of kept rows so far, to count each phase's new rows
+        months = research_months(research_input)
+        
+        # Create search context for all agents
+        search_context = research_input.get_search_context()
+        temporal_constraint = research_input.get_temporal_constraint()
+        phase_one = [(key, name, agent, topic) for key, name, agent, topic in self._plan_phase_one(run, team)
+                     if agent is not None]
+
+        # The run is a graph of stages (see workflow_graph.py), each started as soon as its inputs are
+        # ready: an agent's output is parsed while the others still run, and knowledge synthesis and
+        # content analysis both work from the Phase 1 results side by side
+        graph = StageGraph(f"{research_input.drug_name} {research_input.get_period()}", GRAPH_WORKERS,
+                           hook=functools.partial(self._run_stage, run))
+
+        # Each agent's planned searches are fetched by its own stage (teams without search toolkits plan none)
+        planner = QueryPlanner(team.toolkits, max_calls=planner_calls(team.profile))
+        if QUERY_PLANNER and planner.tools and phase_one:
+            print(f"🗺️ Pre-fetching planned searches for {len(phase_one)} agents...")
+            planner.plan(research_input, [(key, topic) for key, _, _, topic in phase_one])
+        unplanned = [name for _, name, _, _ in phase_one]
+        dispatched: List[PhaseJob] = []
+        dispatch_lock = threading.Lock()
+
+        def plan(key, name, agent, topic):
+            def stage(inputs):
+                bundle = self._prefetch_searches(run, planner, key, name)
+                with dispatch_lock:
+                    unplanned.remove(name)
+                    last = not unplanned
+                # The agent is queued as soon as its own bundle is ready. Agents run longest-expected-first
+                # within the concurrency cap (DRUG_RESEARCH_PHASE1_CONCURRENCY), on the batch scheduler if
+                # there is one, and complete their graph stage as they finish
+                job = PhaseJob(latency_key(key, agent),
+                               functools.partial(self._run_research_agent, run, key, name, agent,
+                                                 f"Research {topic} for {search_context}. {temporal_constraint}{bundle}"),
+                               on_done=lambda job: graph.complete(name, job, job.error, job.seconds))
+                with dispatch_lock:
+                    dispatched.append(job)
+                scheduler.submit([job], last=last)
+                return bundle
+            return stage
+
+        def parse(name, agent):
+            def run(inputs):
+                job = inputs[name]
+                result, meter = job.result
+                output = StageOutput(name, agent, result, meter, job.seconds)
+                output.content, output.rows = collect_agent_output(result, output.malformed)
+                # Save individual agent output to file
+                safe_name = name.lower().replace(' ', '_').replace('&', 'and')
+                saved_to = outputs.save(f"{safe_name}_output.md", name, "Research Results", output.content)
+                print(f"   ✅ Saved to: {saved_to}")
+                return output
+            return run
+
+        def merge(inputs):
+            # Results are merged in phase_one order, whatever order the agents finished in
+            merged = StageOutput("Phase 1", None, None, None, 0.0)
+            contents = []
+            kept = {name: kept_row_keys(inputs[f"{name} Parse"].rows, months) for _, name, _, _ in phase_one}
+            producers = Counter(key for keys in kept.values() for key in keys)
+            for _, name, _, _ in phase_one:
+                output = inputs[f"{name} Parse"]
+                self._finish_phase(run, output, seen_rows, kept[name], producers)
+                contents.append(output.content)
+                merged.rows.extend(output.rows)
+                merged.malformed.extend(output.malformed)
+            merged.content = chr(10).join(contents)
+            return merged
+
+        def knowledge_synthesis(inputs):
+            print("🧠 Knowledge synthesis (structured format)...")
+            started = time.perf_counter()
+            synthesis_query = f"""
+            Synthesize research findings in structured table format for:
+            Drug: {research_input.drug_name} ({research_input.generic_name or 'generic not specified'})
+            Manufacturer: {research_input.manufacturer}
+            Time Period: {research_input.get_period()}
+            
+            Research Results:
+            {inputs["Phase 1 Merge"].content}
+            
+            ONLY synthesize data matching these exact parameters and output as table rows.
+            """
+            synthesis, meter = self._run_agent(team.knowledge_agent, synthesis_query)
+            output = StageOutput("Knowledge Synthesis", team.knowledge_agent, synthesis, meter, 0.0)
+            output.content, output.rows = collect_agent_output(synthesis, output.malformed)
+            
+            # Save synthesis output
+            saved_to = outputs.save("knowledge_synthesis_output.md", "Knowledge Synthesis", "Synthesis Results", output.content)
+            print(f"   ✅ Saved synthesis to: {saved_to}")
+            output.seconds = time.perf_counter() - started
+            return output
+
+        def content_analysis(inputs):
+            print("📈 Content analysis (structured format)...")
+            started = time.perf_counter()
+            analysis_query = f"""
+            Analyze research findings in structured table format for:
+            {search_context}
+            Target Period: {research_input.get_period()}
+            
+            All Research Results:
+            {inputs["Phase 1 Merge"].content}
+            
+            ONLY analyze content matching these exact parameters and output as table rows.
+            """
+            analysis, meter = self._run_agent(team.content_analyzer, analysis_query)
+            output = StageOutput("Content Analysis", team.content_analyzer, analysis, meter, 0.0)
+            output.content, output.rows = collect_agent_output(analysis, output.malformed)
+            
+            # Save analysis output
+            saved_to = outputs.save("content_analysis_output.md", "Content Analysis", "Analysis Results", output.content)
+            print(f"   ✅ Saved analysis to: {saved_to}")
+            output.seconds = time.perf_counter() - started
+            return output
+
+        def validation(inputs):
+            print("✅ Validation (structured format)...")
+            started = time.perf_counter()
+            candidate_rows = [row for name in ("Phase 1 Merge", *support) for row in inputs[name].rows]
+            # Only rows without a cached verdict go to the agent, in compact batches (see validation_cache)
+            validation_results = []
+            output = StageOutput("Validation", team.validation_agent, None, ToolMeter(), 0.0)
+            validator = IncrementalValidator(
+                lambda prompt: team.validate_rows(prompt, validation_results, output.malformed),
+                store=shared_verdict_store() if VALIDATION_CACHE else None)
+            with metered(output.meter):
+                output.rows = validator.validate(dedupe_rows(candidate_rows), research_input,
+                                                 run_id=run.report.run_id)
+            validation_stats = validator.stats
+            print(f"   ✅ {validation_stats['rows']} rows: {validation_stats['cached_confirmed'] + validation_stats['cached_unconfirmed']} "
+                  f"from the verdict cache, {validation_stats['sent']} sent in {validation_stats['batches']} batches "
+                  f"({validation_stats['confirmed']} confirmed, {validation_stats['additional']} new)")
+            output.content = rows_to_markdown(output.rows)
+            output.result = validation_results or None
+            run.report.rows["validation"] = dict(validation_stats)
+            
+            # Save validation output
+            saved_to = outputs.save("validation_output.md", "Validation", "Validation Results", output.content)
+            print(f"   ✅ Saved validation to: {saved_to}")
+            output.seconds = time.perf_counter() - started
+            return output
+
+        def row_repair(inputs):
+            # Support phases are accounted once all have finished, in their fixed order
+            stage_outputs = [inputs[name] for name in ("Phase 1 Merge", *support, *checks)]
+            for output in stage_outputs[1:]:
+                self._finish_phase(run, output, seen_rows, kept_row_keys(output.rows, months))
+            parsed_rows = [row for output in stage_outputs for row in output.rows]
+            malformed_rows = [row for output in stage_outputs for row in output.malformed]
+            # Validate every row; fix defects deterministically or in one batched repair call
+            print("🔧 Validating and repairing rows...")
+            started = time.perf_counter()
+            repair_results = []
+            row_repairer = RowRepairer(repair_fn=(lambda prompt: team.repair_rows(prompt, repair_results))
+                                       if team.row_repair_agent is not None else None)
+            run.final_rows = dedupe_rows(row_repairer.repair(parsed_rows + malformed_rows, research_input))
+            repair_stats = row_repairer.stats
+            print(f"   ✅ {repair_stats['valid']} valid, {repair_stats['fixed_deterministic']} fixed deterministically, "
+                  f"{repair_stats['fixed_by_model']} fixed by model, {repair_stats['out_of_period']} outside period, "
+                  f"{repair_stats['dropped']} dropped")
+            run.phase_timings["Row Repair"] = time.perf_counter() - started
+            run.report.add_phase("Row Repair", run.phase_timings["Row Repair"],
+                                 agent=team.row_repair_agent.name if repair_results else None,
+                                 result=repair_results[0] if repair_results else None,
+                                 rows_produced=repair_stats['fixed_by_model'])
+            run.report.rows.update({"parsed": len(parsed_rows), "malformed": len(malformed_rows),
+                                    "final": len(run.final_rows), "repair": dict(repair_stats)})
+            return run.final_rows
+
+        def render_output(inputs):
+            # Format final output from the rows collected across all agents; a date range gets one
+            # single-month report (markdown, CSV, findings database period) per month of the window
+            started = time.perf_counter()
+            final_rows = inputs["Row Repair"]
+            if research_input.is_date_range():
+                month_rows = bucket_rows_by_month(final_rows, research_input)
+                final_output = "\n\n".join(
+                    render_structured_table(rows, research_input.for_month(year, month), csv_suffix=f"_{year}-{month:02d}")
+                    for (year, month), rows in month_rows.items()
+                )
+            else:
+                month_rows = {}
+                final_output = render_structured_table(final_rows, research_input)
+            run.phase_timings["Output"] = time.perf_counter() - started
+            run.report.add_phase("Output", run.phase_timings["Output"])
+            return final_output, month_rows
+
+        # Phase 1: each agent's planned searches, then the agent itself (an external stage run by the
+        # scheduler). Plans of the agents expected to take longest get a graph worker first
+        history = shared_latency_history()
+        expected = {name: history.expected(latency_key(key, agent)) for key, name, agent, _ in phase_one}
+        unknown = max((seconds for seconds in expected.values() if seconds is not None), default=0.0) + 1.0
+        for key, name, agent, topic in phase_one:
+            graph.add(f"{name} Plan", plan(key, name, agent, topic), kind="search",
+                      priority=expected[name] if expected[name] is not None else unknown)
+            graph.add(name, None, deps=(f"{name} Plan",), kind="agent")
+            graph.add(f"{name} Parse", parse(name, agent), deps=(name,), kind="parse")
+        graph.add("Phase 1 Merge", merge, deps=tuple(f"{name} Parse" for _, name, _, _ in phase_one))
+        # Phases 2 and 3: synthesis and analysis of the Phase 1 results, independent of each other
+        support = []
+        for name, agent, fn in (("Knowledge Synthesis", team.knowledge_agent, knowledge_synthesis),
+                                ("Content Analysis", team.content_analyzer, content_analysis)):
+            if agent is not None:
+                graph.add(name, fn, deps=("Phase 1 Merge",), kind="agent")
+                support.append(name)
+        # Phase 4: validation of every row found so far
+        checks = []
+        if team.validation_agent is not None:
+            graph.add("Validation", validation, deps=("Phase 1 Merge", *support), kind="agent")
+            checks.append("Validation")
+        graph.add("Row Repair", row_repair, deps=("Phase 1 Merge", *support, *checks))
+        graph.add("Output", render_output, deps=("Row Repair",))
+
+        try:
+            with contextlib.ExitStack() as stack:
+                scheduler = self.scheduler or stack.enter_context(
+                    LptScheduler(PHASE_ONE_CONCURRENCY, shared_latency_history()))
+                stack.enter_context(planner)
+                if not phase_one:
+                    # Nothing to dispatch; a batch scheduler still counts this run as submitted
+                    scheduler.submit([])
+                try:
+                    graph.run()
+                except BaseException:
+                    # This run's agents still queued (on a batch scheduler too) would only spend model calls
+                    with dispatch_lock:
+                        scheduler.cancel(dispatched)
+                    raise
+        finally:
+            run.report.graph = graph.to_dict()
+            if planner.planned:
+                run.report.rows["query_planner"] = dict(planner.stats)
+        final_output, month_rows = graph.result("Output")
+        final_rows = run.final_rows
+
+        if PROVENANCE:
+            # Link every final row to the passage of a stored source document it was drawn from
+            try:
+                linked = shared_provenance_store().link_rows(final_rows, run_id=run.report.run_id)
+                run.report.rows["provenance_linked"] = linked
+                print(f"   🔗 {linked}/{len(final_rows)} rows linked to a stored source passage")
+            except (sqlite3.Error, OSError) as e:
+                print(f"   ⚠️ Provenance linking failed: {e}")
+        if month_rows:
+            run.report.rows["per_month"] = {f"{year}-{month:02d}": len(rows)
+                                            for (year, month), rows in month_rows.items()}
+        run.report.wall_seconds = time.perf_counter() - run_started
+        self._record_yields(run)
+        print(f"🕸️ Critical path: {' -> '.join(run.report.graph['critical_path'])}")
+        print(f"📊 Run report saved to: {run.report.write(output_dir)}")
+        print(f"🎉 Structured research completed!")
+        
+        return final_output
+
+
+def new_run_dir(path: Path) -> Path:
+    """Create a run directory, adding a numeric suffix if another run already took the name"""
+    candidate, suffix = path, 1
+    while True:
+        try:
+            candidate.mkdir(parents=True)
+            return candidate
+        except FileExistsError:
+            suffix += 1
+            candidate = path.with_name(f"{path.name}_{suffix}")
+
+
+def latency_key(key: str, agent) -> str:
+    """Latency history key of a research agent: its spec key and model (economy agents run faster)"""
+    model_id = getattr(getattr(agent, 'model', None), 'id', None)
+    return f"{key}:{model_id}" if model_id else key
+
+
+# ========== BATCH RUNS ==========
+
+def run_batch(research_inputs: List[DrugResearchInput], profile: str = "deep", team: Optional[ResearchTeam] = None,
+              concurrency: int = PHASE_ONE_CONCURRENCY, economy: Optional[bool] = None,
+              max_runs: Optional[int] = None, profiling: Optional[bool] = None,
+              on_finish: Optional[Callable[[int, 'InputDrivenDrugResearchWorkflow', Optional[Exception]], None]] = None
+              ) -> List[Optional[str]]:
+    """Research several inputs at once. The Phase 1 agents of every run share one LPT scheduler, so
+    at most ``concurrency`` agents run at a time and the slowest start first across the whole batch.
+    ``max_runs`` caps the runs in flight (default: all of them); ``on_finish(index, workflow, error)``
+    is called as each run completes, in completion order. Writes the aggregated run reports to
+    agent_outputs/batch_<timestamp>.json; returns each run's output (None for runs that failed)"""
+    if not research_inputs:
+        return []
+    max_runs = min(max_runs or len(research_inputs), len(research_inputs))
+    outputs: List[Optional[str]] = [None] * len(research_inputs)
+    with LptScheduler(concurrency, shared_latency_history(), submitters=max_runs) as scheduler:
+        workflows = [InputDrivenDrugResearchWorkflow(profile, team=team, economy=economy, scheduler=scheduler,
+                                                     profiling=profiling)
+                     for _ in research_inputs]
+        with ThreadPoolExecutor(max_workers=max_runs) as pool:
+            futures = {pool.submit(workflow.run, research_input): index
+                       for index, (workflow, research_input) in enumerate(zip(workflows, research_inputs))}
+            for future in as_completed(futures):
+                index, error = futures[future], None
+                try:
+                    outputs[index] = future.result()
+                except Exception as e:
+                    print(f"❌ Research failed for {research_inputs[index].drug_name} "
+                          f"({research_inputs[index].get_period()}): {e}")
+                    error = e
+                if on_finish is not None:
+                    on_finish(index, workflows[index], error)
+
+    reports = [workflow.run_report.to_dict() for workflow, output in zip(workflows, outputs) if output is not None]
+    if reports:
+        batch_file = Path("agent_outputs") / f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        with open(batch_file, 'w', encoding='utf-8') as f:
+            json.dump({"run_ids": [report["run_id"] for report in reports], **aggregate_reports(reports)}, f, indent=2)
+        print(f"📊 Batch report saved to: {batch_file}")
+    return outputs
+
+
+# ========== USER INPUT INTERFACE ==========
+
+def get_user_input() -> DrugResearchInput:
+    """Interactive function to collect user input"""
+    print("=== DRUG RESEARCH INPUT COLLECTION ===")
+    
+    drug_name = input("Enter drug name (brand/trade name): ").strip()
+    manufacturer = input("Enter manufacturer name: ").strip()
+    generic_name = input("Enter generic name (optional, press Enter to skip): ").strip() or None
+    target_month = input("Enter target month (e.g., January, February): ").strip()
+    target_year = input("Enter target year (e.g., 2024, 2025): ").strip()
+    end_month = input("Enter end month for a date range (optional, press Enter for a single month): ").strip() or None
+    end_year = (input(f"Enter end year (press Enter for {target_year}): ").strip() or None) if end_month else None
+    therapeutic_area = input("Enter therapeutic area (optional, press Enter to skip): ").strip() or None
+    
+    return DrugResearchInput(
+        drug_name=drug_name,
+        manufacturer=manufacturer,
+        generic_name=generic_name,
+        target_month=target_month,
+        target_year=target_year,
+        end_month=end_month,
+        end_year=end_year,
+        therapeutic_area=therapeutic_area
+    )
+
@@ -0,0 +1,105 @@
+"""
+Shared schema for research findings
+Column order of the 13-column findings table, the ResearchFinding model for
+schema-constrained agent output, row signatures used for de-duplication and
+URL canonicalisation
+"""
+
+import hashlib
+from typing import List, Sequence
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from pydantic import BaseModel, Field
+
+# CORRECTED COLUMN ORDER (URL is LAST)
+TABLE_COLUMNS = [
+    "Category", "Sub Category", "Date", "Drug Name", "Generic Name", "Manufacturer", "Disease Name",
+    "Development Summary", "Detailed Description", "Country", "Competitive Implication",
+    "Patient Population Affected", "URL",
+]
+
+# Number of leading columns that identify a finding (Category .. Manufacturer)
+SIGNATURE_COLUMNS = 6
+
+# Query parameters dropped from canonical URLs: any starting with a prefix, and these exact names
+_TRACKING_PREFIXES = ('utm_', '_hs')
+_TRACKING_PARAMS = {'fbclid', 'gclid', 'mc_cid', 'mc_eid', 'ref', 'ref_src'}
+
+
+def row_signature(row: Sequence[str]) -> str:
+    """Stable hash of what identifies a findings row: the leading columns plus its canonical URL, or
+    its normalised Development Summary when it has no URL. Dates often default to the first of the
+    month, so the leading columns alone would merge e.g. two label updates of one month"""
+    identity = [col.strip().lower() for col in row[:SIGNATURE_COLUMNS]]
+    if len(row) >= len(TABLE_COLUMNS):
+        url = canonicalize_url(row[-1])
+        if url.startswith('https://'):
+            identity.append(url)
+        else:
+            identity.append(' '.join(row[TABLE_COLUMNS.index("Development Summary")].split()).lower())
+    return hashlib.sha1('\x1f'.join(identity).encode('utf-8')).hexdigest()
+
+
+def canonicalize_url(url: str) -> str:
+    """Normalise a URL so the same document found via different links compares equal"""
+    url = (url or '').strip()
+    if not url.lower().startswith(('http://', 'https://')):
+        return url
+    # Multiple URLs are reported as "primary (secondary, ...)": keep the primary
+    url = url.split(' ')[0].rstrip('.,;)')
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(_TRACKING_PREFIXES) and key.lower() not in _TRACKING_PARAMS
+    ))
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit(('https', host, path, query, ''))
+
+
+def row_to_dict(row: Sequence[str]) -> dict:
+    """Map a 13-column row to a {column name: value} dict"""
+    return dict(zip(TABLE_COLUMNS, row))
+
+
+def dict_to_row(values: dict) -> List[str]:
+    """Inverse of row_to_dict, filling missing columns with "Not Available" """
+    return [values.get(column) or "Not Available" for column in TABLE_COLUMNS]
+
+
+# ========== STRUCTURED OUTPUT MODELS ==========
+
+class ResearchFinding(BaseModel):
+    """One research finding, mirroring the 13 table columns"""
+    category: str = Field(description="Always 'Marketed Assets'")
+    sub_category: str = Field(description="Label Updates, Safety Concern, Market Dynamics, Guideline Update, Clinical Data, Regulatory Delay or RWE Study")
+    date: str = Field(description="Date in strict YYYY-MM-DD format")
+    drug_name: str = Field(description="Brand/trade name of the drug")
+    generic_name: str = Field(description="Generic/chemical name of the drug")
+    manufacturer: str = Field(description="Manufacturer of the drug")
+    disease_name: str = Field(description="Disease or indication")
+    development_summary: str = Field(description="One-sentence summary of the development")
+    detailed_description: str = Field(description="Comprehensive description (100-200 words) using facts from the source")
+    country: str = Field(description="US, Canada or 'US, Canada'")
+    competitive_implication: str = Field(description="2-4 sentence strategic analysis, or 'No competitive implication stated.'")
+    patient_population_affected: str = Field(description="Exact phrasing from the document")
+    url: str = Field(description="Working URL of the primary source, or 'Not Available'")
+
+    def to_row(self) -> List[str]:
+        """Values in TABLE_COLUMNS order"""
+        return [str(getattr(self, name)) for name in FINDING_FIELDS]
+
+    @classmethod
+    def from_row(cls, row: Sequence[str]) -> 'ResearchFinding':
+        return cls(**dict(zip(FINDING_FIELDS, row)))
+
+
+class ResearchFindings(BaseModel):
+    """All findings returned by one agent run"""
+    findings: List[ResearchFinding] = Field(default_factory=list, description="One entry per finding; empty if nothing was found")
+
+
+# ResearchFinding field for each table column, in TABLE_COLUMNS order
+FINDING_FIELDS = list(ResearchFinding.model_fields)
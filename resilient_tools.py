@@ -0,0 +1,267 @@
+"""
+Resilience layer for search and scraping providers
+Per-call deadlines, per-provider circuit breakers, shared rate limits and
+optional hedged fallbacks to an alternate provider for TavilyTools,
+ExaTools, DuckDuckGoTools and TrafilaturaTools
+"""
+
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Optional, Tuple
+
+from rate_limit import MAX_TOOL_WAIT, TokenBucket
+from tool_hooks import wrap_tool, wrap_toolkit
+
+# Calls that miss their deadline cannot be interrupted, they are abandoned and
+# finish in the background, so the pool is sized well above the agent count
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="provider-call")
+
+
+# ========== CIRCUIT BREAKER ==========
+
+class CircuitBreaker:
+    """Open after consecutive failures, allow a single trial call after a cool-down"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Return True if a call may be attempted now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """Neutral outcome for a trial call whose result is no longer awaited (e.g. it lost a hedge):
+        the breaker stays half-open and the next call becomes the trial"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._trial_in_flight = False
+
+
+# ========== PROVIDER GUARD ==========
+
+class _Attempt:
+    """One submitted provider call"""
+
+    def __init__(self, guard: 'ProviderGuard', future, started: float, trial: bool):
+        self.guard = guard
+        self.future = future
+        self.started = started
+        # The half-open breaker's trial call, until its outcome (or a neutral one) is recorded
+        self.trial = trial
+        self.abandoned = False
+        self.consumed = False
+
+
+class ProviderGuard:
+    """Deadline, circuit breaker, rate limit, latency tracking and hedging for one provider"""
+
+    def __init__(self, name: str, timeout: float = 30.0, failure_threshold: int = 3,
+                 reset_timeout: float = 60.0, hedge_percentile: float = 0.95,
+                 min_hedge_samples: int = 5, hedging: bool = False,
+                 rate_limit: Optional[TokenBucket] = None):
+        self.name = name
+        self.timeout = timeout
+        # Calls queue for a token of the provider's shared bucket before they are sent (deadline starts after)
+        self.rate_limit = rate_limit
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.hedge_percentile = hedge_percentile
+        self.min_hedge_samples = min_hedge_samples
+        self.hedging = hedging
+        self.latencies = deque(maxlen=200)
+        self.stats = {'calls': 0, 'successes': 0, 'failures': 0, 'timeouts': 0,
+                      'short_circuited': 0, 'hedges': 0, 'hedge_wins': 0, 'rate_limited': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """Latency at the given percentile of recent successful calls"""
+        with self._lock:
+            samples = sorted(self.latencies)
+        if len(samples) < self.min_hedge_samples:
+            return None
+        index = min(len(samples) - 1, int(round(percentile * (len(samples) - 1))))
+        return samples[index]
+
+    def _submit(self, fn: Callable, args, kwargs) -> _Attempt:
+        self._count('calls')
+        # Called right after breaker.allow(): a half-open breaker has just granted this call its trial
+        trial = self.breaker.state == CircuitBreaker.HALF_OPEN
+        context = contextvars.copy_context()
+        attempt = _Attempt(self, _executor.submit(context.run, fn, *args, **kwargs), time.monotonic(), trial)
+        attempt.future.add_done_callback(lambda future: self._finish(attempt))
+        return attempt
+
+    def _settle(self, attempt: _Attempt) -> bool:
+        """Claim the right to record an attempt's outcome; True for exactly one caller per attempt"""
+        with self._lock:
+            if attempt.trial is None:
+                return False
+            attempt.trial = None
+            return True
+
+    def _finish(self, attempt: _Attempt):
+        """Record the outcome of a call once it completes"""
+        if attempt.future.exception() is None:
+            with self._lock:
+                self.latencies.append(time.monotonic() - attempt.started)
+        # An abandoned call already had its outcome recorded (deadline failure or lost hedge), so
+        # only the latency sample is kept
+        if not self._settle(attempt):
+            return
+        if attempt.future.exception() is None:
+            self._count('successes')
+            self.breaker.record_success()
+        else:
+            self._count('failures')
+            self.breaker.record_failure()
+
+    def _abandon(self, attempt: _Attempt, timed_out: bool = True):
+        """Stop waiting for a call: a missed deadline counts as a failure, losing a hedge is neutral
+        (a trial call that lost gives the half-open breaker's trial back)"""
+        attempt.abandoned = True
+        trial = attempt.trial
+        if not self._settle(attempt):
+            return
+        if timed_out:
+            self._count('timeouts')
+            self.breaker.record_failure()
+        elif trial:
+            self.breaker.release_trial()
+
+    def call(self, fn: Callable, *args, alternate: Optional[Tuple['ProviderGuard', Callable]] = None, **kwargs):
+        """Invoke ``fn`` under this provider's deadline, breaker and hedging policy"""
+        if not self.breaker.allow():
+            self._count('short_circuited')
+            if alternate:
+                return alternate[0].call(alternate[1], *_query_args(args, kwargs))
+            return f"Error: {self.name} is temporarily unavailable (circuit open), try another search tool"
+
+        if self.rate_limit is not None and self.rate_limit.acquire(MAX_TOOL_WAIT) is None:
+            self._count('rate_limited')
+            if alternate:
+                return alternate[0].call(alternate[1], *_query_args(args, kwargs))
+            return (f"Error: {self.name} rate limit queue is longer than {MAX_TOOL_WAIT:g}s, "
+                    f"try another search tool")
+
+        attempts = [self._submit(fn, args, kwargs)]
+        hedged = False
+
+        def launch_alternate(wait_for_quota: bool = True):
+            alt_guard, alt_fn = alternate
+            if not alt_guard.breaker.allow():
+                alt_guard._count('short_circuited')
+                return False
+            # A fallback may queue for the alternate's quota; a hedge only fires if a token is free now
+            if alt_guard.rate_limit is not None:
+                granted = (alt_guard.rate_limit.acquire(MAX_TOOL_WAIT) is not None if wait_for_quota
+                           else alt_guard.rate_limit.try_acquire())
+                if not granted:
+                    alt_guard._count('rate_limited')
+                    return False
+            self._count('hedges')
+            attempts.append(alt_guard._submit(alt_fn, _query_args(args, kwargs), {}))
+            return True
+
+        hedge_delay = self.latency_percentile(self.hedge_percentile) if (alternate and self.hedging) else None
+        if hedge_delay is not None and hedge_delay < self.timeout:
+            done, _ = wait([attempts[0].future], timeout=hedge_delay)
+            if not done:
+                hedged = launch_alternate(wait_for_quota=False)
+
+        deadline = attempts[0].started + self.timeout
+        last_error = None
+        while True:
+            pending = [a for a in attempts if not a.future.done()]
+            finished = [a for a in attempts if a.future.done() and not a.consumed]
+            for attempt in finished:
+                attempt.consumed = True
+                if attempt.future.exception() is None:
+                    for other in attempts:
+                        if other is not attempt:
+                            other.guard._abandon(other, timed_out=False)
+                    if attempt.guard is not self:
+                        self._count('hedge_wins')
+                    return attempt.future.result()
+                last_error = attempt.future.exception()
+                # Primary failed fast: fall back to the alternate if not already running
+                if attempt.guard is self and alternate and not hedged:
+                    hedged = launch_alternate()
+                    if hedged:
+                        deadline = max(deadline, attempts[-1].started + alternate[0].timeout)
+                        pending = [a for a in attempts if not a.future.done()]
+            if not pending:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                for attempt in pending:
+                    attempt.guard._abandon(attempt)
+                # Primary missed its deadline: give the alternate its own deadline
+                if alternate and not hedged:
+                    hedged = launch_alternate()
+                    if hedged:
+                        deadline = attempts[-1].started + alternate[0].timeout
+                        continue
+                return f"Error: {self.name} did not respond within {self.timeout:g}s, try another search tool"
+            wait([a.future for a in pending], timeout=remaining, return_when=FIRST_COMPLETED)
+
+        return f"Error: {self.name} call failed ({type(last_error).__name__}: {last_error})"
+
+    def wrap(self, tool: Callable, alternate: Optional[Tuple['ProviderGuard', Callable]] = None) -> Callable:
+        """Wrap a single tool function under this guard"""
+        return wrap_tool(tool, lambda fn, *args, **kwargs: self.call(fn, *args, alternate=alternate, **kwargs))
+
+
+def _query_args(args, kwargs) -> tuple:
+    """Extract the query/url argument to forward to an alternate provider"""
+    if args:
+        return (args[0],)
+    for key in ('query', 'url', 'urls'):
+        if key in kwargs:
+            return (kwargs[key],)
+    return tuple(kwargs.values())[:1]
+
+
+def guard_toolkit(toolkit, guard: ProviderGuard,
+                  alternates: Optional[Dict[str, Tuple[ProviderGuard, Callable]]] = None):
+    """Route every tool of an agno toolkit through ``guard``"""
+    alternates = alternates or {}
+    return wrap_toolkit(toolkit, lambda tool: guard.wrap(tool, alternates.get(tool.__name__)))
@@ -0,0 +1,231 @@
+"""
+Validation and targeted repair of findings rows
+Checks every row for column count, category, allowed sub category and a
+YYYY-MM-DD date inside the research period, fixes what can be fixed
+deterministically and sends the remaining defective rows of a run to the
+model in a single small batch instead of re-running the agents
+"""
+
+import difflib
+import re
+from datetime import datetime
+from typing import Callable, List, Optional, Sequence, Set, Tuple
+
+from research_schema import TABLE_COLUMNS
+
+CATEGORY = "Marketed Assets"
+ALLOWED_SUB_CATEGORIES = [
+    "Label Updates", "Safety Concern", "Market Dynamics", "Guideline Update",
+    "Clinical Data", "Regulatory Delay", "RWE Study",
+]
+
+# Sub categories agents commonly invent, mapped by keyword to the allowed list
+SUB_CATEGORY_KEYWORDS = [
+    ("delay", "Regulatory Delay"), ("pdufa", "Regulatory Delay"), ("crl", "Regulatory Delay"),
+    ("safety", "Safety Concern"), ("adverse", "Safety Concern"), ("recall", "Safety Concern"),
+    ("warning", "Safety Concern"), ("pharmacovigilance", "Safety Concern"),
+    ("label", "Label Updates"), ("approval", "Label Updates"), ("indication", "Label Updates"),
+    ("guideline", "Guideline Update"), ("real-world", "RWE Study"), ("real world", "RWE Study"),
+    ("rwe", "RWE Study"), ("observational", "RWE Study"),
+    ("clinical", "Clinical Data"), ("trial", "Clinical Data"), ("phase", "Clinical Data"),
+    ("endpoint", "Clinical Data"), ("market", "Market Dynamics"), ("formulary", "Market Dynamics"),
+    ("coverage", "Market Dynamics"), ("pricing", "Market Dynamics"), ("copay", "Market Dynamics"),
+    ("access", "Market Dynamics"),
+]
+
+MONTHS = ["january", "february", "march", "april", "may", "june", "july",
+          "august", "september", "october", "november", "december"]
+
+_ISO_DATE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+_DATE_FORMATS = ["%Y-%m-%d", "%B %d, %Y", "%b %d, %Y", "%B %d %Y", "%b %d %Y", "%d %B %Y", "%d %b %Y",
+                 "%Y/%m/%d", "%m/%d/%Y", "%d.%m.%Y", "%b. %d, %Y"]
+_MONTH_FORMATS = ["%B %Y", "%b %Y", "%Y-%m", "%m/%Y"]
+
+
+def month_number(month: str) -> Optional[int]:
+    """1-12 for "October", "Oct" or "10" """
+    month = str(month).strip().lower()
+    if month.isdigit() and 1 <= int(month) <= 12:
+        return int(month)
+    for index, name in enumerate(MONTHS):
+        if len(month) >= 3 and name.startswith(month):
+            return index + 1
+    return None
+
+
+def month_range(start: Tuple[int, int], end: Tuple[int, int]) -> List[Tuple[int, int]]:
+    """(year, month) pairs from start to end, inclusive"""
+    months = []
+    year, month = start
+    while (year, month) <= end:
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def research_window(research_input) -> List[Tuple[int, int]]:
+    """(year, month) pairs of the research period in order: one month, or start to end of a date range"""
+    month = month_number(research_input.target_month)
+    if not month:
+        return []
+    start = (int(research_input.target_year), month)
+    end_month = month_number(getattr(research_input, 'end_month', None) or '')
+    if not end_month:
+        return [start]
+    return month_range(start, (int(getattr(research_input, 'end_year', None) or start[0]), end_month))
+
+
+def research_months(research_input) -> Set[Tuple[int, int]]:
+    """(year, month) pairs a finding's date may fall into"""
+    return set(research_window(research_input))
+
+
+def research_period(research_input) -> str:
+    """Label of the research period: "October 2025", or "January 2025 to December 2025" for a date range"""
+    window = research_window(research_input)
+    if len(window) > 1:
+        (start_year, start_month), (end_year, end_month) = window[0], window[-1]
+        return f"{MONTHS[start_month - 1].title()} {start_year} to {MONTHS[end_month - 1].title()} {end_year}"
+    return f"{research_input.target_month} {research_input.target_year}"
+
+
+def normalize_date(value: str) -> Optional[str]:
+    """Parse common date spellings into YYYY-MM-DD (first of month if the day is unknown)"""
+    value = re.sub(r'(\d)(st|nd|rd|th)\b', r'\1', str(value).strip())
+    for date_format in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    for date_format in _MONTH_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).strftime("%Y-%m-01")
+        except ValueError:
+            continue
+    return None
+
+
+def normalize_sub_category(value: str) -> Optional[str]:
+    """Map a sub category onto the allowed list, or None if it cannot be placed"""
+    value = str(value).strip()
+    for allowed in ALLOWED_SUB_CATEGORIES:
+        if value.lower() == allowed.lower():
+            return allowed
+    close = difflib.get_close_matches(value.title(), ALLOWED_SUB_CATEGORIES, n=1, cutoff=0.75)
+    if close:
+        return close[0]
+    lowered = value.lower()
+    for keyword, allowed in SUB_CATEGORY_KEYWORDS:
+        if keyword in lowered:
+            return allowed
+    return None
+
+
+def row_problems(row: Sequence[str], months: Set[Tuple[int, int]]) -> List[str]:
+    """Describe what is wrong with a row (empty list if the row is valid)"""
+    if len(row) != len(TABLE_COLUMNS):
+        return [f"has {len(row)} columns instead of {len(TABLE_COLUMNS)}"]
+    problems = []
+    if row[0] != CATEGORY:
+        problems.append(f"Category must be '{CATEGORY}'")
+    if row[1] not in ALLOWED_SUB_CATEGORIES:
+        problems.append(f"Sub Category '{row[1]}' is not allowed")
+    if not _ISO_DATE.match(row[2]):
+        problems.append(f"Date '{row[2]}' is not YYYY-MM-DD")
+    elif months and (int(row[2][:4]), int(row[2][5:7])) not in months:
+        problems.append(f"Date '{row[2]}' is outside the research period")
+    return problems
+
+
+def _looks_like_url(value: str) -> bool:
+    return value.strip().lower().startswith(('http://', 'https://')) or value.strip() == "Not Available"
+
+
+def deterministic_fix(row: Sequence[str]) -> List[str]:
+    """Apply every fix that needs no model: category, sub category, date spelling, missing URL column"""
+    row = [str(col).strip() for col in row]
+    # A row missing only its URL column (last) gets "Not Available"
+    if len(row) == len(TABLE_COLUMNS) - 1 and not _looks_like_url(row[-1]):
+        row.append("Not Available")
+    # Trailing empty cells from a doubled pipe
+    while len(row) > len(TABLE_COLUMNS) and not row[-1]:
+        row.pop()
+    if len(row) != len(TABLE_COLUMNS):
+        return row
+    row[0] = CATEGORY
+    row[1] = normalize_sub_category(row[1]) or row[1]
+    if not _ISO_DATE.match(row[2]):
+        row[2] = normalize_date(row[2]) or row[2]
+    return row
+
+
+class RowRepairer:
+    """Validates a run's rows and repairs defective ones deterministically or in one batched model call"""
+
+    def __init__(self, repair_fn: Optional[Callable[[str], List[List[str]]]] = None):
+        # repair_fn: prompt -> parsed rows, typically a cheap tool-less agent
+        self.repair_fn = repair_fn
+        self.stats = {'rows': 0, 'valid': 0, 'fixed_deterministic': 0, 'fixed_by_model': 0,
+                      'out_of_period': 0, 'dropped': 0}
+
+    def repair(self, rows: List[Sequence[str]], research_input) -> List[List[str]]:
+        """Return the valid rows, with repaired rows in place of defective ones"""
+        months = research_months(research_input)
+        kept: List[List[str]] = []
+        defective: List[Tuple[List[str], List[str]]] = []
+        self.stats['rows'] += len(rows)
+
+        for row in rows:
+            if not row_problems(row, months):
+                self.stats['valid'] += 1
+                kept.append(list(row))
+                continue
+            fixed = deterministic_fix(row)
+            problems = row_problems(fixed, months)
+            if not problems:
+                self.stats['fixed_deterministic'] += 1
+                kept.append(fixed)
+            elif problems == [f"Date '{fixed[2]}' is outside the research period"]:
+                # A real date outside the period is excluded, not repaired
+                self.stats['out_of_period'] += 1
+            else:
+                defective.append((fixed, problems))
+
+        repaired = self._model_repair(defective, research_input, months) if (defective and self.repair_fn) else []
+        kept.extend(repaired)
+        self.stats['fixed_by_model'] += len(repaired)
+        self.stats['dropped'] += len(defective) - len(repaired)
+        return kept
+
+    def _model_repair(self, defective, research_input, months) -> List[List[str]]:
+        """One batched call for all defective rows; returns only rows that now validate"""
+        listing = "\n".join(
+            f"ROW {i + 1} PROBLEMS: {'; '.join(problems)}\n| " + " | ".join(row) + " |"
+            for i, (row, problems) in enumerate(defective)
+        )
+        prompt = f"""Repair these malformed research table rows for {research_input.drug_name} ({research_period(research_input)}).
+
+Columns (exactly {len(TABLE_COLUMNS)}, pipe-separated, URL last):
+| {' | '.join(TABLE_COLUMNS)} |
+
+Rules:
+- Category is always "{CATEGORY}"
+- Sub Category must be one of: {', '.join(ALLOWED_SUB_CATEGORIES)}
+- Date must be YYYY-MM-DD (first of month if only the month is given) and taken from the row itself
+- If a row has no date, or its date is outside {research_period(research_input)}, omit the row: never make up a date or move one into the period
+- Use "Not Available" for other missing values; do not invent facts, only restructure what is given
+- Output ONLY the repaired rows, one per line; omit a row if it cannot be repaired
+
+{listing}
+"""
+        try:
+            repaired = self.repair_fn(prompt)
+        except Exception as e:
+            print(f"   ⚠️ Row repair call failed: {e}")
+            return []
+        valid = []
+        for row in repaired:
+            fixed = deterministic_fix(row)
+            if not row_problems(fixed, months):
+                valid.append(fixed)
+        return valid[:len(defective)]
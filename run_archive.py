@@ -0,0 +1,209 @@
+"""
+Compressed per-run archive of agent outputs
+Each agent's output is appended to one file per run (outputs.md.gz) as its own
+gzip member, and a small JSON index records every entry's offset and length,
+so any agent's output can be read without decompressing the others. The run
+header (drug, manufacturer, period) is stored once in the index instead of in
+every output. `zcat outputs.md.gz` still prints all outputs in order
+
+Usage:
+    python run_archive.py list agent_outputs/Dupixent_Sanofi_20251019_101500
+    python run_archive.py show agent_outputs/Dupixent_Sanofi_20251019_101500 validation_output.md
+    python run_archive.py export agent_outputs/Dupixent_Sanofi_20251019_101500
+    python run_archive.py pack agent_outputs/
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from row_repair import research_period
+
+ARCHIVE_FILE = "outputs.md.gz"
+INDEX_FILE = "outputs.index.json"
+
+# "archive" (one compressed file per run) or "markdown" (one .md file per agent, the old layout)
+OUTPUT_FORMAT = os.getenv("DRUG_RESEARCH_OUTPUT_FORMAT", "archive")
+
+COMPRESS_LEVEL = 6
+
+HEADER_FIELDS = ("drug_name", "manufacturer", "target_month", "target_year")
+
+
+def run_header(research_input) -> Dict[str, str]:
+    header = {name: str(getattr(research_input, name, '') or '') for name in HEADER_FIELDS}
+    header["period"] = research_period(research_input)
+    return header
+
+
+def render_agent_output(title: str, heading: str, header: Dict[str, str], content: str) -> str:
+    """The markdown document of one agent output, as written to <name>_output.md"""
+    return (f"# {title} - Agent Output\n\n"
+            f"**Drug:** {header['drug_name']}\n"
+            f"**Manufacturer:** {header['manufacturer']}\n"
+            f"**Period:** {header.get('period') or header['target_month'] + ' ' + header['target_year']}\n\n"
+            f"## {heading}\n\n"
+            f"{content}")
+
+
+class RunArchive:
+    """Append-only archive of one run's agent outputs, with random access by entry name"""
+
+    def __init__(self, directory: Path, header: Optional[Dict[str, str]] = None):
+        self.directory = Path(directory)
+        self.path = self.directory / ARCHIVE_FILE
+        self.index_path = self.directory / INDEX_FILE
+        self._lock = threading.Lock()
+        if self.index_path.exists():
+            with open(self.index_path, encoding='utf-8') as f:
+                self.index = json.load(f)
+        else:
+            self.index = {"version": 1, "header": header or {}, "entries": []}
+        self._entries = {entry["name"]: entry for entry in self.index["entries"]}
+
+    @classmethod
+    def exists(cls, directory: Path) -> bool:
+        return (Path(directory) / INDEX_FILE).exists()
+
+    def save(self, name: str, title: Optional[str], heading: Optional[str], content: str) -> str:
+        """Append an entry (one compressed write) and persist the index; returns where it was stored.
+        Entries without a title are stored verbatim (e.g. packed legacy markdown files)"""
+        with self._lock:
+            if name in self._entries:
+                raise ValueError(f"Entry '{name}' already in {self.path}")
+            # Compressed under the lock: stages saving at once would each hold zlib's output buffers
+            data = gzip.compress(content.encode('utf-8'), compresslevel=COMPRESS_LEVEL, mtime=0)
+            with open(self.path, 'ab') as f:
+                offset = f.tell()
+                f.write(data)
+            entry = {"name": name, "title": title, "heading": heading, "offset": offset,
+                     "length": len(data), "size": len(content.encode('utf-8'))}
+            self.index["entries"].append(entry)
+            self._entries[name] = entry
+            self._write_index()
+        return f"{self.path}#{name}"
+
+    def _write_index(self):
+        # Written after every entry, so a run that crashes midway keeps the outputs it already archived
+        partial = self.index_path.with_suffix('.part')
+        with open(partial, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, indent=1, ensure_ascii=False)
+        partial.replace(self.index_path)
+
+    def names(self) -> List[str]:
+        return [entry["name"] for entry in self.index["entries"]]
+
+    def content(self, name: str) -> str:
+        """The raw agent output of an entry"""
+        entry = self._entries.get(name)
+        if entry is None:
+            raise KeyError(f"No entry '{name}' in {self.path}")
+        with open(self.path, 'rb') as f:
+            f.seek(entry["offset"])
+            return gzip.decompress(f.read(entry["length"])).decode('utf-8')
+
+    def document(self, name: str) -> str:
+        """An entry as the markdown document of the loose-file layout"""
+        entry = self._entries.get(name)
+        content = self.content(name)
+        if entry["title"] is None:
+            return content
+        return render_agent_output(entry["title"], entry["heading"], self.index["header"], content)
+
+    def export(self, directory: Optional[Path] = None) -> List[Path]:
+        """Write every entry as a markdown file (default: next to the archive)"""
+        directory = Path(directory or self.directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for name in self.names():
+            path = directory / name
+            path.write_text(self.document(name), encoding='utf-8')
+            paths.append(path)
+        return paths
+
+
+class MarkdownOutputs:
+    """The loose-file layout: one markdown file per agent output"""
+
+    def __init__(self, directory: Path, header: Dict[str, str]):
+        self.directory = Path(directory)
+        self.header = header
+
+    def save(self, name: str, title: str, heading: str, content: str) -> str:
+        path = self.directory / name
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(render_agent_output(title, heading, self.header, content))
+        return str(path)
+
+
+def output_writer(directory: Path, research_input, output_format: Optional[str] = None):
+    """Where a run saves its agent outputs: RunArchive or MarkdownOutputs (default: DRUG_RESEARCH_OUTPUT_FORMAT)"""
+    output_format = output_format or OUTPUT_FORMAT
+    header = run_header(research_input)
+    if output_format == "markdown":
+        return MarkdownOutputs(directory, header)
+    if output_format != "archive":
+        raise ValueError(f"Unknown output format '{output_format}' (use archive or markdown)")
+    return RunArchive(directory, header)
+
+
+def pack_directory(directory: Path, remove: bool = False) -> int:
+    """Move the loose *_output.md files of a run directory into its archive; returns the number packed"""
+    archive = RunArchive(directory)
+    packed = 0
+    for path in sorted(Path(directory).glob("*_output.md")):
+        if path.name not in archive.names():
+            archive.save(path.name, None, None, path.read_text(encoding='utf-8'))
+            packed += 1
+        if remove:
+            path.unlink()
+    return packed
+
+
+# ========== CLI ==========
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Read, export and create agent output archives")
+    commands = parser.add_subparsers(dest="command", required=True)
+    list_parser = commands.add_parser("list", help="Entries of a run archive")
+    list_parser.add_argument("run_dir")
+    show_parser = commands.add_parser("show", help="Print one agent output")
+    show_parser.add_argument("run_dir")
+    show_parser.add_argument("name", help="Entry name, e.g. validation_output.md")
+    export_parser = commands.add_parser("export", help="Write the outputs as loose markdown files")
+    export_parser.add_argument("run_dir")
+    export_parser.add_argument("--to", help="Target directory (default: the run directory)")
+    pack_parser = commands.add_parser("pack", help="Archive the loose markdown outputs of run directories")
+    pack_parser.add_argument("paths", nargs="+", help="Run directories or directories containing them")
+    pack_parser.add_argument("--remove", action="store_true", help="Delete the markdown files once archived")
+    args = parser.parse_args(argv)
+
+    if args.command == "pack":
+        run_dirs = sorted({path.parent for root in map(Path, args.paths) for path in root.rglob("*_output.md")})
+        total = sum(pack_directory(run_dir, remove=args.remove) for run_dir in run_dirs)
+        print(f"✅ Packed {total} outputs in {len(run_dirs)} run directories")
+        return 0
+
+    if not RunArchive.exists(args.run_dir):
+        print(f"❌ No {INDEX_FILE} in {args.run_dir}")
+        return 1
+    archive = RunArchive(args.run_dir)
+    if args.command == "list":
+        print(f"{'Entry':<40} {'bytes':>9} {'stored':>9}")
+        for entry in archive.index["entries"]:
+            print(f"{entry['name']:<40} {entry['size']:>9} {entry['length']:>9}")
+    elif args.command == "show":
+        print(archive.document(args.name))
+    else:
+        paths = archive.export(args.to)
+        print(f"✅ Exported {len(paths)} outputs to {args.to or args.run_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
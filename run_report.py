@@ -0,0 +1,269 @@
+"""
+Per-run cost and performance reports
+Every workflow run writes run_report.json next to its agent outputs. For each
+agent/phase it records wall time, model time, token counts, tool calls per
+provider, local index hits, rows produced and rows kept after dedup and
+validation. The reports of a batch of runs are aggregated per agent, so the
+most expensive, lowest-yield agents stand out
+
+Usage:
+    python run_report.py summarize agent_outputs/
+    python run_report.py summarize agent_outputs/ --sort seconds_per_kept_row --output batch_report.json
+"""
+
+import argparse
+import contextlib
+import contextvars
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from tool_hooks import wrap_tool, wrap_toolkit
+
+RUN_REPORT_FILE = "run_report.json"
+
+# Output of SearchIndexTools.search_local_index when the index has nothing for the query
+LOCAL_INDEX_MISS = "No documents found in the local index"
+
+TOKEN_FIELDS = ("input_tokens", "output_tokens", "reasoning_tokens", "cache_read_tokens", "total_tokens")
+
+# Numeric per-phase fields that are summed across phases and runs
+SUMMED_FIELDS = ("wall_seconds", "model_seconds", "tool_seconds", "model_calls") + TOKEN_FIELDS + (
+    "tool_errors", "cache_hits", "cache_misses", "rows_produced", "rows_malformed", "rows_kept")
+
+
+# ========== TOOL METERING ==========
+# The ToolMeter of the agent run in progress, visible to the metering wrapper of every toolkit
+current_meter: contextvars.ContextVar = contextvars.ContextVar("current_meter", default=None)
+
+
+class ToolMeter:
+    """Tool calls per provider, time spent in tools and local index hits of one agent run"""
+
+    def __init__(self):
+        self.calls: Counter = Counter()
+        self.errors = 0
+        self.seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._lock = threading.Lock()
+
+    def record(self, provider: str, seconds: float, output=None, failed: bool = False):
+        failed = failed or str(output).startswith('Error')
+        with self._lock:
+            self.calls[provider] += 1
+            self.seconds += seconds
+            self.errors += 1 if failed else 0
+            if provider == "local_index" and not failed:
+                if str(output).startswith(LOCAL_INDEX_MISS):
+                    self.cache_misses += 1
+                else:
+                    self.cache_hits += 1
+
+
+@contextlib.contextmanager
+def metered(meter: ToolMeter):
+    """Count the tool calls made inside the block against ``meter``"""
+    token = current_meter.set(meter)
+    try:
+        yield meter
+    finally:
+        current_meter.reset(token)
+
+
+def meter_toolkit(toolkit, provider: str):
+    """Record every call of a toolkit on the active ToolMeter (calls outside a metered block pass straight through)"""
+
+    def meter(fn, *args, **kwargs):
+        active = current_meter.get()
+        if active is None:
+            return fn(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            output = fn(*args, **kwargs)
+        except Exception:
+            active.record(provider, time.perf_counter() - started, failed=True)
+            raise
+        active.record(provider, time.perf_counter() - started, output)
+        return output
+
+    return wrap_toolkit(toolkit, lambda tool: wrap_tool(tool, meter))
+
+
+# ========== RUN REPORT ==========
+
+def model_usage(result) -> Dict[str, int]:
+    """Token counts and model calls of an agent result, or summed over a list of results
+    (zeros for results without agno metrics)"""
+    if isinstance(result, list):
+        usages = [model_usage(item) for item in result]
+        return {name: sum(usage[name] for usage in usages) for name in TOKEN_FIELDS + ("model_calls",)}
+    metrics = getattr(result, 'metrics', None)
+    usage = {name: int(getattr(metrics, name, 0) or 0) for name in TOKEN_FIELDS}
+    usage["model_calls"] = sum(1 for message in getattr(result, 'messages', None) or []
+                               if getattr(message, 'role', None) == 'assistant')
+    return usage
+
+
+class RunReport:
+    """Cost and yield of every phase of one workflow run"""
+
+    def __init__(self, run_id: str, profile: str, research_input):
+        self.run_id = run_id
+        self.profile = profile
+        self.research_input = research_input.model_dump() if hasattr(research_input, 'model_dump') else dict(vars(research_input))
+        self.started = datetime.now().isoformat(timespec="seconds")
+        self.phases: Dict[str, dict] = {}
+        self.rows: Dict[str, object] = {}
+        # Economy decision per research agent: {"agent": key, "mode": full/downgrade/skip, "reason": ...}
+        self.agent_modes: Dict[str, dict] = {}
+        self.wall_seconds = 0.0
+        # Stage graph of the run with per-stage timings and the critical path (see workflow_graph.py)
+        self.graph: Optional[dict] = None
+
+    def add_phase(self, name: str, seconds: float, agent: Optional[str] = None, result=None,
+                  meter: Optional[ToolMeter] = None, rows_produced: int = 0, rows_malformed: int = 0,
+                  rows_kept: int = 0, rows_credited: Optional[float] = None):
+        """Record one phase; model time is the phase's wall time minus the time spent in its tools.
+        ``rows_credited`` is the phase's share of rows other phases also produced (default: rows_kept)"""
+        tool_seconds = meter.seconds if meter else 0.0
+        self.phases[name] = {
+            "agent": agent,
+            "wall_seconds": round(seconds, 4),
+            "model_seconds": round(max(0.0, seconds - tool_seconds), 4) if result is not None else 0.0,
+            "tool_seconds": round(tool_seconds, 4),
+            **model_usage(result),
+            "tool_calls": dict(meter.calls) if meter else {},
+            "tool_errors": meter.errors if meter else 0,
+            "cache_hits": meter.cache_hits if meter else 0,
+            "cache_misses": meter.cache_misses if meter else 0,
+            "rows_produced": rows_produced,
+            "rows_malformed": rows_malformed,
+            "rows_kept": rows_kept,
+            "rows_credited": round(rows_kept if rows_credited is None else rows_credited, 4),
+        }
+
+    def totals(self) -> dict:
+        totals = {name: 0 for name in SUMMED_FIELDS}
+        tool_calls: Counter = Counter()
+        for phase in self.phases.values():
+            for name in SUMMED_FIELDS:
+                totals[name] += phase[name]
+            tool_calls.update(phase["tool_calls"])
+        totals["wall_seconds"] = round(self.wall_seconds, 4)
+        totals["model_seconds"] = round(totals["model_seconds"], 4)
+        totals["tool_seconds"] = round(totals["tool_seconds"], 4)
+        totals["tool_calls"] = dict(tool_calls)
+        return totals
+
+    def to_dict(self) -> dict:
+        return {
+            "run_id": self.run_id,
+            "profile": self.profile,
+            "started": self.started,
+            "research_input": self.research_input,
+            "totals": self.totals(),
+            "rows": self.rows,
+            "agent_modes": self.agent_modes,
+            "phases": self.phases,
+            "graph": self.graph,
+        }
+
+    def write(self, directory: Path) -> Path:
+        path = Path(directory) / RUN_REPORT_FILE
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+        return path
+
+
+# ========== BATCH AGGREGATION ==========
+
+def load_reports(paths: List[str]) -> List[dict]:
+    """Read run reports from report files and (recursively) from run directories"""
+    reports = []
+    for path in map(Path, paths):
+        files = sorted(path.rglob(RUN_REPORT_FILE)) if path.is_dir() else [path]
+        for report_file in files:
+            with open(report_file, encoding='utf-8') as f:
+                reports.append(json.load(f))
+    return reports
+
+
+def aggregate_reports(reports: List[dict]) -> dict:
+    """Per-phase totals across runs, with cost per kept row (None for phases that kept no rows)"""
+    phases: Dict[str, dict] = {}
+    for report in reports:
+        for name, phase in report["phases"].items():
+            total = phases.setdefault(name, {"agent": phase.get("agent"), "runs": 0, "tool_calls": Counter(),
+                                             **{field: 0 for field in SUMMED_FIELDS}})
+            total["runs"] += 1
+            total["tool_calls"].update(phase.get("tool_calls", {}))
+            for field in SUMMED_FIELDS:
+                total[field] += phase.get(field, 0)
+
+    for total in phases.values():
+        kept = total["rows_kept"]
+        total["tool_calls"] = dict(total["tool_calls"])
+        total["kept_rows_per_run"] = kept / total["runs"]
+        total["tokens_per_kept_row"] = total["total_tokens"] / kept if kept else None
+        total["seconds_per_kept_row"] = total["wall_seconds"] / kept if kept else None
+
+    return {
+        "runs": len(reports),
+        "wall_seconds": sum(report["totals"]["wall_seconds"] for report in reports),
+        "total_tokens": sum(report["totals"]["total_tokens"] for report in reports),
+        "rows_final": sum(report["rows"].get("final", 0) for report in reports),
+        "phases": phases,
+    }
+
+
+def ranked_phases(summary: dict, sort: str) -> List[tuple]:
+    """(name, totals) of agent phases, most expensive first; phases that kept no rows rank above all others"""
+    agent_phases = [(name, total) for name, total in summary["phases"].items() if total["agent"]]
+    return sorted(agent_phases, key=lambda item: (item[1][sort] is None, item[1][sort] or 0), reverse=True)
+
+
+# ========== CLI ==========
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Aggregate run reports of a batch of research runs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    summarize_parser = commands.add_parser("summarize", help="Rank agents by cost and yield across runs")
+    summarize_parser.add_argument("paths", nargs="+", help=f"{RUN_REPORT_FILE} files or directories containing them")
+    summarize_parser.add_argument("--sort", default="tokens_per_kept_row",
+                                  choices=["tokens_per_kept_row", "seconds_per_kept_row", "total_tokens", "wall_seconds"])
+    summarize_parser.add_argument("--output", help="Write the aggregated report to this JSON file")
+
+    args = parser.parse_args(argv)
+    reports = load_reports(args.paths)
+    if not reports:
+        print(f"❌ No {RUN_REPORT_FILE} found")
+        return 1
+
+    summary = aggregate_reports(reports)
+    print(f"=== {summary['runs']} runs, {summary['wall_seconds']:.1f} s, {summary['total_tokens']} tokens, "
+          f"{summary['rows_final']} final rows ===")
+    print(f"{'Agent':<28} {'runs':>4} {'wall s':>8} {'model s':>8} {'tokens':>10} {'tools':>6} "
+          f"{'kept':>5} {'tokens/row':>11} {'s/row':>7}")
+    for name, total in ranked_phases(summary, args.sort):
+        tokens_per_row = f"{total['tokens_per_kept_row']:.0f}" if total['tokens_per_kept_row'] is not None else "-"
+        seconds_per_row = f"{total['seconds_per_kept_row']:.1f}" if total['seconds_per_kept_row'] is not None else "-"
+        print(f"{name:<28} {total['runs']:>4} {total['wall_seconds']:>8.1f} {total['model_seconds']:>8.1f} "
+              f"{total['total_tokens']:>10} {sum(total['tool_calls'].values()):>6} {total['rows_kept']:>5} "
+              f"{tokens_per_row:>11} {seconds_per_row:>7}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        print(f"✅ Batch report saved: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
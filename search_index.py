@@ -0,0 +1,186 @@
+"""
+Local full-text index of fetched search results and scraped pages
+Every Tavily/Exa/DuckDuckGo hit and every Trafilatura extraction is stored in
+SQLite FTS5 with drug, period and source metadata, and exposed to agents as a
+tool they query before spending web-search quota
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from agno.tools import Toolkit
+
+from row_repair import research_period
+from tool_hooks import current_research, parse_search_results, wrap_tool, wrap_toolkit
+
+DEFAULT_INDEX_PATH = os.getenv("DRUG_RESEARCH_INDEX_PATH", "research_cache/search_index.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    title TEXT,
+    content TEXT,
+    kind TEXT,
+    source TEXT,
+    drug TEXT,
+    period TEXT,
+    published_date TEXT,
+    query TEXT,
+    fetched_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_documents_drug ON documents(drug);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    title, content, drug, content='documents', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS documents_ai AFTER INSERT ON documents BEGIN
+    INSERT INTO documents_fts(rowid, title, content, drug) VALUES (new.id, new.title, new.content, new.drug);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_ad AFTER DELETE ON documents BEGIN
+    INSERT INTO documents_fts(documents_fts, rowid, title, content, drug) VALUES ('delete', old.id, old.title, old.content, old.drug);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_au AFTER UPDATE ON documents BEGIN
+    INSERT INTO documents_fts(documents_fts, rowid, title, content, drug) VALUES ('delete', old.id, old.title, old.content, old.drug);
+    INSERT INTO documents_fts(rowid, title, content, drug) VALUES (new.id, new.title, new.content, new.drug);
+END;
+"""
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def _match_expression(query: str) -> str:
+    """Turn free text into an FTS5 OR-query of quoted terms (ranked by bm25)"""
+    terms = [t for t in _TOKEN.findall(query.lower()) if len(t) > 1]
+    return ' OR '.join(f'"{t}"' for t in dict.fromkeys(terms))
+
+
+class SearchIndex:
+    """SQLite FTS5 store of search hits and scraped pages"""
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        self.path = path
+        if path != ':memory:':
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+        self.stats = {'ingested': 0, 'queries': 0, 'hits': 0}
+
+    def add(self, url: str, title: str = '', content: str = '', kind: str = 'search',
+            source: str = '', published_date: str = '', query: str = '', research_input=None):
+        """Insert or refresh a document; a longer body (e.g. a full scrape) replaces a snippet"""
+        if not url:
+            return
+        research_input = research_input or current_research.get()
+        drug = research_input.drug_name if research_input else ''
+        period = research_period(research_input) if research_input else ''
+        fetched_at = datetime.now().isoformat(timespec='seconds')
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO documents (url, title, content, kind, source, drug, period, published_date, query, fetched_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    title = CASE WHEN excluded.title != '' THEN excluded.title ELSE documents.title END,
+                    content = CASE WHEN length(excluded.content) > length(documents.content)
+                                   THEN excluded.content ELSE documents.content END,
+                    kind = CASE WHEN excluded.kind = 'page' THEN 'page' ELSE documents.kind END,
+                    published_date = CASE WHEN excluded.published_date != '' THEN excluded.published_date
+                                          ELSE documents.published_date END,
+                    drug = CASE WHEN documents.drug = '' THEN excluded.drug ELSE documents.drug END,
+                    period = CASE WHEN documents.period = '' THEN excluded.period ELSE documents.period END,
+                    fetched_at = excluded.fetched_at
+                """,
+                (url, title or '', content or '', kind, source, drug, period, published_date or '', query or '', fetched_at),
+            )
+            self.stats['ingested'] += 1
+
+    def ingest_search_output(self, output: str, source: str, query: str = ''):
+        """Index every hit found in a search tool's output"""
+        for record in parse_search_results(output):
+            self.add(record['url'], record['title'], record['content'], kind='search', source=source,
+                     published_date=record['published_date'], query=query)
+
+    def search(self, query: str, drug: Optional[str] = None, limit: int = 10) -> List[Dict[str, str]]:
+        """Return the best matching documents for a free-text query"""
+        expression = _match_expression(query)
+        if not expression:
+            return []
+        sql = """
+            SELECT d.url, d.title, d.kind, d.source, d.drug, d.period, d.published_date, d.fetched_at,
+                   snippet(documents_fts, 1, '', '', ' … ', 48) AS snippet
+            FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid
+            WHERE documents_fts MATCH ?
+        """
+        params = [expression]
+        if drug:
+            sql += " AND d.drug = ? COLLATE NOCASE"
+            params.append(drug)
+        sql += " ORDER BY bm25(documents_fts, 4.0, 1.0, 2.0) LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = [dict(row) for row in self._conn.execute(sql, params)]
+            self.stats['queries'] += 1
+            self.stats['hits'] += 1 if rows else 0
+        return rows
+
+    def get_content(self, url: str) -> Optional[str]:
+        """Full stored text for a URL, if indexed"""
+        with self._lock:
+            row = self._conn.execute("SELECT content FROM documents WHERE url = ?", (url,)).fetchone()
+        return row['content'] if row else None
+
+
+# ========== TOOLKIT INGESTION ==========
+
+def index_toolkit(toolkit, index: SearchIndex, source: str, kind: str = 'search'):
+    """Ingest everything a toolkit returns into the index, passing output through unchanged"""
+
+    def ingest(fn, *args, **kwargs):
+        output = fn(*args, **kwargs)
+        argument = args[0] if args else next(iter(kwargs.values()), '')
+        try:
+            if kind == 'page':
+                if isinstance(output, str) and output and not output.startswith('Error'):
+                    index.add(str(argument), content=output, kind='page', source=source)
+            else:
+                index.ingest_search_output(output, source, query=str(argument))
+        except sqlite3.Error as e:
+            print(f"   ⚠️ Search index ingestion failed: {e}")
+        return output
+
+    return wrap_toolkit(toolkit, lambda tool: wrap_tool(tool, ingest))
+
+
+class SearchIndexTools(Toolkit):
+    """Agent tool over the local search index"""
+
+    def __init__(self, index: SearchIndex, **kwargs):
+        self.index = index
+        super().__init__(name="local_search_index", tools=[self.search_local_index], **kwargs)
+
+    def search_local_index(self, query: str, drug: Optional[str] = None, max_results: int = 10) -> str:
+        """Search previously fetched search results and scraped pages (milliseconds, no API quota).
+        Use this BEFORE any web search; fall back to web search if nothing relevant is returned.
+
+        Args:
+            query (str): Free-text query, e.g. "Dupixent FDA approval October 2025".
+            drug (str): Optional brand name to restrict results to documents found for that drug.
+            max_results (int): Maximum number of documents to return.
+
+        Returns:
+            str: JSON list of documents with url, title, snippet, source, drug, period and published_date.
+        """
+        results = self.index.search(query, drug=drug, limit=max_results)
+        if not results:
+            return "No documents found in the local index. Use the web search tools."
+        return json.dumps(results, ensure_ascii=False)
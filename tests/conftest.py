@@ -0,0 +1,14 @@
+"""Shared fixtures: every test runs offline in its own working directory (research_cache/, agent_outputs/)"""
+
+import os
+
+import pytest
+
+os.environ.setdefault("AGNO_TELEMETRY", "false")
+os.environ.setdefault("DRUG_RESEARCH_RATE_LIMITING", "0")
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
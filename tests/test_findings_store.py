@@ -0,0 +1,68 @@
+import sqlite3
+
+import pytest
+
+from findings_store import DB_COLUMNS, FindingsStore
+from research_schema import TABLE_COLUMNS, canonicalize_url, row_signature
+
+
+def finding(summary="Label updated for adolescents", url="https://www.fda.gov/drugs/dupixent-label?utm_source=x",
+            date="2025-10-01", sub_category="Label Updates", drug="Dupixent"):
+    values = {"Category": "Marketed Assets", "Sub Category": sub_category, "Date": date, "Drug Name": drug,
+              "Generic Name": "dupilumab", "Manufacturer": "Sanofi", "Development Summary": summary, "URL": url}
+    return [values.get(column, "Not Available") for column in TABLE_COLUMNS]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FindingsStore(str(tmp_path / "findings.db"))
+
+
+def test_findings_of_one_kind_and_date_are_kept_apart(store):
+    store.upsert_rows([finding(url="https://fda.gov/a"), finding(summary="Boxed warning removed", url="https://fda.gov/b")])
+    # Without a URL the Development Summary tells them apart
+    store.upsert_rows([finding(url="Not Available"), finding(summary="New dosing", url="Not Available")])
+    assert len(store.query(drug="Dupixent")) == 4
+
+
+def test_a_refound_finding_is_refreshed_not_duplicated(store):
+    store.upsert_rows([finding()], target_period="October 2025", run_id="run-1")
+    # Same document via a tracking link, with a reworded summary
+    store.upsert_rows([finding(summary="Label  updated for ADOLESCENTS",
+                               url="http://fda.gov/drugs/dupixent-label/?fbclid=1")], run_id="run-2")
+    [row] = store.query(drug="dupixent")
+    assert row["Run ID"] == "run-2" and row["Target Period"] == "October 2025"
+    assert row["Development Summary"] == "Label  updated for ADOLESCENTS"
+    assert row["First Seen"] <= row["Last Seen"]
+
+
+def test_query_filters(store):
+    store.upsert_rows([finding(url="https://fda.gov/a"), finding(date="2024-03-01", url="https://fda.gov/b"),
+                       finding(sub_category="Safety Concern", url="https://fda.gov/c"),
+                       finding(drug="Rinvoq", url="https://fda.gov/d"), ["too", "short"]])
+    assert len(store.query(drug="DUPIXENT")) == 3
+    assert [row["Date"] for row in store.query(drug="Dupixent", year="2024")] == ["2024-03-01"]
+    assert len(store.query(sub_category="Safety Concern")) == 1
+    assert [row["Drug Name"] for row in store.query(url="https://www.fda.gov/d/?utm_campaign=x")] == ["Rinvoq"]
+    assert len(store.query(limit=2)) == 2
+
+
+def test_only_tracking_params_are_dropped_from_urls():
+    url = "https://example.com/news?refid=7&reference=label&ref=rss&ref_src=twsrc&utm_medium=email&_hsenc=p2"
+    assert canonicalize_url(url) == "https://example.com/news?reference=label&refid=7"
+
+
+def test_signatures_of_an_older_database_are_recomputed(tmp_path):
+    path = str(tmp_path / "findings.db")
+    FindingsStore(path)
+    rows = [finding(url="https://fda.gov/a"), finding(summary="Boxed warning removed", url="https://fda.gov/b")]
+    with sqlite3.connect(path) as conn:
+        # Rows written under the old key (leading columns only), which made them one finding
+        conn.executemany(f"INSERT INTO findings (signature, {', '.join(DB_COLUMNS)}) VALUES (?{', ?' * len(DB_COLUMNS)})",
+                         [(f"old-{i}", *row) for i, row in enumerate(rows)])
+        conn.execute("PRAGMA user_version = 0")
+    store = FindingsStore(path)
+    assert store.upsert_rows(rows) == 2
+    assert len(store.query()) == 2
+    with sqlite3.connect(path) as conn:
+        assert {signature for signature, in conn.execute("SELECT signature FROM findings")} == set(map(row_signature, rows))
@@ -0,0 +1,54 @@
+import socket
+import threading
+
+import requests
+
+import http_pool
+from http_pool import ThreadLocalSession, new_adapter, new_client, pool_toolkit, run_benchmark
+
+
+def test_pooled_clients_reuse_connections():
+    results = run_benchmark(agents=2, calls=5, rtt=0.0)
+    assert results["fresh"]["connections"] == 10
+    assert results["pooled_requests"]["connections"] <= 2
+    assert results["pooled_httpx"]["connections"] <= 2
+    # DNS caching is scoped to the pooled clients, the rest of the process resolves as usual
+    assert socket.getaddrinfo is http_pool.socket.getaddrinfo
+    assert requests.api.request.__module__ == "requests.api"
+
+
+def test_every_thread_gets_its_own_session_with_the_clients_headers():
+    template = requests.Session()
+    template.headers["Authorization"] = "Bearer key"
+    pooled = ThreadLocalSession(template, new_adapter())
+    sessions = [pooled.session()]
+    thread = threading.Thread(target=lambda: sessions.append(pooled.session()))
+    thread.start()
+    thread.join()
+    assert sessions[0] is pooled.session() and sessions[0] is not sessions[1]
+    assert all(session.headers["Authorization"] == "Bearer key" for session in sessions)
+    assert sessions[0].get_adapter("https://api.tavily.com") is sessions[1].get_adapter("https://api.tavily.com")
+
+
+def test_pool_toolkit_injects_pooled_sessions():
+    class Client:
+        def __init__(self):
+            self.session = requests.Session()
+            self.session.headers["Authorization"] = "Bearer key"
+
+    class Toolkit:
+        def __init__(self):
+            self.client = Client()
+
+    toolkit = pool_toolkit(Toolkit())
+    assert isinstance(toolkit.client.session, ThreadLocalSession)
+    assert toolkit.client.session.headers["Authorization"] == "Bearer key"
+
+
+def test_httpx_client_resolves_through_the_dns_cache():
+    with new_client() as client:
+        assert isinstance(client._transport._pool._network_backend, http_pool.CachedDnsBackend)
+    http_pool._cached_address("localhost", 80)
+    hits = http_pool._dns_cache.hits
+    assert http_pool._cached_address("localhost", 80) in ("127.0.0.1", "::1")
+    assert http_pool._dns_cache.hits == hits + 1
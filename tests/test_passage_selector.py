@@ -0,0 +1,74 @@
+import pytest
+
+from passage_selector import PassageSelector, condense_page, estimate_tokens, select_passages, split_passages
+from research_engine import DrugResearchInput
+from tool_hooks import research_scope
+
+FILLER = ("The company said in a statement that patients and physicians would see changes in the coming "
+          "months, according to analysts who follow the sector closely.")
+
+
+@pytest.fixture
+def research_input():
+    return DrugResearchInput(drug_name="Dupixent", generic_name="dupilumab", manufacturer="Sanofi",
+                             target_month="October", target_year="2025")
+
+
+def page(relevant_at, paragraphs=30):
+    """Filler paragraphs with one Dupixent approval paragraph at index ``relevant_at``"""
+    parts = [" ".join([FILLER] * 4) for _ in range(paragraphs)]
+    parts[relevant_at] = ("The FDA approved Dupixent (dupilumab) for a new indication in October 2025, "
+                          "Sanofi said, after phase 3 trial results met the primary endpoint.")
+    return "\n\n".join(parts)
+
+
+def test_passages_cover_the_text_and_long_paragraphs_split_at_sentences():
+    text = "Heading\n\n" + " ".join([FILLER] * 20) + "\n\nShort closing paragraph."
+    spans = split_passages(text, target_words=40)
+    assert len(spans) > 2
+    assert all(text[start:end].strip() for start, end in spans)
+    assert spans == sorted(spans)
+    # The heading stays with the paragraph that follows it
+    assert text[spans[0][0]:spans[0][1]].startswith("Heading\n\nThe company")
+
+
+def test_selected_passages_fit_the_budget_and_keep_the_relevant_one(research_input):
+    text = page(relevant_at=17)
+    spans = select_passages(text, research_input, token_budget=200)
+    assert spans == sorted(spans)
+    assert sum(estimate_tokens(text[start:end]) for start, end in spans) <= 200
+    assert any("FDA approved Dupixent" in text[start:end] for start, end in spans)
+
+
+def test_condensed_page_points_back_to_the_source_offsets(research_input):
+    text = page(relevant_at=5)
+    condensed = condense_page(text, research_input, source="https://example.com/a", token_budget=200)
+    assert condensed.startswith("[Extracted ")
+    assert "from https://example.com/a" in condensed
+    start, end = (int(offset) for offset in condensed.split("[chars ")[1].split("]")[0].split("-"))
+    assert text[start:end].strip() in condensed
+
+
+def test_short_pages_are_forwarded_unchanged(research_input):
+    assert condense_page("Dupixent approved.", research_input, token_budget=100) == "Dupixent approved."
+
+
+def test_whitespace_only_page_over_the_budget_is_dropped(research_input):
+    assert condense_page(" \n\n \t" * 1000, research_input, token_budget=10) == ""
+
+
+def test_a_single_passage_over_the_budget_is_truncated(research_input):
+    text = " ".join(["Dupixent label update approved by the FDA"] * 200)  # One sentence, no boundary to split at
+    condensed = condense_page(text, research_input, token_budget=50)
+    assert "[chars 0-200]" in condensed
+
+
+def test_selector_only_condenses_inside_a_research_scope(research_input):
+    selector = PassageSelector(token_budget=200)
+    text = page(relevant_at=3)
+    assert selector.condense(text) == text
+    with research_scope(research_input):
+        assert selector.condense(text).startswith("[Extracted ")
+        assert selector.condense("Error: timeout") == "Error: timeout"
+    assert selector.stats["pages"] == 1
+    assert selector.stats["forwarded_tokens"] < selector.stats["input_tokens"]
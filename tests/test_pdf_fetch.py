@@ -0,0 +1,95 @@
+import hashlib
+import os
+
+import pytest
+from pypdf import PdfWriter
+
+import pdf_fetch
+from pdf_fetch import PdfTools, parse_page_range
+
+
+def cached_pdf(url: str, pages: int):
+    """Put a blank PDF for ``url`` in the download cache, so no request is made"""
+    pdf_fetch.PDF_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=200, height=200)
+    with open(pdf_fetch.PDF_CACHE_DIR / f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}.pdf", 'wb') as f:
+        writer.write(f)
+
+
+@pytest.mark.parametrize("pages, expected", [("3", [2]), ("1-3", [0, 1, 2]), ("2,5-7", [1, 4, 5, 6]),
+                                             ("8-", [7, 8, 9]), ("12", [])])
+def test_parse_page_range(pages, expected):
+    assert parse_page_range(pages, 10) == expected
+
+
+def test_read_pages_from_cache():
+    cached_pdf("https://fda.example.com/label.pdf", 4)
+    tools = PdfTools()
+    assert tools.get_pdf_page_count("https://fda.example.com/label.pdf").endswith("has 4 pages")
+    output = tools.read_pdf_pages("https://fda.example.com/label.pdf", "2-3")
+    assert "(4 pages)" in output and "[Page 2]" in output and "[Page 3]" in output
+
+
+def test_evicted_document_stays_open_while_in_use():
+    for name, pages in (("a", 2), ("b", 3)):
+        cached_pdf(f"https://fda.example.com/{name}.pdf", pages)
+    tools = PdfTools(max_open=1)
+
+    with tools._document("https://fda.example.com/a.pdf") as held:
+        # Opening another document evicts the held one from the cache, but not from under its reader
+        assert tools.get_pdf_page_count("https://fda.example.com/b.pdf").endswith("has 3 pages")
+        assert held.evicted
+        assert held.page_count == 2
+        assert held.extract_pages([0, 1]) == ['', '']
+    assert held._map.closed
+
+    # Evicted documents nobody holds are closed right away
+    with tools._document("https://fda.example.com/b.pdf") as current:
+        pass
+    tools.get_pdf_page_count("https://fda.example.com/a.pdf")
+    assert current.evicted and current._map.closed
+
+
+@pytest.mark.parametrize("content", [b"%PDF-1.7\nnot really a pdf", "encrypted"])
+def test_unreadable_cached_pdf_is_closed_and_dropped(content, monkeypatch):
+    url = "https://fda.example.com/broken.pdf"
+    path = pdf_fetch.cached_path(url)
+    pdf_fetch.PDF_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    if content == "encrypted":
+        writer = PdfWriter()
+        writer.add_blank_page(width=200, height=200)
+        writer.encrypt("secret")
+        with open(path, 'wb') as f:
+            writer.write(f)
+    else:
+        path.write_bytes(content)
+
+    opened = []
+    monkeypatch.setattr(pdf_fetch, "open", lambda *args: opened.append(open(*args)) or opened[-1], raising=False)
+    assert PdfTools().get_pdf_page_count(url).startswith("Error")
+    assert opened and all(f.closed for f in opened)
+    # The bad file is gone from the cache, so the next call downloads the document again
+    assert not path.exists()
+
+
+def test_cache_evicts_least_recently_used_files_beyond_its_size():
+    pdf_fetch.PDF_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for age, name in enumerate(("newest", "middle", "oldest", "kept")):
+        path = pdf_fetch.PDF_CACHE_DIR / f"{name}.pdf"
+        path.write_bytes(b"x" * 1000)
+        os.utime(path, (1000 - age * 100, 1000 - age * 100))
+        paths.append(path)
+
+    assert pdf_fetch.prune_cache(max_bytes=2500, keep=paths[3]) == 2
+    assert [path.exists() for path in paths] == [True, False, False, True]
+
+
+def test_cache_hit_marks_the_file_recently_used():
+    cached_pdf("https://fda.example.com/label.pdf", 1)
+    path = pdf_fetch.cached_path("https://fda.example.com/label.pdf")
+    os.utime(path, (0, 0))
+    assert pdf_fetch.download_pdf("https://fda.example.com/label.pdf") == path
+    assert path.stat().st_mtime > 0
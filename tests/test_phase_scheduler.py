@@ -0,0 +1,133 @@
+import threading
+import time
+from concurrent.futures import CancelledError
+
+import pytest
+
+from phase_scheduler import (
+    LatencyHistory, LptScheduler, PhaseJob, phase_one_latencies, simulate_batch, simulate_makespan,
+)
+
+
+def test_queued_jobs_are_cancelled_when_the_scheduler_exits_on_a_failure():
+    started, release, ran, finished = threading.Event(), threading.Event(), [], []
+
+    def blocking():
+        started.set()
+        assert release.wait(timeout=5)
+        ran.append("running")
+
+    jobs = [PhaseJob("running", blocking, on_done=finished.append)] + [
+        PhaseJob(key, lambda key=key: ran.append(key), on_done=finished.append) for key in ("queued-1", "queued-2")]
+    with pytest.raises(RuntimeError):
+        with LptScheduler(concurrency=1) as scheduler:
+            done = scheduler.submit(jobs[:1])
+            assert started.wait(timeout=5)
+            done += scheduler.submit(jobs[1:])
+            threading.Timer(0.1, release.set).start()
+            raise RuntimeError("a stage failed")
+
+    # The running job finished; the queued ones never ran and were failed instead
+    assert ran == ["running"] and all(event.is_set() for event in done)
+    assert jobs[0].error is None
+    assert all(isinstance(job.error, CancelledError) for job in jobs[1:])
+    assert sorted(job.key for job in finished) == ["queued-1", "queued-2", "running"]
+
+
+def test_cancel_drops_only_the_given_jobs():
+    release = threading.Event()
+    with LptScheduler(concurrency=1) as scheduler:
+        scheduler.submit([PhaseJob("running", lambda: release.wait(timeout=5))])
+        mine = [PhaseJob(f"mine-{i}", lambda: "mine") for i in range(2)]
+        other = PhaseJob("other", lambda: "other")
+        scheduler.submit(mine + [other])
+        assert scheduler.cancel(mine) == 2
+        release.set()
+    assert other.result == "other" and all(job.result is None for job in mine)
+
+
+@pytest.fixture
+def history():
+    return LatencyHistory("research_cache/agent_latency.db", window=3)
+
+
+def test_expected_latency_is_the_median_of_the_latest_runs(history):
+    assert history.expected("market") is None
+    for seconds in (100.0, 1.0, 5.0, 3.0):
+        history.record("market", seconds)
+    assert history.expected("market") == 3.0  # The 100 s run fell out of the window
+
+
+def test_jobs_start_longest_expected_first(history):
+    for key, seconds in (("short", 1.0), ("long", 3.0), ("medium", 2.0)):
+        history.record(key, seconds)
+    order = []
+    jobs = [PhaseJob(key, lambda key=key: order.append(key)) for key in ("short", "new", "medium", "long")]
+    with LptScheduler(concurrency=1, history=history) as scheduler:
+        scheduler.run(jobs)
+    # An agent without history ranks above the longest known one
+    assert order == ["new", "long", "medium", "short"]
+    assert [job.expected for job in jobs] == [1.0, 4.0, 2.0, 3.0]
+
+
+def test_run_records_latencies_and_reraises_the_first_error(history):
+    def fail():
+        raise ValueError("agent failed")
+
+    jobs = [PhaseJob("ok", lambda: "done"), PhaseJob("failing", fail)]
+    with LptScheduler(concurrency=2, history=history) as scheduler:
+        with pytest.raises(ValueError):
+            scheduler.run(jobs)
+    assert jobs[0].result == "done" and jobs[0].seconds > 0
+    assert history.expected("ok") is not None
+    assert history.expected("failing") is None  # Failed runs say nothing about the latency
+
+
+def test_batch_dispatch_waits_for_every_submitter_and_orders_across_runs(history):
+    history.record("short", 1.0)
+    history.record("long", 5.0)
+    order = []
+    with LptScheduler(concurrency=1, history=history, submitters=2, gate_timeout=5.0) as scheduler:
+        first = scheduler.submit([PhaseJob("short", lambda: order.append("short"))])
+        first += scheduler.submit([PhaseJob("short", lambda: order.append("short-2"))], last=False)
+        time.sleep(0.1)
+        assert order == []  # One submitter still has jobs to come
+        second = scheduler.submit([PhaseJob("long", lambda: order.append("long"))])
+        for done in first + second:
+            assert done.wait(timeout=5)
+    assert order == ["long", "short", "short-2"]
+
+
+def test_batch_gate_opens_after_the_timeout():
+    ran = threading.Event()
+    with LptScheduler(concurrency=1, submitters=2, gate_timeout=0.2) as scheduler:
+        started = time.monotonic()
+        (done,) = scheduler.submit([PhaseJob("alone", ran.set)])
+        assert done.wait(timeout=5)
+    assert ran.is_set() and time.monotonic() - started >= 0.2
+
+
+def test_simulated_lpt_makespan_against_submission_order():
+    durations = [1.0, 1.0, 1.0, 3.0]
+    assert simulate_makespan(durations, [0, 1, 2, 3], concurrency=2) == 4.0
+    assert simulate_makespan(durations, [3, 0, 1, 2], concurrency=2) == 3.0
+    assert simulate_makespan(durations, [0, 1, 2, 3], concurrency=1) == 6.0
+
+    result = simulate_batch([[("a", 1.0), ("b", 1.0)], [("a", 1.0), ("slow", 3.0)]], concurrency=2)
+    assert result == {"jobs": 4, "concurrency": 2, "fifo_seconds": 4.0, "lpt_seconds": 3.0,
+                      "lower_bound_seconds": 3.0, "saving": 0.25}
+    # Expected latencies can be given instead of the medians of the batch itself
+    assert simulate_batch([[("a", 1.0), ("slow", 3.0)]], concurrency=1, expected={"a": 9.0})["lpt_seconds"] == 4.0
+
+
+def test_phase_one_latencies_keep_research_agents_in_phase_order():
+    report = {
+        "agent_modes": {"Market Research": "full", "Safety Research": "full"},
+        "phases": {
+            "Market Research": {"agent": "market", "wall_seconds": 2.0},
+            "Market Research Parse": {"agent": "market", "wall_seconds": 0.1},
+            "Safety Research": {"agent": "safety", "wall_seconds": 4.0},
+            "Validation": {"agent": "validation", "wall_seconds": 1.0},
+        },
+    }
+    assert phase_one_latencies(report) == [("market", 2.0), ("safety", 4.0)]
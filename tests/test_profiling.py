@@ -0,0 +1,61 @@
+import json
+import threading
+
+import pytest
+
+import profiling
+from profiling import SUMMARY_FILE, RunProfiler
+
+
+@pytest.fixture(params=[False, True], ids=["per-thread", "per-process"])
+def one_profiler_per_process(request, monkeypatch):
+    monkeypatch.setattr(profiling, "ONE_PROFILER_PER_PROCESS", request.param)
+    return request.param
+
+
+def busy(n=20000):
+    return sum(i * i for i in range(n))
+
+
+def test_stage_gets_wall_time_and_memory_when_another_profiler_is_active(tmp_path, monkeypatch):
+    def enable(self):
+        raise ValueError("Another profiling tool is already active")
+
+    monkeypatch.setattr(profiling.cProfile.Profile, "enable", enable)
+    profiler = RunProfiler(tmp_path)
+    with profiler.phase("Market Research"):
+        busy()
+    summary = json.loads((profiler.close() / SUMMARY_FILE).read_text(encoding="utf-8"))
+
+    phase = summary["phases"]["Market Research"]
+    assert phase["file"] is None and phase["top_functions"] == []
+    assert phase["wall_seconds"] > 0 and "allocated_mb" in phase["memory"]
+    assert "No CPU profile" in (tmp_path / "profile" / "01_market_research.txt").read_text(encoding="utf-8")
+    assert profiling.main(["show", str(tmp_path)]) == 0
+
+
+def test_concurrent_stages_do_not_abort_the_run(tmp_path, one_profiler_per_process):
+    profiler = RunProfiler(tmp_path)
+    inside, release = threading.Barrier(2), threading.Event()
+
+    def stage(name):
+        with profiler.phase(name):
+            inside.wait(timeout=5)
+            release.wait(timeout=5)
+            busy()
+
+    threads = [threading.Thread(target=stage, args=(name,)) for name in ("Regulatory", "Safety")]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+    profiler.close()
+
+    files = [phase["file"] for phase in profiler.phases.values()]
+    assert len(files) == 2
+    # With one profiler per process only one of two overlapping stages is CPU profiled
+    assert sum(file is not None for file in files) == (1 if one_profiler_per_process else 2)
+    # The profiler is free again for the next stage
+    with RunProfiler(tmp_path / "next").phase("Output"):
+        busy()
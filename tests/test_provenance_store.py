@@ -0,0 +1,93 @@
+import multiprocessing
+import sqlite3
+
+from provenance_store import ProvenanceStore, best_window, evidence_terms
+from research_schema import TABLE_COLUMNS, row_signature
+
+PAGE = ("Sanofi news.\n"
+        "Shares rose in early trading on the Paris exchange.\n"
+        "The FDA approved Dupixent for chronic spontaneous urticaria in adolescents on October 3, 2025. "
+        "The approval covers patients aged 12 and older. Analysts expect modest revenue.\n"
+        "Other news followed.")
+
+
+def row(summary="FDA approved Dupixent for chronic spontaneous urticaria", url="https://www.sanofi.com/news/csu"):
+    values = {"Date": "2025-10-03", "Drug Name": "Dupixent", "Development Summary": summary,
+              "Detailed Description": "Approval in adolescents aged 12 and older", "URL": url}
+    return [values.get(column, "Not Available") for column in TABLE_COLUMNS]
+
+
+def page_text(url):
+    return f"{url} content " * 50
+
+
+def add_pages(args):
+    directory, worker = args
+    store = ProvenanceStore(directory)
+    # Every worker also stores the same shared pages
+    urls = [f"https://example.com/{name}/{i}" for i in range(20) for name in (worker, "shared")]
+    return {url: store.add_document(url, page_text(url)) for url in urls}
+
+
+def test_best_window_covers_the_most_distinct_terms():
+    hits = [(0, b"fda"), (900, b"dupixent"), (950, b"urticaria"), (1000, b"fda"), (1400, b"dupixent")]
+    assert best_window(hits, window=200) == (900, 1003, 3)
+    assert best_window([(10, b"fda")], window=200) == (10, 13, 1)
+
+
+def test_passage_is_widened_to_sentence_boundaries(tmp_path):
+    store = ProvenanceStore(str(tmp_path))
+    document_id = store.add_document("https://www.sanofi.com/news/csu", PAGE)
+    start, end, matched = store.locate(document_id, evidence_terms(row()))
+    passage = store.passage(document_id, start, end)
+    assert matched >= 5
+    assert passage.startswith("The FDA approved Dupixent") and passage.rstrip().endswith(".")
+    assert "Shares rose" not in passage and "Other news" not in passage
+
+
+def test_documents_are_stored_once_by_content(tmp_path):
+    store = ProvenanceStore(str(tmp_path))
+    first = store.add_document("https://www.sanofi.com/news/csu", PAGE)
+    size = store.blob_path.stat().st_size
+    assert store.add_document("https://sanofi.com/news/csu?utm_source=x", PAGE) == first
+    assert store.blob_path.stat().st_size == size
+    assert store.stats["duplicates"] == 1
+    assert store.documents_for_url("http://sanofi.com/news/csu/") == [first]
+    assert store.add_document("https://example.com", "") is None
+
+
+def test_processes_append_to_one_store(tmp_path):
+    with multiprocessing.get_context("spawn").Pool(4) as pool:
+        results = pool.map(add_pages, [(str(tmp_path), worker) for worker in range(4)])
+    store = ProvenanceStore(str(tmp_path))
+    assert store.summary()["documents"] == 4 * 20 + 20
+    for ids in results:
+        for url, document_id in ids.items():
+            assert store.passage(document_id, 0, len(page_text(url).encode())) == page_text(url)
+    # A shared page has one ID whichever process stored it first
+    assert len({ids["https://example.com/shared/0"] for ids in results}) == 1
+
+
+def test_rows_are_linked_to_a_passage_once(tmp_path):
+    store = ProvenanceStore(str(tmp_path))
+    store.add_document("https://www.sanofi.com/news/csu", PAGE)
+    assert store.link_rows([row(), row(url="https://elsewhere.example.com")], run_id="run-1") == 1
+    assert store.link_rows([row()], run_id="run-2") == 1
+    [link] = store.evidence(signature=row_signature(row()))
+    assert link["run_id"] == "run-1" and store.summary()["evidence_links"] == 1
+
+    statements = []
+    store._conn.set_trace_callback(statements.append)
+    assert store.link_rows([row(url="https://elsewhere.example.com")]) == 0
+    assert not any("BEGIN" in statement for statement in statements)
+
+
+def test_duplicate_links_of_an_older_store_are_removed(tmp_path):
+    store = ProvenanceStore(str(tmp_path))
+    store.add_document("https://www.sanofi.com/news/csu", PAGE)
+    store.link_rows([row()], run_id="run-1")
+    with sqlite3.connect(str(tmp_path / "provenance.db")) as conn:
+        conn.execute("DROP INDEX idx_evidence_unique")
+        conn.execute("INSERT INTO evidence (row_signature, run_id, document_id, byte_start, byte_end, matched_terms) "
+                     "SELECT row_signature, 'run-2', document_id, byte_start, byte_end, matched_terms FROM evidence")
+    assert ProvenanceStore(str(tmp_path)).summary()["evidence_links"] == 1
@@ -0,0 +1,84 @@
+import threading
+
+import pytest
+
+from query_planner import QUERY_PATTERNS, QueryPlanner, plan_agent_queries
+from research_engine import PROFILES, DrugResearchInput, build_research_team, planner_calls
+from fake_backends import fake_model_factory, fake_toolkit_factory
+
+DEEP_PROVIDERS = ["local_index", "tavily", "exa", "scraping", "pdf", "duckduckgo"]
+
+
+@pytest.fixture
+def research_input():
+    return DrugResearchInput(drug_name="Dupixent", generic_name="dupilumab", manufacturer="Sanofi",
+                             target_month="October", target_year="2025")
+
+
+def test_every_pattern_runs_before_any_second_provider(research_input):
+    planned = plan_agent_queries(research_input, "regulatory", "regulatory", DEEP_PROVIDERS, max_calls=8)
+    patterns = [query.pattern for query in planned]
+    assert patterns[:len(QUERY_PATTERNS)] == [pattern for pattern, _, _ in QUERY_PATTERNS]
+    # The remaining budget goes to second providers, highest priority pattern first
+    assert (planned[-1].pattern, planned[-1].provider) == ("event", "exa")
+
+
+def test_a_small_budget_keeps_the_highest_priority_patterns(research_input):
+    planned = plan_agent_queries(research_input, "safety", "safety", DEEP_PROVIDERS, max_calls=3)
+    assert [(query.pattern, query.provider) for query in planned] == [
+        ("event", "tavily"), ("fda", "tavily"), ("company", "tavily")]
+
+
+def test_patterns_without_their_fields_are_left_out(research_input):
+    research_input.generic_name = None
+    planned = plan_agent_queries(research_input, "safety", "safety", ["tavily"], max_calls=20)
+    assert "generic" not in {query.pattern for query in planned}
+    assert {query.provider for query in planned} == {"tavily"}
+    assert len(planned) == len(QUERY_PATTERNS) - 1
+
+
+def test_queries_planned_by_several_agents_are_searched_once(research_input):
+    calls = []
+
+    class Toolkit:
+        tools = []
+
+        def web_search_using_tavily(self, query, max_results=5):
+            calls.append(query)
+            return '[{"url": "https://fda.example.com/%d", "title": "Dupixent", "content": ""}]' % len(calls)
+
+    planner = QueryPlanner({"tavily": Toolkit()}, max_calls=3)
+    bundles = planner.prefetch(research_input, [("regulatory", "regulatory"), ("unknown", "news")])
+    assert len(calls) == len(set(calls)) == planner.stats["executed"]
+    assert planner.stats["planned"] == 6 and planner.stats["executed"] < 6
+    assert all(bundles[key] for key in ("regulatory", "unknown"))
+
+
+def test_an_agent_gets_its_bundle_without_waiting_for_other_agents_searches(research_input):
+    release = threading.Event()
+
+    class Toolkit:
+        tools = []
+
+        def web_search_using_tavily(self, query, max_results=5):
+            # The safety agent's searches hang until released
+            if "safety warning" in query:
+                assert release.wait(timeout=5)
+            return '[{"url": "https://fda.example.com/%d", "title": "Dupixent", "content": ""}]' % hash(query)
+
+    with QueryPlanner({"tavily": Toolkit()}, max_calls=2) as planner:
+        planner.plan(research_input, [("safety", "safety"), ("regulatory", "regulatory")])
+        blocked = threading.Thread(target=planner.fetch, args=("safety",))
+        blocked.start()
+        assert len(planner.fetch("regulatory")) == 2
+        release.set()
+        blocked.join()
+    # The site:fda.gov search both agents planned ran once
+    assert planner.stats["executed"] == 3
+
+
+def test_fast_profile_planned_searches_come_out_of_the_agent_budget():
+    fast = PROFILES["fast"]
+    team = build_research_team(fast, model_factory=fake_model_factory(), toolkit_factory=fake_toolkit_factory())
+    assert planner_calls(fast) == fast.tool_call_limit // 2
+    assert all(agent.tool_call_limit + planner_calls(fast) == fast.tool_call_limit for agent in team.agents.values())
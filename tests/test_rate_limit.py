@@ -0,0 +1,70 @@
+import multiprocessing
+from types import SimpleNamespace
+
+import pytest
+
+import rate_limit
+from rate_limit import RateLimitStore, TokenBucket, limit_burst, parse_limit
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A frozen clock for the buckets; advance it with ``clock.now += seconds``"""
+    clock = SimpleNamespace(now=1000.0, slept=[])
+    monkeypatch.setattr(rate_limit, "time", SimpleNamespace(time=lambda: clock.now, sleep=clock.slept.append))
+    return clock
+
+
+def reserve_one(path):
+    return RateLimitStore(path).reserve("tavily:default", rate=0.01, burst=2)
+
+
+@pytest.mark.parametrize("limit, rate, burst", [("100/min", 100 / 60, 100), ("20/min", 1 / 3, 20),
+                                                ("5/s", 5, 5), ("2000/h", 2000 / 3600, 2000 / 60)])
+def test_limits_and_default_bursts(limit, rate, burst):
+    assert parse_limit(limit) == pytest.approx(rate)
+    assert limit_burst(limit) == pytest.approx(burst)
+    assert parse_limit("off") is None and limit_burst("off") is None
+
+
+def test_idle_per_minute_quota_serves_a_burst_without_waiting(clock):
+    bucket = TokenBucket("duckduckgo:default", parse_limit("20/min"), limit_burst("20/min"),
+                         store=RateLimitStore(":memory:"))
+    assert [bucket.acquire() for _ in range(20)] == [0.0] * 20
+    # Then calls queue behind each other at the refill rate
+    assert bucket.acquire() == pytest.approx(3.0)
+    assert bucket.acquire() == pytest.approx(6.0)
+    assert clock.slept == [pytest.approx(3.0), pytest.approx(6.0)]
+    assert bucket.stats['waits'] == 2 and bucket.stats['acquired'] == 22
+
+
+def test_bucket_refills_at_the_rate_up_to_the_burst(clock):
+    bucket = TokenBucket("tavily:default", rate=1.0, burst=3, store=RateLimitStore(":memory:"))
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+    clock.now += 2
+    assert [bucket.try_acquire() for _ in range(3)] == [True, True, False]
+    # A long idle period refills no more than the burst
+    clock.now += 3600
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+    assert bucket.stats['rejected'] == 3
+
+
+def test_max_wait_rejects_without_taking_a_token(clock):
+    bucket = TokenBucket("exa:default", rate=1.0, burst=1, store=RateLimitStore(":memory:"))
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire(max_wait=0.5) is None
+    assert bucket.acquire(max_wait=1.0) == pytest.approx(1.0)
+    assert clock.slept == [pytest.approx(1.0)]
+    [metrics] = bucket.store.metrics()
+    assert (metrics['acquired'], metrics['rejected']) == (2, 1)
+
+
+def test_processes_queue_on_one_shared_bucket(tmp_path):
+    path = str(tmp_path / "rate_limits.db")
+    RateLimitStore(path)
+    with multiprocessing.get_context("spawn").Pool(5) as pool:
+        waits = pool.map(reserve_one, [path] * 5)
+    # Two calls use the burst, the others each wait one more refill (100 s) than the previous one
+    assert sorted(round(wait, -1) for wait in waits) == [0, 0, 100, 200, 300]
+    [metrics] = RateLimitStore(path).metrics()
+    assert (metrics['acquired'], metrics['waits']) == (5, 3)
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from relevance import RelevanceFilter, rank_candidates
+from research_engine import DrugResearchInput
+from tool_hooks import agent_scope, research_scope
+
+FILLER = ("the company said in a statement that patients and physicians would see changes in the coming "
+          "months according to analysts who follow the sector closely")
+
+
+@pytest.fixture
+def research_input():
+    return DrugResearchInput(drug_name="Dupixent", generic_name="dupilumab", manufacturer="Sanofi",
+                             therapeutic_area="Dermatology", target_month="October", target_year="2025")
+
+
+def hits(*titles):
+    return [{"title": title, "url": f"https://example.com/{i}", "content": FILLER, "published_date": ""}
+            for i, title in enumerate(titles)]
+
+
+def test_on_target_hit_without_manufacturer_or_period_is_kept(research_input):
+    ranked = rank_candidates(hits("Dupixent label update", "Stock market news"), research_input)
+    assert [c["title"] for _, c in ranked] == ["Dupixent label update"]
+
+
+def test_generic_name_and_manufacturer_hits_are_kept(research_input):
+    ranked = rank_candidates(hits("Dupilumab study results", "Sanofi Q3 2025 earnings"), research_input)
+    assert {c["title"] for _, c in ranked} == {"Dupilumab study results", "Sanofi Q3 2025 earnings"}
+
+
+def test_hits_naming_neither_drug_nor_maker_are_dropped(research_input):
+    assert rank_candidates(hits("Weather in October 2025", "Dermatology clinic opens"), research_input) == []
+
+
+def test_scores_are_capped_and_ordered(research_input):
+    ranked = rank_candidates(hits("Dupixent Sanofi October 2025 Dupixent dupilumab", "Dupixent label update"),
+                             research_input)
+    scores = [score for score, _ in ranked]
+    assert scores == sorted(scores, reverse=True)
+    assert all(0 < score <= 1.0 for score in scores)
+
+
+def test_competitive_intel_searches_are_not_ranked(research_input):
+    relevance_filter = RelevanceFilter()
+    output = json.dumps(hits("Rinvoq approved for atopic dermatitis", "Ebglyss launch"))
+    with research_scope(research_input):
+        assert "No sufficiently relevant results" in relevance_filter.filter_output(output)
+        with agent_scope("competitive_intel"):
+            assert relevance_filter.filter_output(output) == output
+        # A search planned by several agents is not ranked if one of them is exempt
+        with agent_scope("regulatory", "competitive_intel"):
+            assert relevance_filter.filter_output(output) == output
+    assert relevance_filter.stats["unranked"] == 4
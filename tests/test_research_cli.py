@@ -0,0 +1,32 @@
+import json
+
+from research_cli import main, read_inputs
+from research_schema import TABLE_COLUMNS
+
+INPUT = {"drug_name": "Dupixent", "manufacturer": "Sanofi", "target_month": "October", "target_year": "2025"}
+
+
+def test_read_inputs_reports_invalid_lines():
+    lines = ["# comment", "", json.dumps({"id": "dup", **INPUT}), "not json", json.dumps({"drug_name": "X"}), "[1]"]
+    inputs, invalid = read_inputs(lines)
+    assert [(record_id, item.drug_name) for record_id, item in inputs] == [("dup", "Dupixent")]
+    assert [(event["line"], event["status"]) for event in invalid] == [(4, "invalid"), (5, "invalid"), (6, "invalid")]
+
+
+def test_fake_batch_streams_row_run_and_batch_events(tmp_path, capsys):
+    path = tmp_path / "inputs.jsonl"
+    path.write_text("\n".join([json.dumps({"id": "dup", **INPUT}), "{broken"]) + "\n", encoding="utf-8")
+
+    assert main([str(path), "--profile", "fast", "--fake", "--runs", "2"]) == 1  # one invalid line
+
+    out = capsys.readouterr().out
+    # stdout only carries JSON lines, the workflow progress goes to stderr
+    events = [json.loads(line) for line in out.splitlines()]
+    assert events[0]["type"] == "run" and events[0]["status"] == "invalid"
+    rows = [event for event in events if event["type"] == "row"]
+    run = next(event for event in events if event["type"] == "run" and event["id"] == "dup")
+    assert run["status"] == "ok" and run["rows"] == len(rows) > 0
+    assert all(event["id"] == "dup" and event["run_id"] == run["run_id"] for event in rows)
+    assert set(rows[0]["row"]) == set(TABLE_COLUMNS)
+    assert events[-1] == {**events[-1], "type": "batch", "runs": 1, "ok": 1, "failed": 0, "invalid": 1,
+                          "rows": len(rows)}
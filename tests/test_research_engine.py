@@ -0,0 +1,124 @@
+import asyncio
+import csv
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from agent_yield import DOWNGRADE, FULL, YieldHistory
+from fake_backends import fake_model_factory, fake_toolkit_factory
+from research_engine import (
+    DrugResearchInput, InputDrivenDrugResearchWorkflow, build_research_team, clean_table_data, collect_agent_output,
+    findings_to_rows, render_structured_table,
+)
+from research_schema import TABLE_COLUMNS, ResearchFinding, ResearchFindings
+from run_report import RUN_REPORT_FILE
+
+
+@pytest.fixture
+def fast_team():
+    return build_research_team("fast", model_factory=fake_model_factory(latency=0.05, seed=0),
+                               toolkit_factory=fake_toolkit_factory(latency=0.01, seed=0))
+
+
+def research_input(drug_name, manufacturer):
+    return DrugResearchInput(drug_name=drug_name, manufacturer=manufacturer, target_month="October",
+                             target_year="2025")
+
+
+def test_concurrent_served_runs_keep_their_own_state(fast_team):
+    workflow = InputDrivenDrugResearchWorkflow(team=fast_team)
+    inputs = [research_input("Alpha", "Acme"), research_input("Beta", "Bolt"), research_input("Gamma", "Core")]
+
+    async def serve_all():
+        return await asyncio.gather(*(workflow._serve(SimpleNamespace(input=item)) for item in inputs))
+
+    asyncio.run(serve_all())
+
+    reports = [json.loads(path.read_text(encoding="utf-8"))
+               for path in sorted(Path("agent_outputs").glob(f"*/{RUN_REPORT_FILE}"))]
+    assert sorted(report["research_input"]["drug_name"] for report in reports) == ["Alpha", "Beta", "Gamma"]
+    for report in reports:
+        # Each report is written to its own run directory, named after its own drug
+        assert report["run_id"].startswith(f"{report['research_input']['drug_name']}_")
+        assert "Market Research" in report["phases"]
+    assert len({report["run_id"] for report in reports}) == 3
+
+
+def test_last_run_results_are_exposed_on_the_workflow(fast_team):
+    workflow = InputDrivenDrugResearchWorkflow(team=fast_team)
+    workflow.run(research_input("Dupixent", "Sanofi"))
+    assert workflow.run_report.research_input["drug_name"] == "Dupixent"
+    assert workflow.output_dir == workflow.last_run.output_dir
+    assert workflow.final_rows and "Output" in workflow.phase_timings
+
+
+def test_rows_found_by_several_agents_are_credited_to_each(fast_team):
+    # Every fake model has the same seed, so all three agents answer with the same rows
+    history = YieldHistory(":memory:", min_history=1)
+    workflow = InputDrivenDrugResearchWorkflow(team=fast_team, economy=True, yield_history=history)
+    workflow.run(research_input("Dupixent", "Sanofi"))
+
+    phases = workflow.run_report.phases
+    assert [phases[name]["rows_kept"] for name in ("Market Research", "Regulatory Analysis", "Safety Monitoring")] == [3, 0, 0]
+    for agent in ("market_research", "regulatory", "safety"):
+        assert history.recent("Dupixent", agent, 1) == [(FULL, 1.0)]
+        # A shared row does not make the later agents look unproductive
+        assert history.decide("Dupixent", agent) == (DOWNGRADE, "expected yield 1.0 rows")
+
+
+def test_each_agent_starts_after_its_own_planned_searches(fast_team):
+    workflow = InputDrivenDrugResearchWorkflow(team=fast_team)
+    workflow.run(research_input("Dupixent", "Sanofi"))
+
+    stages = {stage["name"]: stage for stage in workflow.run_report.graph["stages"]}
+    for name in ("Market Research", "Regulatory Analysis", "Safety Monitoring"):
+        assert stages[name]["deps"] == [f"{name} Plan"]
+        assert stages[f"{name} Plan"]["deps"] == []
+        assert f"{name} Plan" in workflow.run_report.phases
+    assert workflow.run_report.rows["query_planner"]["agents"] == 3
+
+
+def test_queued_agents_do_not_run_after_a_stage_fails(fast_team, monkeypatch):
+    def fail(*args, **kwargs):
+        raise ValueError("unparseable output")
+
+    # The first agent's output fails to parse while the others wait for the single Phase 1 slot
+    monkeypatch.setattr("research_engine.collect_agent_output", fail)
+    workflow = InputDrivenDrugResearchWorkflow(team=fast_team)
+    with pytest.raises(ValueError):
+        workflow.run(research_input("Dupixent", "Sanofi"))
+    # The agent that took the slot as the first one finished still completes; the last never starts
+    assert sum(bool(agent.model.prompt_sizes) for agent in fast_team.agents.values()) < 3
+
+
+def finding_row(sub_category, url):
+    return ["Marketed Assets", sub_category, "2025-10-15", "Dupixent", "dupilumab", "Sanofi", "Atopic dermatitis",
+            "Summary", "Description, with a comma", "US", "None", "Adults", url]
+
+
+def test_structured_output_gives_the_rows_of_the_markdown_path():
+    rows = [finding_row("Label Updates", "https://www.fda.gov/a"), finding_row("Safety Concern", "https://www.fda.gov/b")]
+    markdown = "\n".join("| " + " | ".join(row) + " |" for row in rows)
+    structured = ResearchFindings(findings=[ResearchFinding.from_row(row) for row in rows])
+
+    text, structured_rows = collect_agent_output(SimpleNamespace(content=structured))
+    _, markdown_rows = collect_agent_output(SimpleNamespace(content=markdown))
+
+    assert structured_rows == markdown_rows == findings_to_rows(structured)
+    # Later agents get the structured rows as compact table rows, which parse back to the same rows
+    assert clean_table_data(text) == structured_rows
+
+
+def test_structured_rows_are_written_to_the_csv_in_column_order():
+    rows = findings_to_rows(ResearchFindings(findings=[ResearchFinding.from_row(finding_row("Label Updates", "https://www.fda.gov/a"))]))
+
+    render_structured_table(rows, research_input("Dupixent", "Sanofi"))
+
+    (csv_path,) = Path(".").glob("Dupixent_Sanofi_*.csv")
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        header, *written = list(csv.reader(f))
+    assert header == TABLE_COLUMNS
+    assert written == rows
+    assert dict(zip(header, written[0]))["URL"] == "https://www.fda.gov/a"
@@ -0,0 +1,24 @@
+from research_schema import FINDING_FIELDS, TABLE_COLUMNS, ResearchFinding, ResearchFindings, row_to_dict
+
+ROW = ["Marketed Assets", "Label Updates", "2025-10-15", "Dupixent", "dupilumab", "Sanofi", "Atopic dermatitis",
+       "Label expanded", "The label was expanded to adolescents.", "US", "No competitive implication stated.",
+       "Adolescents aged 12-17", "https://www.fda.gov/dupixent"]
+
+
+def test_finding_fields_follow_the_table_columns():
+    assert FINDING_FIELDS == [column.lower().replace(" ", "_") for column in TABLE_COLUMNS]
+
+
+def test_finding_round_trips_through_a_row():
+    finding = ResearchFinding.from_row(ROW)
+    assert finding.url == ROW[-1]
+    assert finding.development_summary == "Label expanded"
+    assert finding.to_row() == ROW
+    assert row_to_dict(finding.to_row())["URL"] == ROW[-1]
+
+
+def test_findings_round_trip_through_json():
+    findings = ResearchFindings(findings=[ResearchFinding.from_row(ROW), ResearchFinding.from_row(ROW[:12] + ["Not Available"])])
+    parsed = ResearchFindings.model_validate_json(findings.model_dump_json())
+    assert [finding.to_row() for finding in parsed.findings] == [ROW, ROW[:12] + ["Not Available"]]
+    assert ResearchFindings.model_validate_json('{"findings": []}').findings == []
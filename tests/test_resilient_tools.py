@@ -0,0 +1,68 @@
+import time
+
+from fake_backends import FakeProvider
+from resilient_tools import CircuitBreaker, ProviderGuard
+
+
+def open_breaker(guard: ProviderGuard):
+    for _ in range(guard.breaker.failure_threshold):
+        guard.breaker.record_failure()
+    assert guard.breaker.state == CircuitBreaker.OPEN
+
+
+def test_failure_falls_back_to_alternate():
+    primary = ProviderGuard("tavily", timeout=1.0)
+    alternate = ProviderGuard("exa", timeout=1.0)
+    failing, backup = FakeProvider("tavily", latency=0.0, error_rate=1.0), FakeProvider("exa", latency=0.0)
+
+    result = primary.call(failing.search, "dupixent", alternate=(alternate, backup.search))
+
+    assert "exa.example.com" in result
+    assert primary.stats["failures"] == 1 and primary.stats["hedges"] == 1
+
+
+def test_deadline_counts_as_failure_and_opens_breaker():
+    guard = ProviderGuard("tavily", timeout=0.05, failure_threshold=1, reset_timeout=60.0)
+    slow = FakeProvider("tavily", latency=0.3)
+
+    result = guard.call(slow.search, "dupixent")
+
+    assert result.startswith("Error: tavily did not respond")
+    assert guard.stats["timeouts"] == 1
+    assert guard.breaker.state == CircuitBreaker.OPEN
+    assert "circuit open" in guard.call(slow.search, "dupixent")
+
+
+def test_half_open_trial_that_loses_a_hedge_releases_the_breaker():
+    primary = ProviderGuard("tavily", timeout=2.0, failure_threshold=1, reset_timeout=0.05,
+                            hedging=True, min_hedge_samples=1)
+    primary.latencies.extend([0.01] * 5)
+    alternate = ProviderGuard("exa", timeout=2.0)
+    slow, fast, backup = (FakeProvider("tavily", latency=0.5), FakeProvider("tavily", latency=0.0),
+                          FakeProvider("exa", latency=0.0))
+    open_breaker(primary)
+    time.sleep(0.06)
+
+    # The slow primary is the half-open trial; the hedge to the alternate wins
+    result = primary.call(slow.search, "dupixent", alternate=(alternate, backup.search))
+    assert "exa.example.com" in result
+    assert primary.stats["hedge_wins"] == 1
+
+    # Losing the hedge is neutral: the next call becomes the trial instead of being short-circuited
+    result = primary.call(fast.search, "dupixent")
+    assert "tavily.example.com" in result
+    assert fast.calls == 1
+    assert primary.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_failed_trial_reopens_breaker():
+    guard = ProviderGuard("tavily", timeout=1.0, failure_threshold=1, reset_timeout=0.05)
+    failing = FakeProvider("tavily", latency=0.0, error_rate=1.0)
+    open_breaker(guard)
+    time.sleep(0.06)
+
+    guard.call(failing.search, "dupixent")
+    time.sleep(0.01)
+
+    assert guard.breaker.state == CircuitBreaker.OPEN
+    assert failing.calls == 1
@@ -0,0 +1,75 @@
+import pytest
+
+from research_engine import DrugResearchInput, clean_table_data
+from research_schema import TABLE_COLUMNS
+from row_repair import CATEGORY, RowRepairer, deterministic_fix, row_problems
+
+HEADER = "| " + " | ".join(TABLE_COLUMNS) + " |"
+
+
+@pytest.fixture
+def research_input():
+    return DrugResearchInput(drug_name="Dupixent", manufacturer="Sanofi", target_month="October", target_year="2025")
+
+
+def row(date="2025-10-15", sub_category="Label Updates", url="https://fda.example.com/dupixent"):
+    return [CATEGORY, sub_category, date, "Dupixent", "dupilumab", "Sanofi", "Atopic dermatitis", "Summary",
+            "Description", "US", "None", "Adults", url]
+
+
+def markdown(*rows):
+    return "\n".join("| " + " | ".join(cells) + " |" for cells in rows)
+
+
+def test_short_rows_of_a_findings_table_go_to_repair():
+    malformed = []
+    content = "\n".join([HEADER, "|" + "---|" * len(TABLE_COLUMNS), markdown(row(), row()[:8])])
+    assert clean_table_data(content, malformed) == [row()]
+    assert malformed == [row()[:8]]
+
+
+def test_rows_of_other_tables_are_not_sent_to_repair():
+    malformed = []
+    content = "\n".join([
+        "| Metric | Value |", "|---|---|", "| Rows | 12 |",
+        "Some text",
+        markdown(row()[:8]),  # No findings header before it
+        HEADER, markdown(row()),
+        "End of table",
+        markdown(row()[:5]),
+    ])
+    assert clean_table_data(content, malformed) == [row()]
+    assert malformed == []
+
+
+def test_deterministic_fixes(research_input):
+    fixed = deterministic_fix(["marketed", "FDA approval", "October 15, 2025", *row()[3:12]])
+    assert fixed == row(sub_category="Label Updates", url="Not Available")
+    assert row_problems(fixed, {(2025, 10)}) == []
+
+
+def test_out_of_period_rows_are_excluded_not_repaired(research_input):
+    prompts = []
+    repairer = RowRepairer(repair_fn=lambda prompt: prompts.append(prompt) or [])
+    assert repairer.repair([row(), row(date="2025-09-02")], research_input) == [row()]
+    assert repairer.stats["out_of_period"] == 1
+    assert prompts == []
+
+
+def test_model_repair_prompt_forbids_made_up_dates(research_input):
+    prompts = []
+    repaired = row(date="2025-10-01")
+
+    def repair_fn(prompt):
+        prompts.append(prompt)
+        # A row the model dated outside the period is still dropped
+        return [repaired, row(date="2025-11-01")]
+
+    repairer = RowRepairer(repair_fn=repair_fn)
+    kept = repairer.repair([row(date="Not Available"), row(date="sometime")], research_input)
+
+    assert kept == [repaired]
+    assert repairer.stats == {"rows": 2, "valid": 0, "fixed_deterministic": 0, "fixed_by_model": 1,
+                              "out_of_period": 0, "dropped": 1}
+    assert "never make up a date" in prompts[0]
+    assert "omit the row" in prompts[0]
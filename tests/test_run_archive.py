@@ -0,0 +1,37 @@
+from research_engine import DrugResearchInput
+from run_archive import MarkdownOutputs, RunArchive, output_writer, pack_directory
+
+
+def research_input():
+    return DrugResearchInput(drug_name="Dupixent", manufacturer="Sanofi", target_month="October", target_year="2025")
+
+
+def test_archive_round_trips_to_the_markdown_layout(tmp_path):
+    archive_dir, markdown_dir = tmp_path / "archive", tmp_path / "markdown"
+    archive_dir.mkdir()
+    markdown_dir.mkdir()
+    outputs = {"market_research_output.md": "| Date | Finding |\n| 2025-10-01 | Ünïcode row |",
+               "safety_output.md": "No new safety signals"}
+    for writer in (output_writer(archive_dir, research_input()), output_writer(markdown_dir, research_input(), "markdown")):
+        for name, content in outputs.items():
+            writer.save(name, "Market Research", "Findings", content)
+    assert isinstance(output_writer(markdown_dir, research_input(), "markdown"), MarkdownOutputs)
+
+    # Reopened from disk, the archive gives back the raw outputs and the exact loose-file documents
+    archive = RunArchive(archive_dir)
+    assert archive.names() == list(outputs)
+    for name, content in outputs.items():
+        assert archive.content(name) == content
+        assert archive.document(name) == (markdown_dir / name).read_text(encoding="utf-8")
+    exported = archive.export(tmp_path / "exported")
+    assert [path.read_text(encoding="utf-8") for path in exported] == \
+        [(markdown_dir / name).read_text(encoding="utf-8") for name in outputs]
+
+
+def test_pack_directory_moves_loose_outputs_into_the_archive(tmp_path):
+    (tmp_path / "regulatory_output.md").write_text("# Regulatory\nlegacy run", encoding="utf-8")
+    assert pack_directory(tmp_path, remove=True) == 1
+    assert not (tmp_path / "regulatory_output.md").exists()
+    # Legacy files are stored verbatim
+    assert RunArchive(tmp_path).document("regulatory_output.md") == "# Regulatory\nlegacy run"
+    assert pack_directory(tmp_path) == 0
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from fake_backends import FakeProvider, FakeToolkit
+from research_engine import DrugResearchInput
+from search_index import SearchIndex, SearchIndexTools, index_toolkit
+from tool_hooks import research_scope
+
+
+@pytest.fixture
+def index():
+    return SearchIndex("research_cache/search_index.db")
+
+
+@pytest.fixture
+def research_input():
+    return DrugResearchInput(drug_name="Dupixent", manufacturer="Sanofi", target_month="October", target_year="2025")
+
+
+def test_longer_content_replaces_a_snippet_and_pages_stay_pages(index):
+    index.add("https://a.example.com", "Dupixent approval", "Short snippet.", kind="search")
+    index.add("https://a.example.com", "", "The full page text about the Dupixent approval.", kind="page")
+    index.add("https://a.example.com", "", "Snippet again.", kind="search")
+
+    assert index.get_content("https://a.example.com") == "The full page text about the Dupixent approval."
+    (hit,) = index.search("dupixent approval")
+    assert (hit["title"], hit["kind"]) == ("Dupixent approval", "page")
+    assert index.get_content("https://missing.example.com") is None
+
+
+def test_title_matches_rank_first_and_drug_filter_ignores_case(index, research_input):
+    index.add("https://body.example.com", "Quarterly results", "Label update for dupixent in adults.")
+    with research_scope(research_input):
+        index.add("https://title.example.com", "Dupixent label update", "The FDA updated the label.")
+
+    assert [hit["url"] for hit in index.search("Dupixent label")] == ["https://title.example.com", "https://body.example.com"]
+    (hit,) = index.search("label", drug="dupixent")
+    assert (hit["url"], hit["drug"], hit["period"]) == ("https://title.example.com", "Dupixent", "October 2025")
+
+
+def test_queries_without_terms_and_fts_syntax_are_safe(index):
+    index.add("https://a.example.com", "Dupixent", "Approved in October.")
+    assert index.search("") == []
+    assert index.search("a - ?") == []
+    assert len(index.search('dupixent AND "october" NEAR(')) == 1
+
+
+def test_index_toolkit_ingests_search_hits_and_pages(index, research_input):
+    search = index_toolkit(FakeToolkit("tavily", FakeProvider("tavily", latency=0)), index, source="tavily")
+    scrape = index_toolkit(FakeToolkit("scraping", FakeProvider("scraping", latency=0)), index, source="scraping", kind="page")
+
+    with research_scope(research_input):
+        output = search.tools[0]("Dupixent approval", max_results=2)
+        scrape.tools[0]("https://news.example.com/dupixent")
+
+    assert [hit["url"] for hit in json.loads(output)] == [hit["url"] for hit in index.search("Snippet", drug="Dupixent")]
+    assert index.get_content("https://news.example.com/dupixent").startswith("Extracted text of")
+    assert index.stats["ingested"] == 3
+
+
+def test_index_tool_reports_an_empty_index_and_returns_json_hits(index):
+    tools = SearchIndexTools(index)
+    assert tools.search_local_index("dupixent").startswith("No documents found")
+    index.add("https://a.example.com", "Dupixent approval", "Approved.")
+    (hit,) = json.loads(tools.search_local_index("dupixent approval", max_results=5))
+    assert hit["url"] == "https://a.example.com"
+    assert index.stats == {"ingested": 1, "queries": 2, "hits": 1}
@@ -0,0 +1,69 @@
+import pytest
+
+from research_engine import DrugResearchInput
+from row_repair import CATEGORY
+from validation_cache import CONFIRMED, UNCONFIRMED, IncrementalValidator, VerdictStore, row_hash
+
+
+def research_input(drug_name="Dupixent", manufacturer="Sanofi", month="October"):
+    return DrugResearchInput(drug_name=drug_name, manufacturer=manufacturer, target_month=month, target_year="2025")
+
+
+def row(summary, url):
+    return [CATEGORY, "Label Updates", "2025-10-15", "Dupixent", "dupilumab", "Sanofi", "Atopic dermatitis",
+            summary, "Description", "US", "None", "Adults", url]
+
+
+CONFIRMED_ROW = row("Label update", "https://fda.example.com/dupixent")
+UNCONFIRMED_ROW = row("Rumoured approval", "https://blog.example.com/rumour")
+
+
+class FakeValidationAgent:
+    """Re-emits (confirms) the rows whose URL is in ``confirm`` and counts the rows it was sent"""
+
+    def __init__(self, confirm):
+        self.confirm = confirm
+        self.sent = 0
+
+    def __call__(self, prompt):
+        self.sent += prompt.count("| Marketed Assets")
+        return [r for r in (CONFIRMED_ROW, UNCONFIRMED_ROW) if r[-1] in self.confirm and r[-1] in prompt]
+
+
+@pytest.fixture
+def store():
+    return VerdictStore(":memory:")
+
+
+def test_verdicts_are_reused_across_runs(store):
+    agent = FakeValidationAgent({CONFIRMED_ROW[-1]})
+    first = IncrementalValidator(agent, store=store).validate([CONFIRMED_ROW, UNCONFIRMED_ROW], research_input())
+    assert first == [CONFIRMED_ROW] and agent.sent == 2
+
+    again = IncrementalValidator(agent, store=store)
+    # Whitespace and case changes normalise to the same row
+    assert again.validate([[value.upper() for value in CONFIRMED_ROW], UNCONFIRMED_ROW], research_input()) == [CONFIRMED_ROW]
+    assert agent.sent == 2
+    assert again.stats["cached_confirmed"] == 1 and again.stats["cached_unconfirmed"] == 1
+
+
+@pytest.mark.parametrize("other", [research_input(drug_name="Kevzara"), research_input(manufacturer="Regeneron"),
+                                   research_input(month="November")])
+def test_verdicts_do_not_carry_over_to_other_research(store, other):
+    agent = FakeValidationAgent({CONFIRMED_ROW[-1]})
+    IncrementalValidator(agent, store=store).validate([CONFIRMED_ROW], research_input())
+    assert row_hash(CONFIRMED_ROW, other) != row_hash(CONFIRMED_ROW, research_input())
+    IncrementalValidator(agent, store=store).validate([CONFIRMED_ROW], other)
+    assert agent.sent == 2
+
+
+def test_failed_batches_are_not_cached(store):
+    def failing(prompt):
+        raise RuntimeError("model unavailable")
+
+    assert IncrementalValidator(failing, store=store).validate([CONFIRMED_ROW], research_input()) == []
+    assert store.lookup([row_hash(CONFIRMED_ROW, research_input())]) == {}
+    store.record([(row_hash(CONFIRMED_ROW, research_input()), CONFIRMED, CONFIRMED_ROW),
+                  (row_hash(UNCONFIRMED_ROW, research_input()), UNCONFIRMED, None)], drug="Dupixent")
+    assert {verdict for verdict, _ in store.lookup([row_hash(r, research_input())
+                                                    for r in (CONFIRMED_ROW, UNCONFIRMED_ROW)]).values()} == {CONFIRMED, UNCONFIRMED}
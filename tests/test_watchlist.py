@@ -0,0 +1,56 @@
+import io
+import json
+import re
+from datetime import date
+from types import SimpleNamespace
+
+from fake_backends import fake_model_factory, fake_toolkit_factory
+from research_cli import JsonlWriter
+from research_engine import build_research_team
+from row_repair import CATEGORY
+from watchlist import SeenUrls, Watcher
+
+
+def test_seen_urls_are_keyed_by_drug_and_canonical_url(tmp_path):
+    seen = SeenUrls(str(tmp_path / "seen.bloom"), capacity=1000, error_rate=0.01)
+    assert seen.add("Dupixent", "https://www.fda.gov/label?utm_source=x")
+    assert ("dupixent", "https://www.fda.gov/label") in seen
+    assert not seen.add("Dupixent", "https://www.fda.gov/label")
+    # The same document is still new for another watched drug
+    assert ("Kevzara", "https://www.fda.gov/label") not in seen
+
+    seen.save()
+    reloaded = SeenUrls(str(tmp_path / "seen.bloom"), capacity=10 ** 6)
+    assert ("Dupixent", "https://www.fda.gov/label") in reloaded
+    assert (reloaded.bits, reloaded.count) == (seen.bits, 1)
+    assert reloaded.false_positive_rate() < 0.01
+
+
+class ReviewAgent:
+    """Reports one finding from the first new document and one from a page it searched itself"""
+
+    def run(self, query):
+        today = date.today().isoformat()
+        document = re.search(r'https://[^\s)\]]+', query.split("NEW since the last check")[1]).group(0)
+        rows = [[CATEGORY, "Safety Concern", today, "Dupixent", "dupilumab", "Sanofi", "Atopic dermatitis",
+                 "Summary", "Description", "US", "None", "Adults", url]
+                for url in (document, "https://elsewhere.example.com/older-news")]
+        return SimpleNamespace(content="\n".join("| " + " | ".join(row) + " |" for row in rows))
+
+
+def test_only_findings_from_new_documents_are_alerted(tmp_path):
+    team = build_research_team("fast", model_factory=fake_model_factory(latency=0),
+                               toolkit_factory=fake_toolkit_factory(latency=0))
+    team.agents = {"regulatory": ReviewAgent()}
+    stream = io.StringIO()
+    watcher = Watcher(team, SeenUrls(str(tmp_path / "seen.bloom"), capacity=1000), JsonlWriter(stream))
+    watched = [("dupixent", {"drug_name": "Dupixent", "manufacturer": "Sanofi"})]
+
+    first = watcher.poll(watched)
+    assert first["new_documents"] > 0 and first["alerts"] == 1
+    alerts = [event for event in map(json.loads, stream.getvalue().splitlines()) if event["type"] == "alert"]
+    assert "elsewhere.example.com" not in alerts[0]["row"]["URL"]
+
+    # Every document was seen in the first cycle
+    second = watcher.poll(watched)
+    assert second["new_documents"] == 0 and second["alerts"] == 0
@@ -0,0 +1,56 @@
+import threading
+import time
+
+import pytest
+
+from workflow_graph import DONE, SKIPPED, StageGraph
+
+
+def test_stages_start_when_their_dependencies_finish():
+    graph = StageGraph("run", workers=2)
+    graph.add("plan", lambda inputs: [1, 2])
+    graph.add("search", None, deps=("plan",), kind="agent")
+    graph.add("parse", lambda inputs: inputs["search"] + ["parsed"], deps=("search",))
+    graph.add("analysis", lambda inputs: len(inputs["plan"]), deps=("plan",))
+    graph.add("output", lambda inputs: (inputs["parse"], inputs["analysis"]), deps=("parse", "analysis"))
+
+    # The external stage is completed from another thread, like the Phase 1 scheduler does
+    def scheduler():
+        while graph.stages["search"].started is None:
+            time.sleep(0.01)
+        time.sleep(0.05)
+        graph.complete("search", ["row"])
+
+    thread = threading.Thread(target=scheduler)
+    thread.start()
+    results = graph.run()
+    thread.join()
+
+    assert results["output"] == (["row", "parsed"], 2)
+    assert all(stage.status == DONE for stage in graph.stages.values())
+    assert graph.critical_path() == ["plan", "search", "parse", "output"]
+
+    report = graph.to_dict()
+    stages = {stage["name"]: stage for stage in report["stages"]}
+    assert stages["output"]["deps"] == ["parse", "analysis"]
+    assert stages["search"]["kind"] == "agent" and stages["search"]["seconds"] >= 0.05
+    assert stages["parse"]["start"] >= stages["search"]["end"]
+
+
+def test_failure_skips_pending_stages_and_is_raised():
+    graph = StageGraph("run", workers=1)
+    graph.add("plan", lambda inputs: 1 / 0)
+    graph.add("output", lambda inputs: "never", deps=("plan",))
+    with pytest.raises(ZeroDivisionError):
+        graph.run()
+    assert graph.stages["output"].status == SKIPPED
+    assert "division by zero" in graph.to_dict()["stages"][0]["error"]
+
+
+def test_stages_can_only_depend_on_earlier_stages():
+    graph = StageGraph("run")
+    graph.add("plan", lambda inputs: None)
+    with pytest.raises(ValueError):
+        graph.add("output", lambda inputs: None, deps=("report",))
+    with pytest.raises(ValueError):
+        graph.add("plan", lambda inputs: None)
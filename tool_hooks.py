@@ -0,0 +1,125 @@
+"""
+Toolkit wrapping helpers
+Re-registers agno toolkit functions behind call wrappers so cross-cutting
+behaviour (deadlines, circuit breakers, indexing, ranking) can be layered
+onto TavilyTools, ExaTools, DuckDuckGoTools and TrafilaturaTools
+"""
+
+import contextlib
+import contextvars
+import functools
+import json
+import re
+from typing import Callable, Dict, List
+
+
+def wrap_tool(tool: Callable, call: Callable) -> Callable:
+    """Return a wrapper around ``tool`` that keeps its name, docstring and signature"""
+
+    @functools.wraps(tool)
+    def wrapper(*args, **kwargs):
+        return call(tool, *args, **kwargs)
+
+    return wrapper
+
+
+def wrap_toolkit(toolkit, wrapper: Callable[[Callable], Callable]):
+    """Replace every tool of an agno toolkit with ``wrapper(tool)`` and re-register it"""
+    include_tools = getattr(toolkit, 'include_tools', None)
+    exclude_tools = getattr(toolkit, 'exclude_tools', None) or []
+
+    wrapped_tools = [wrapper(tool) for tool in toolkit.tools]
+    toolkit.tools = wrapped_tools
+    toolkit.functions = {}
+    for tool in wrapped_tools:
+        if include_tools and tool.__name__ not in include_tools:
+            continue
+        if tool.__name__ in exclude_tools:
+            continue
+        toolkit.register(tool)
+    return toolkit
+
+
+# ========== ACTIVE RESEARCH CONTEXT ==========
+# The DrugResearchInput being researched, visible to tool wrappers running inside agent calls
+current_research: contextvars.ContextVar = contextvars.ContextVar("current_research", default=None)
+
+
+@contextlib.contextmanager
+def research_scope(research_input):
+    """Make ``research_input`` the active research context for tool wrappers"""
+    token = current_research.set(research_input)
+    try:
+        yield research_input
+    finally:
+        current_research.reset(token)
+
+
+# Keys of the research agents the running tool calls are made for (several for a search planned by
+# more than one agent), so wrappers can treat agents differently
+current_agents: contextvars.ContextVar = contextvars.ContextVar("current_agents", default=())
+
+
+@contextlib.contextmanager
+def agent_scope(*keys: str):
+    """Make ``keys`` the research agents tool wrappers are running for"""
+    token = current_agents.set(tuple(keys))
+    try:
+        yield keys
+    finally:
+        current_agents.reset(token)
+
+
+# ========== TOOL OUTPUT PARSING ==========
+
+_MARKDOWN_LINK = re.compile(r'\[([^\]]+)\]\((https?://[^)\s]+)\)')
+
+
+def _first(record: dict, *keys) -> str:
+    for key in keys:
+        value = record.get(key)
+        if value:
+            return str(value)
+    return ''
+
+
+def parse_search_results(output: str) -> List[Dict[str, str]]:
+    """Extract url/title/content/published_date records from a search tool's output"""
+    if not output or output.startswith('Error'):
+        return []
+    try:
+        data = json.loads(output)
+    except (TypeError, ValueError):
+        data = None
+
+    if isinstance(data, dict):
+        data = data.get('results') or data.get('data') or []
+    if isinstance(data, list):
+        records = []
+        for item in data:
+            if not isinstance(item, dict):
+                continue
+            url = _first(item, 'url', 'href', 'link')
+            if not url:
+                continue
+            records.append({
+                'url': url,
+                'title': _first(item, 'title'),
+                'content': _first(item, 'content', 'body', 'snippet', 'text', 'raw_content', 'summary'),
+                'published_date': _first(item, 'published_date', 'publishedDate', 'date'),
+            })
+        return records
+
+    # Markdown output: each [title](url) link followed by its snippet text
+    records = []
+    matches = list(_MARKDOWN_LINK.finditer(output))
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(output)
+        snippet = output[match.end():end].strip().lstrip('#').strip()
+        records.append({
+            'url': match.group(2),
+            'title': match.group(1),
+            'content': snippet,
+            'published_date': '',
+        })
+    return records
@@ -0,0 +1,247 @@
+"""
+Incremental validation of findings rows with a persistent verdict cache
+Each candidate row is normalised and hashed together with the research it
+is validated for (drug, manufacturer and period), since a finding confirmed
+for one drug or period says nothing about another. Rows whose hash already
+has a verdict (from an earlier run or re-run) are answered from the cache;
+only new or changed rows are sent to the validation agent, in compact
+numbered batches. A row counts as confirmed when the agent re-emits it
+(matched by canonical URL, else by its identifying columns), and the
+re-emitted row is cached with the verdict
+
+Usage:
+    python validation_cache.py stats
+    python validation_cache.py prune --older-than 90
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from research_schema import SIGNATURE_COLUMNS, TABLE_COLUMNS, canonicalize_url
+from row_repair import deterministic_fix, research_period
+
+DEFAULT_VERDICT_DB = os.getenv("DRUG_RESEARCH_VERDICT_DB", "research_cache/validation_verdicts.db")
+
+# Set DRUG_RESEARCH_VALIDATION_CACHE=0 to send every row to the validation agent again
+VALIDATION_CACHE = os.getenv("DRUG_RESEARCH_VALIDATION_CACHE", "1") == "1"
+# Rows per validation agent call
+VALIDATION_BATCH_SIZE = int(os.getenv("DRUG_RESEARCH_VALIDATION_BATCH", "20"))
+# Verdicts older than this are treated as missing, so findings are re-checked now and then
+VERDICT_TTL_DAYS = float(os.getenv("DRUG_RESEARCH_VERDICT_TTL_DAYS", "30"))
+
+CONFIRMED, UNCONFIRMED = "confirmed", "unconfirmed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS verdicts (
+    row_hash TEXT PRIMARY KEY,
+    verdict TEXT NOT NULL,
+    validated_row TEXT,
+    drug TEXT,
+    period TEXT,
+    run_id TEXT,
+    validated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_verdicts_validated_at ON verdicts(validated_at);
+"""
+
+
+def normalize_row(row: Sequence[str]) -> List[str]:
+    """Row with deterministic fixes, collapsed whitespace, lowercase text and a canonical URL"""
+    fixed = deterministic_fix(row)
+    normalized = [' '.join(str(value).split()).lower() for value in fixed]
+    if len(normalized) == len(TABLE_COLUMNS):
+        normalized[-1] = canonicalize_url(fixed[-1]).lower()
+    return normalized
+
+
+def verdict_scope(research_input) -> List[str]:
+    """Normalised drug, manufacturer and period a verdict was given for"""
+    return [' '.join(str(value or '').split()).lower()
+            for value in (research_input.drug_name, research_input.manufacturer, research_period(research_input))]
+
+
+def row_hash(row: Sequence[str], research_input=None) -> str:
+    """Content hash of a normalised row within the scope of ``research_input``: any changed column,
+    or another drug, manufacturer or period, gives a new hash"""
+    scope = verdict_scope(research_input) if research_input is not None else []
+    return hashlib.sha1('\x1f'.join(scope + normalize_row(row)).encode('utf-8')).hexdigest()
+
+
+def match_keys(row: Sequence[str]) -> List[tuple]:
+    """Keys a validated row is matched to its input row by: canonical URL, then identifying columns"""
+    normalized = normalize_row(row)
+    keys = []
+    if len(normalized) == len(TABLE_COLUMNS) and normalized[-1].startswith(('http://', 'https://')):
+        keys.append(('url', normalized[-1]))
+    keys.append(('row', tuple(normalized[:SIGNATURE_COLUMNS])))
+    return keys
+
+
+class VerdictStore:
+    """SQLite cache of validation verdicts keyed by row hash"""
+
+    def __init__(self, path: str = DEFAULT_VERDICT_DB, ttl_days: float = VERDICT_TTL_DAYS):
+        self.path = path
+        self.ttl_days = ttl_days
+        if path != ':memory:':
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    def lookup(self, hashes: Sequence[str]) -> Dict[str, Tuple[str, Optional[List[str]]]]:
+        """{hash: (verdict, validated row or None)} of the hashes with a verdict younger than the TTL"""
+        cutoff = (datetime.now() - timedelta(days=self.ttl_days)).isoformat(timespec='seconds')
+        found = {}
+        hashes = list(dict.fromkeys(hashes))
+        with self._lock:
+            # Chunked to stay under SQLite's bound parameter limit
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT row_hash, verdict, validated_row FROM verdicts "
+                    f"WHERE row_hash IN ({','.join('?' * len(chunk))}) AND validated_at >= ?",
+                    (*chunk, cutoff)).fetchall()
+                for hash_, verdict, validated_row in rows:
+                    found[hash_] = (verdict, json.loads(validated_row) if validated_row else None)
+        return found
+
+    def record(self, verdicts: Sequence[Tuple[str, str, Optional[List[str]]]], drug: str = '', period: str = '',
+               run_id: str = ''):
+        """Store (hash, verdict, validated row) triples, replacing older verdicts"""
+        now = datetime.now().isoformat(timespec='seconds')
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO verdicts (row_hash, verdict, validated_row, drug, period, run_id, validated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(hash_, verdict, json.dumps(row, ensure_ascii=False) if row else None, drug, period, run_id, now)
+                 for hash_, verdict, row in verdicts])
+
+    def prune(self, older_than_days: float) -> int:
+        cutoff = (datetime.now() - timedelta(days=older_than_days)).isoformat(timespec='seconds')
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM verdicts WHERE validated_at < ?", (cutoff,)).rowcount
+
+    def summary(self) -> List[Tuple[str, str, int]]:
+        """(drug, verdict, rows) counts"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT drug, verdict, COUNT(*) FROM verdicts GROUP BY drug, verdict ORDER BY drug, verdict").fetchall()
+
+
+class IncrementalValidator:
+    """Validates a run's rows, sending only rows without a cached verdict to ``validate_fn``"""
+
+    def __init__(self, validate_fn: Callable[[str], List[List[str]]], store: Optional[VerdictStore] = None,
+                 batch_size: int = VALIDATION_BATCH_SIZE):
+        # validate_fn: prompt -> parsed rows, typically the validation agent
+        self.validate_fn = validate_fn
+        self.store = store
+        self.batch_size = max(1, batch_size)
+        self.stats = {'rows': 0, 'cached_confirmed': 0, 'cached_unconfirmed': 0, 'sent': 0, 'batches': 0,
+                      'confirmed': 0, 'unconfirmed': 0, 'additional': 0}
+
+    def validate(self, rows: Sequence[Sequence[str]], research_input, run_id: str = '') -> List[List[str]]:
+        """Validated rows: cached confirmations, rows the agent confirmed and any extra rows it found"""
+        pending: Dict[str, List[str]] = {}
+        for row in rows:
+            if len(row) == len(TABLE_COLUMNS):
+                pending.setdefault(row_hash(row, research_input), list(row))
+        self.stats['rows'] += len(pending)
+
+        validated: List[List[str]] = []
+        cached = self.store.lookup(list(pending)) if self.store else {}
+        for hash_, (verdict, validated_row) in cached.items():
+            del pending[hash_]
+            if verdict == CONFIRMED and validated_row:
+                self.stats['cached_confirmed'] += 1
+                validated.append(validated_row)
+            else:
+                self.stats['cached_unconfirmed'] += 1
+
+        batch_hashes = list(pending)
+        for start in range(0, len(batch_hashes), self.batch_size):
+            batch = [(hash_, pending[hash_]) for hash_ in batch_hashes[start:start + self.batch_size]]
+            verdicts, extra = self._validate_batch(batch, research_input)
+            validated.extend(row for _, verdict, row in verdicts if verdict == CONFIRMED)
+            validated.extend(extra)
+            if self.store:
+                self.store.record(verdicts, drug=research_input.drug_name, period=research_period(research_input),
+                                  run_id=run_id)
+        return validated
+
+    def _validate_batch(self, batch: List[Tuple[str, List[str]]], research_input) -> tuple:
+        """((hash, verdict, validated row) per input row, rows the agent added that match no input)"""
+        self.stats['batches'] += 1
+        self.stats['sent'] += len(batch)
+        period = research_period(research_input)
+        listing = "\n".join(f"| {' | '.join(row)} |" for _, row in batch)
+        prompt = f"""Validate these {len(batch)} research findings for {research_input.drug_name} ({research_input.manufacturer}), {period}.
+
+| {' | '.join(TABLE_COLUMNS)} |
+{listing}
+
+Check each finding against its source with additional searches ONLY for the specified drug/manufacturer/timeframe.
+Output every finding you can confirm as a table row in the same format, corrected where needed; omit findings you cannot confirm.
+"""
+        try:
+            returned = self.validate_fn(prompt)
+        except Exception as e:
+            # Nothing is cached for a failed batch, so its rows are retried on the next run
+            print(f"   ⚠️ Validation call failed: {e}")
+            return [], []
+
+        owners: Dict[tuple, str] = {}
+        for hash_, row in batch:
+            for key in match_keys(row):
+                owners.setdefault(key, hash_)
+        confirmed: Dict[str, List[str]] = {}
+        extra = []
+        for row in returned:
+            owner = next((owners[key] for key in match_keys(row) if key in owners), None)
+            if owner is None:
+                extra.append(list(row))
+            elif owner not in confirmed:
+                confirmed[owner] = list(row)
+
+        verdicts = [(hash_, CONFIRMED if hash_ in confirmed else UNCONFIRMED, confirmed.get(hash_))
+                    for hash_, _ in batch]
+        self.stats['confirmed'] += len(confirmed)
+        self.stats['unconfirmed'] += len(batch) - len(confirmed)
+        self.stats['additional'] += len(extra)
+        return verdicts, extra
+
+
+# ========== CLI ==========
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect the validation verdict cache")
+    parser.add_argument("--db", default=DEFAULT_VERDICT_DB, help="Path to the verdict database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="Cached verdicts per drug")
+    prune_parser = commands.add_parser("prune", help="Delete old verdicts")
+    prune_parser.add_argument("--older-than", type=float, default=VERDICT_TTL_DAYS, help="Age in days")
+    args = parser.parse_args(argv)
+
+    store = VerdictStore(args.db)
+    if args.command == "prune":
+        print(f"✅ Deleted {store.prune(args.older_than)} verdicts older than {args.older_than:g} days")
+        return 0
+    print(f"{'Drug':<24} {'verdict':<12} {'rows':>6}")
+    for drug, verdict, count in store.summary():
+        print(f"{drug:<24} {verdict:<12} {count:>6}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+"""
+Continuous watchlist of drugs with safety and regulatory alerts
+Every polling cycle runs the regulatory and safety agents' planned searches
+(query_planner) for each watched drug over the last few months, drops every
+result whose (drug, canonical URL) is in a persistent Bloom filter of seen
+documents, and only sends the genuinely new documents to the agent, which
+scrapes them and reports findings; only findings citing one of those new
+documents are alerted. Findings and new documents are streamed as JSON lines
+(stdout or --alerts file); the Bloom filter answers "seen before?" for a
+million URLs in under 2 MB with a 0.1% false positive rate (a false positive
+only hides a new document, it never re-alerts an old one)
+
+Watchlist lines hold DrugResearchInput fields without the period (an "id" is
+echoed in every event), as for research_cli.py:
+    {"id": "dupixent", "drug_name": "Dupixent", "manufacturer": "Sanofi", "generic_name": "dupilumab"}
+
+Usage:
+    python watchlist.py run watchlist.jsonl --interval 900 --alerts alerts.jsonl
+    python watchlist.py run watchlist.jsonl --once --fake
+    python watchlist.py stats
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import math
+import os
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from query_planner import QueryPlanner, format_bundle
+from research_cli import JsonlWriter
+from research_engine import (
+    RESEARCH_AGENT_SPECS, DrugResearchInput, ResearchTeam, build_research_team, collect_agent_output,
+    get_research_team,
+)
+from provenance_store import row_urls
+from research_schema import TABLE_COLUMNS, canonicalize_url
+from row_repair import MONTHS, RowRepairer
+from tool_hooks import agent_scope, research_scope
+
+DEFAULT_SEEN_FILE = os.getenv("DRUG_RESEARCH_WATCH_SEEN", "research_cache/watch_seen.bloom")
+# Bloom filter sizing: URLs it holds before the false positive rate rises above the target
+SEEN_CAPACITY = int(os.getenv("DRUG_RESEARCH_WATCH_CAPACITY", "1000000"))
+SEEN_ERROR_RATE = float(os.getenv("DRUG_RESEARCH_WATCH_ERROR_RATE", "0.001"))
+# Months searched per cycle, ending with the current one (2 = also catch late-indexed news of last month)
+WATCH_MONTHS = int(os.getenv("DRUG_RESEARCH_WATCH_MONTHS", "2"))
+# Planned searches per agent and drug per cycle
+WATCH_CALLS_PER_AGENT = int(os.getenv("DRUG_RESEARCH_WATCH_CALLS", "3"))
+# Drugs polled at once
+WATCH_CONCURRENCY = int(os.getenv("DRUG_RESEARCH_WATCH_CONCURRENCY", "4"))
+
+WATCH_AGENTS = ("regulatory", "safety")
+
+_MAGIC = b"BLM1"
+_HEADER = struct.Struct("<4sQIQ")  # magic, bits, hashes, items added
+
+
+class SeenUrls:
+    """Persistent Bloom filter of (drug, canonical URL) pairs: no false negatives, rare false positives.
+    Keyed per drug, so a document one watched drug already alerted on is still new for another"""
+
+    def __init__(self, path: str = DEFAULT_SEEN_FILE, capacity: int = SEEN_CAPACITY,
+                 error_rate: float = SEEN_ERROR_RATE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        if self.path.exists():
+            # An existing filter keeps its own size, whatever the current settings
+            with open(self.path, 'rb') as f:
+                magic, self.bits, self.hashes, self.count = _HEADER.unpack(f.read(_HEADER.size))
+                if magic != _MAGIC:
+                    raise ValueError(f"{self.path} is not a seen-URL filter")
+                self._array = bytearray(f.read())
+        else:
+            self.bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+            self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+            self.count = 0
+            self._array = bytearray((self.bits + 7) // 8)
+
+    def _positions(self, drug: str, url: str):
+        # Double hashing (Kirsch-Mitzenmacher): k positions from one 128-bit digest
+        key = f"{' '.join(drug.split()).lower()}\x1f{canonicalize_url(url)}"
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def __contains__(self, item: Tuple[str, str]) -> bool:
+        """Whether the (drug, url) pair was (probably) added before"""
+        return all(self._array[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(*item))
+
+    def add(self, drug: str, url: str) -> bool:
+        """Add a URL seen for a drug; False if the pair was (probably) already there"""
+        positions = self._positions(drug, url)
+        with self._lock:
+            new = False
+            for pos in positions:
+                mask = 1 << (pos & 7)
+                if not self._array[pos >> 3] & mask:
+                    self._array[pos >> 3] |= mask
+                    new = True
+            self.count += new
+        return new
+
+    def false_positive_rate(self) -> float:
+        """Estimated chance that an unseen URL is reported as seen, at the current fill"""
+        return (1 - math.exp(-self.hashes * self.count / self.bits)) ** self.hashes
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        partial = self.path.with_suffix('.part')
+        with self._lock:
+            with open(partial, 'wb') as f:
+                f.write(_HEADER.pack(_MAGIC, self.bits, self.hashes, self.count))
+                f.write(self._array)
+            partial.replace(self.path)
+
+    def summary(self) -> dict:
+        return {"urls": self.count, "bytes": len(self._array), "hashes": self.hashes,
+                "false_positive_rate": round(self.false_positive_rate(), 6)}
+
+
+def watch_window(today: Optional[date] = None, months: int = WATCH_MONTHS) -> Dict[str, Optional[str]]:
+    """DrugResearchInput period fields of the last ``months`` months up to today's"""
+    today = today or date.today()
+    year, month = today.year, today.month
+    for _ in range(max(1, months) - 1):
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    window = {"target_month": MONTHS[month - 1].title(), "target_year": str(year), "end_month": None, "end_year": None}
+    if months > 1:
+        window.update(end_month=MONTHS[today.month - 1].title(), end_year=str(today.year))
+    return window
+
+
+def load_watchlist(path: str) -> List[Tuple[str, dict]]:
+    """(id, DrugResearchInput fields without the period) per watchlist line; invalid lines are reported and skipped"""
+    watched = []
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                record = json.loads(line)
+                record_id = str(record.pop("id", number))
+                DrugResearchInput.model_validate({**record, **watch_window()})
+                watched.append((record_id, record))
+            except (ValueError, ValidationError, AttributeError) as e:
+                print(f"⚠️ Skipping watchlist line {number}: {' '.join(str(e).split())}", file=sys.stderr)
+    return watched
+
+
+class Watcher:
+    """One polling cycle at a time over a watchlist: search, filter seen URLs, send new documents to the agents"""
+
+    def __init__(self, team: ResearchTeam, seen: SeenUrls, writer: JsonlWriter,
+                 calls_per_agent: int = WATCH_CALLS_PER_AGENT, concurrency: int = WATCH_CONCURRENCY):
+        self.team = team
+        self.seen = seen
+        self.writer = writer
+        self.calls_per_agent = calls_per_agent
+        self.concurrency = max(1, concurrency)
+        self.agents = [key for key in WATCH_AGENTS if key in team.agents]
+        self.cycles = 0
+
+    def poll(self, watched: List[Tuple[str, dict]]) -> dict:
+        """Run one cycle over every watched drug; returns (and emits) the cycle summary"""
+        self.cycles += 1
+        started = time.perf_counter()
+        window = watch_window()
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(watched) or 1),
+                                thread_name_prefix="watch") as pool:
+            stats = list(pool.map(lambda item: self._poll_drug(item[0], DrugResearchInput(**{**item[1], **window})),
+                                  watched))
+        self.seen.save()
+        summary = {"type": "cycle", "cycle": self.cycles, "drugs": len(watched),
+                   **{key: sum(s[key] for s in stats) for key in ("searches", "results", "new_documents", "alerts", "errors")},
+                   "seconds": round(time.perf_counter() - started, 3), "seen": self.seen.summary()}
+        self.writer.write(summary)
+        return summary
+
+    def _poll_drug(self, record_id: str, research_input: DrugResearchInput) -> Dict[str, int]:
+        stats = {"searches": 0, "results": 0, "new_documents": 0, "alerts": 0, "errors": 0}
+        with research_scope(research_input):
+            planner = QueryPlanner(self.team.toolkits, max_calls=self.calls_per_agent, concurrency=self.calls_per_agent)
+            bundles = planner.prefetch(research_input, [(key, RESEARCH_AGENT_SPECS[key].topic) for key in self.agents])
+            stats["searches"], stats["errors"] = planner.stats["executed"], planner.stats["errors"]
+            claimed = set()
+            for key in self.agents:
+                stats["results"] += len(bundles[key])
+                # A URL both agents found goes to the first one only
+                new = [record for record in bundles[key] if (research_input.drug_name, record["url"]) not in self.seen
+                       and canonicalize_url(record["url"]) not in claimed]
+                claimed.update(canonicalize_url(record["url"]) for record in new)
+                if not new:
+                    continue
+                stats["new_documents"] += len(new)
+                try:
+                    rows = self._review(key, research_input, new, len(planner.planned[key]))
+                except Exception as e:
+                    # Not marked as seen: the documents are offered again next cycle
+                    print(f"   ⚠️ {RESEARCH_AGENT_SPECS[key].label} review failed for {research_input.drug_name}: {e}")
+                    stats["errors"] += 1
+                    continue
+                for record in new:
+                    self.seen.add(research_input.drug_name, record["url"])
+                    self.writer.write({"type": "document", "id": record_id, "agent": key, "url": record["url"],
+                                       "title": record["title"], "published_date": record["published_date"] or None})
+                for row in rows:
+                    self.writer.write({"type": "alert", "id": record_id, "agent": key,
+                                       "drug_name": research_input.drug_name, "row": dict(zip(TABLE_COLUMNS, row))})
+                stats["alerts"] += len(rows)
+        return stats
+
+    def _review(self, key: str, research_input: DrugResearchInput, records: List[dict], queries: int) -> List[List[str]]:
+        """Findings rows the agent draws from the new documents, with deterministic fixes, inside the period.
+        The agent keeps its search tools to read the documents, so rows citing anything else are dropped"""
+        print(f"🔔 {len(records)} new documents for {research_input.drug_name} ({RESEARCH_AGENT_SPECS[key].label})")
+        query = (f"Research {RESEARCH_AGENT_SPECS[key].topic} for {research_input.get_search_context()}. "
+                 f"{research_input.get_temporal_constraint()}. These documents are NEW since the last check: report "
+                 f"findings from them only, and no rows if they contain nothing relevant."
+                 f"{format_bundle(records, queries, max_results=len(records))}")
+        with agent_scope(key):
+            result = self.team.agents[key].run(query)
+        _, rows = collect_agent_output(result)
+        new_urls = {canonicalize_url(record["url"]) for record in records}
+        return [row for row in RowRepairer().repair(rows, research_input) if new_urls.intersection(row_urls(row))]
+
+
+# ========== CLI ==========
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Poll a drug watchlist for new safety and regulatory documents")
+    parser.add_argument("--seen", default=DEFAULT_SEEN_FILE, help="Path of the seen-URL Bloom filter")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="Poll the watchlist until interrupted")
+    run_parser.add_argument("watchlist", help="JSONL file of watched drugs")
+    run_parser.add_argument("--interval", type=float, default=900.0, help="Seconds between cycle starts")
+    run_parser.add_argument("--once", action="store_true", help="Run a single cycle and exit")
+    run_parser.add_argument("--profile", default="fast", help="Research profile whose agents and providers are used")
+    run_parser.add_argument("--alerts", help="Append events to this JSONL file instead of stdout")
+    run_parser.add_argument("--fake", action="store_true", help="Use fake models and providers (no network or API keys)")
+    commands.add_parser("stats", help="Size and fill of the seen-URL filter")
+    args = parser.parse_args(argv)
+
+    seen = SeenUrls(args.seen)
+    if args.command == "stats":
+        summary = seen.summary()
+        print(f"{summary['urls']} URLs seen, {summary['bytes'] / 1e6:.2f} MB, {summary['hashes']} hashes, "
+              f"estimated false positive rate {summary['false_positive_rate']:.4%}")
+        return 0
+
+    if args.fake:
+        from fake_backends import fake_model_factory, fake_toolkit_factory
+        team = build_research_team(args.profile, model_factory=fake_model_factory(),
+                                   toolkit_factory=fake_toolkit_factory())
+    else:
+        team = get_research_team(args.profile)
+
+    with contextlib.ExitStack() as stack:
+        stream = stack.enter_context(open(args.alerts, 'a', encoding='utf-8')) if args.alerts else sys.stdout
+        writer = JsonlWriter(stream)
+        # Progress messages go to stderr, so stdout only carries events
+        stack.enter_context(contextlib.redirect_stdout(sys.stderr))
+        watcher = Watcher(team, seen, writer)
+        try:
+            while True:
+                # Re-read every cycle, so drugs can be added to or removed from a running watch
+                watched = load_watchlist(args.watchlist)
+                started = time.monotonic()
+                summary = watcher.poll(watched)
+                print(f"👀 Cycle {summary['cycle']}: {summary['drugs']} drugs, {summary['searches']} searches, "
+                      f"{summary['new_documents']} new documents, {summary['alerts']} alerts")
+                if args.once:
+                    break
+                time.sleep(max(0.0, args.interval - (time.monotonic() - started)))
+        except KeyboardInterrupt:
+            seen.save()
+            print("🛑 Watch stopped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
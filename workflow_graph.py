@@ -0,0 +1,261 @@
+"""
+Dependency graph execution of workflow stages
+A run is a DAG of named stages. Each stage starts as soon as every stage it
+depends on has finished, on a bounded worker pool, so independent work (one
+agent's parsing while others still run, content analysis alongside knowledge
+synthesis) overlaps instead of waiting for a fixed phase order. Stages run by
+another scheduler (the Phase 1 agents on the LPT scheduler) are external:
+the graph waits for ``complete()`` instead of running them. Every run's graph,
+with per-stage timings and the critical path, is stored in run_report.json
+
+Usage:
+    python workflow_graph.py show agent_outputs/Dupixent_Sanofi_20251019_101500
+    python workflow_graph.py dot agent_outputs/Dupixent_Sanofi_20251019_101500 > graph.dot
+"""
+
+import argparse
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Stages running at once within one run (external stages do not take a worker)
+GRAPH_WORKERS = int(os.getenv("DRUG_RESEARCH_GRAPH_WORKERS", "4"))
+
+PENDING, WAITING, RUNNING, DONE, FAILED, SKIPPED = "pending", "waiting", "running", "done", "failed", "skipped"
+
+
+@dataclass
+class Stage:
+    """One node of a StageGraph; ``fn(inputs)`` gets the results of its dependencies by stage name"""
+    name: str
+    fn: Optional[Callable[[Dict[str, object]], object]]
+    deps: Tuple[str, ...] = ()
+    kind: str = "stage"
+    # Ready stages with a higher priority get a free worker first
+    priority: float = 0.0
+    status: str = PENDING
+    result: object = None
+    error: Optional[BaseException] = None
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    thread: Optional[str] = None
+
+    @property
+    def external(self) -> bool:
+        return self.fn is None
+
+    @property
+    def seconds(self) -> float:
+        return (self.finished - self.started) if self.started is not None and self.finished is not None else 0.0
+
+
+class StageGraph:
+    """DAG of stages run dependencies-first on ``workers`` threads. Stages can only depend on
+    stages added before them, so the graph cannot have cycles. ``hook(stage, call)`` wraps the
+    execution of every stage (e.g. for profiling) and must return ``call()``"""
+
+    def __init__(self, name: str, workers: int = GRAPH_WORKERS,
+                 hook: Optional[Callable[[Stage, Callable[[], object]], object]] = None):
+        self.name = name
+        self.workers = max(1, workers)
+        self.hook = hook
+        self.stages: Dict[str, Stage] = {}
+        self._cond = threading.Condition()
+        self._running = 0
+        self._error: Optional[BaseException] = None
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+        self._context: Optional[contextvars.Context] = None
+
+    def add(self, name: str, fn: Optional[Callable[[Dict[str, object]], object]], deps: Tuple[str, ...] = (),
+            kind: str = "stage", priority: float = 0.0) -> Stage:
+        """Add a stage; ``fn`` None makes it external (finished by ``complete``)"""
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' is already in the graph")
+        missing = [dep for dep in deps if dep not in self.stages]
+        if missing:
+            raise ValueError(f"Stage '{name}' depends on unknown stages: {', '.join(missing)}")
+        stage = Stage(name, fn, tuple(deps), kind, priority)
+        self.stages[name] = stage
+        return stage
+
+    def result(self, name: str):
+        return self.stages[name].result
+
+    def complete(self, name: str, result=None, error: Optional[BaseException] = None, seconds: Optional[float] = None):
+        """Finish an external stage (from any thread); ``seconds`` dates its start back from now"""
+        now = time.perf_counter()
+        with self._cond:
+            stage = self.stages[name]
+            if stage.status == SKIPPED:
+                # The graph already gave up after another stage failed
+                return
+            if not stage.external or stage.status in (DONE, FAILED):
+                raise ValueError(f"Stage '{name}' cannot be completed externally ({stage.status})")
+            stage.finished = now
+            stage.started = now - seconds if seconds is not None else (stage.started or now)
+            stage.thread = threading.current_thread().name
+            self._settle(stage, result, error)
+
+    def run(self) -> Dict[str, object]:
+        """Run every stage; returns {stage name: result}. After the first failure no new stage
+        starts, the running ones are waited for and the failure is re-raised"""
+        self._started = time.perf_counter()
+        # Stages run in copies of the caller's context (active research input, tool meter)
+        self._context = contextvars.copy_context()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="stage") as pool:
+            with self._cond:
+                while True:
+                    if self._error is None:
+                        self._launch(pool)
+                    if self._running == 0 and (self._error is not None or
+                                               all(stage.status == DONE for stage in self.stages.values())):
+                        break
+                    self._cond.wait()
+        self._finished = time.perf_counter()
+        if self._error is not None:
+            for stage in self.stages.values():
+                if stage.status in (PENDING, WAITING):
+                    stage.status = SKIPPED
+            raise self._error
+        return {name: stage.result for name, stage in self.stages.items()}
+
+    def _launch(self, pool: ThreadPoolExecutor):
+        """Start every ready stage a worker is free for, highest priority first (lock held)"""
+        order = {name: index for index, name in enumerate(self.stages)}
+        ready = sorted((stage for stage in self.stages.values()
+                        if stage.status == PENDING and all(self.stages[dep].status == DONE for dep in stage.deps)),
+                       key=lambda stage: (-stage.priority, order[stage.name]))
+        for stage in ready:
+            if stage.external:
+                stage.status, stage.started = WAITING, time.perf_counter()
+            elif self._running < self.workers:
+                inputs = {dep: self.stages[dep].result for dep in stage.deps}
+                stage.status, stage.started = RUNNING, time.perf_counter()
+                self._running += 1
+                pool.submit(self._context.copy().run, self._execute, stage, inputs)
+
+    def _execute(self, stage: Stage, inputs: Dict[str, object]):
+        stage.thread = threading.current_thread().name
+        result, error = None, None
+        try:
+            call = lambda: stage.fn(inputs)
+            result = self.hook(stage, call) if self.hook else call()
+        except BaseException as e:
+            error = e
+        with self._cond:
+            stage.finished = time.perf_counter()
+            self._running -= 1
+            self._settle(stage, result, error)
+
+    def _settle(self, stage: Stage, result, error: Optional[BaseException]):
+        """Record a finished stage and wake the scheduler (lock held)"""
+        stage.result, stage.error = result, error
+        stage.status = FAILED if error is not None else DONE
+        if error is not None and self._error is None:
+            self._error = error
+        self._cond.notify_all()
+
+    def critical_path(self) -> List[str]:
+        """The chain of stages that determined the graph's end time: from the last stage to finish,
+        each step back goes to the dependency that finished last"""
+        finished = [stage for stage in self.stages.values() if stage.finished is not None]
+        if not finished:
+            return []
+        stage = max(finished, key=lambda s: s.finished)
+        path = [stage.name]
+        while stage.deps:
+            stage = max((self.stages[dep] for dep in stage.deps), key=lambda s: s.finished or 0.0)
+            path.append(stage.name)
+        return path[::-1]
+
+    def to_dict(self) -> dict:
+        """The graph with per-stage timings (seconds from the graph's start), for run reports"""
+        origin = self._started or 0.0
+        offset = lambda value: round(value - origin, 4) if value is not None else None
+        return {
+            "name": self.name,
+            "workers": self.workers,
+            "wall_seconds": round((self._finished or origin) - origin, 4),
+            "critical_path": self.critical_path(),
+            "stages": [{
+                "name": stage.name,
+                "kind": stage.kind,
+                "deps": list(stage.deps),
+                "status": stage.status,
+                "start": offset(stage.started),
+                "end": offset(stage.finished),
+                "seconds": round(stage.seconds, 4),
+                "thread": stage.thread,
+                **({"error": str(stage.error)} if stage.error is not None else {}),
+            } for stage in self.stages.values()],
+        }
+
+
+def graph_to_dot(graph: dict) -> str:
+    """Graphviz source of a graph dict, critical path in bold"""
+    critical = set(graph.get("critical_path", []))
+    lines = [f'digraph "{graph["name"]}" {{', "  rankdir=LR;", "  node [shape=box, fontsize=10];"]
+    for stage in graph["stages"]:
+        style = ", style=bold, color=red" if stage["name"] in critical else ""
+        lines.append(f'  "{stage["name"]}" [label="{stage["name"]}\\n{stage["kind"]}, {stage["seconds"]:.2f}s"{style}];')
+        for dep in stage["deps"]:
+            bold = " [style=bold, color=red]" if dep in critical and stage["name"] in critical else ""
+            lines.append(f'  "{dep}" -> "{stage["name"]}"{bold};')
+    lines.append("}")
+    return "\n".join(lines)
+
+
+# ========== CLI ==========
+
+def load_graph(run_dir: str) -> Optional[dict]:
+    path = Path(run_dir) / "run_report.json"
+    if not path.exists():
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f).get("graph")
+
+
+def print_timeline(graph: dict, width: int = 50):
+    """Stages in start order with a bar of when each ran"""
+    total = graph["wall_seconds"] or 1.0
+    critical = set(graph["critical_path"])
+    print(f"🕸️ {graph['name']}: {len(graph['stages'])} stages, {graph['wall_seconds']:.2f}s on {graph['workers']} workers")
+    for stage in sorted(graph["stages"], key=lambda s: (s["start"] is None, s["start"] or 0.0)):
+        start, end = stage["start"] or 0.0, stage["end"] if stage["end"] is not None else stage["start"] or 0.0
+        left = int(start / total * width)
+        bar = " " * left + "█" * max(1, int(end / total * width) - left)
+        marker = "*" if stage["name"] in critical else " "
+        print(f" {marker} {stage['name']:<34.34} {stage['kind']:<8} {stage['seconds']:>7.2f}s |{bar:<{width}}|"
+              + (f" {stage['status']}" if stage["status"] != DONE else ""))
+    print(f"   * critical path: {' -> '.join(graph['critical_path'])}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect the stage graph of a workflow run")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for command, help_text in (("show", "Timeline and critical path"), ("dot", "Graphviz source of the graph")):
+        command_parser = commands.add_parser(command, help=help_text)
+        command_parser.add_argument("run_dir")
+    args = parser.parse_args(argv)
+
+    graph = load_graph(args.run_dir)
+    if graph is None:
+        print(f"❌ No stage graph in {args.run_dir}/run_report.json")
+        return 1
+    if args.command == "dot":
+        print(graph_to_dot(graph))
+    else:
+        print_timeline(graph)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())